@@ -0,0 +1,42 @@
+import streamlit as st
+
+from config import get_api_keys, get_system_instructions
+from database import get_database_engine, get_engine_agente
+from analytics import usar_duckdb
+from tracing import hook_ferramentas
+
+# Cache do agente AI
+@st.cache_resource
+def get_ai_agent():
+    """Inicializa e retorna o agente AI com cache"""
+    # Imports pesados (agno, SDK do Gemini) adiados para o primeiro uso
+    from agno.agent import Agent
+    from agno.models.google import Gemini
+    from ferramentas import AnaliseTools, BuscaTools, EscritaTools, FinancasTools, ResultadoTools, SQLToolsRoteado
+    
+    api_keys = get_api_keys()
+    engine = get_database_engine()
+    
+    # Leituras na réplica (ou DuckDB, quando configurado); escritas sempre no banco principal
+    tools = [
+        FinancasTools(engine),
+        EscritaTools(engine),
+        SQLToolsRoteado(db_engine=engine, engine_leitura=get_engine_agente()),
+        BuscaTools(get_engine_agente()),
+        ResultadoTools()
+    ]
+    if usar_duckdb():
+        tools.append(AnaliseTools(engine))
+    
+    agente = Agent(
+        model=Gemini(id='gemini-2.0-flash-001', api_key=api_keys['GEMINI_API_KEY']),
+        add_history_to_messages=True,
+        markdown=False,
+        show_tool_calls=True,
+        retries=3,
+        system_message=get_system_instructions(),
+        tools=tools,
+        tool_hooks=[hook_ferramentas],
+        store_events=True
+    )
+    return agente
@@ -0,0 +1,95 @@
+import streamlit as st
+
+from analytics import usar_duckdb, metricas_gerais, gastos_por_categoria, serie_por_periodo
+from atualizador import get_atualizador
+from config import get_app_config
+from database import get_database_engine
+from previsao import obter_previsao
+from timeseries import converter_datas, escolher_resolucao, agregar_serie
+
+# Agregados do dashboard. Ficam fora de dashboard.py (que roda como página,
+# com __name__ == "__main__") para o atualizador aquecer em background as mesmas
+# entradas de cache que a página lê. São chaveados pelo conteúdo do DataFrame,
+# então não envelhecem: sem TTL, só o limite de entradas.
+
+config = get_app_config()
+
+@st.cache_data(max_entries=4)
+def calcular_metricas(df):
+    """Calcula métricas principais com cache"""
+    if df.empty:
+        return None
+    
+    # Totais por tipo e meses com dados
+    if usar_duckdb():
+        totais = metricas_gerais(get_database_engine())
+        meses_com_dados = int(totais['meses_com_dados'])
+        receitas_total = float(totais['receitas_total'])
+        gastos_total = float(totais['gastos_total'])
+    else:
+        meses_com_dados = df['MesAno'].nunique()
+        receitas_total = df[df['Tipo'] == 'Ativo']['Valor'].sum()
+        gastos_total = df[df['Tipo'] == 'Passivo']['Valor'].sum()
+    
+    # Calcular médias mensais
+    media_receitas = receitas_total / max(meses_com_dados, 1)
+    media_gastos = gastos_total / max(meses_com_dados, 1)
+    
+    # Saldo atual total
+    saldo_atual = receitas_total - gastos_total
+    
+    return {
+        'meses_com_dados': meses_com_dados,
+        'media_receitas': media_receitas,
+        'media_gastos': media_gastos,
+        'receitas_total': receitas_total,
+        'gastos_total': gastos_total,
+        'saldo_atual': saldo_atual
+    }
+
+@st.cache_data(max_entries=4)
+def preparar_dados_pizza(df):
+    """Prepara dados para gráfico de pizza com cache"""
+    if df.empty:
+        return None
+    
+    if usar_duckdb():
+        return gastos_por_categoria(get_database_engine())
+    
+    gastos_df = df[df['Tipo'] == 'Passivo'].groupby('Categorias')['Valor'].sum().reset_index()
+    return gastos_df.sort_values('Valor', ascending=False)
+
+@st.cache_data(max_entries=64)  # Várias combinações de zoom/resolução por DataFrame
+def preparar_dados_evolucao(df, resolucao='M', inicio=None, fim=None):
+    """Prepara dados para gráfico de evolução com cache"""
+    if df.empty:
+        return None
+    
+    if usar_duckdb():
+        return serie_por_periodo(get_database_engine(), resolucao, inicio, fim)
+    
+    return agregar_serie(df, resolucao, inicio, fim)
+
+def limites_evolucao(df):
+    """Primeira e última data do livro-caixa (o zoom padrão do gráfico de evolução), ou None"""
+    datas = converter_datas(df['Data']).dropna()
+    if datas.empty:
+        return None
+    return datas.min().date(), datas.max().date()
+
+def aquecer_agregados(df):
+    """Calcula os agregados da visão padrão do dashboard para um livro-caixa recém-carregado"""
+    if df.empty:
+        return
+    
+    calcular_metricas(df)
+    obter_previsao(df, get_database_engine())
+    preparar_dados_pizza(df)
+    
+    limites = limites_evolucao(df)
+    if limites is not None:
+        inicio, fim = limites
+        preparar_dados_evolucao(df, escolher_resolucao(inicio, fim, config['grafico']['max_pontos']), inicio, fim)
+
+# A cada recarga do livro-caixa, o atualizador recalcula os agregados fora das requisições
+get_atualizador().registrar_aquecedor('dados', aquecer_agregados)
@@ -0,0 +1,162 @@
+import importlib.util
+import threading
+import pandas as pd
+import streamlit as st
+
+from config import get_app_config
+from database import carregar_dados
+from arquivo import COLUNAS
+
+# DuckDB é opcional (e importado só no primeiro uso): sem ele o dashboard segue com pandas
+DUCKDB_INSTALADO = importlib.util.find_spec('duckdb') is not None
+
+# Data é ISO (texto no SQLite, DATE no PostgreSQL/snapshot): cast direto para DATE
+DATA_SQL = "TRY_CAST(Data AS DATE)"
+
+# Resolução do timeseries.py -> unidade do date_trunc
+UNIDADES = {'D': 'day', 'W': 'week', 'M': 'month', 'Q': 'quarter'}
+
+def usar_duckdb():
+    """Indica se o motor analítico configurado é o DuckDB (e se está instalado)"""
+    return DUCKDB_INSTALADO and get_app_config()['analytics']['motor'] == 'duckdb'
+
+class MotorDuckDB:
+    """
+    Conexão DuckDB embutida, somente leitura e sem acesso a arquivos externos.
+    SQLite: anexa o arquivo do banco. Senão (ou se a extensão faltar): lê o
+    snapshot colunar + delta já carregados por carregar_dados.
+    Expõe receita_gastos e receita_gastos_completa (com os anos arquivados),
+    como no banco. Escritas continuam indo para o banco principal.
+    """
+
+    def __init__(self, engine):
+        import duckdb
+
+        self.con = duckdb.connect(':memory:')
+        self.lock = threading.Lock()
+        self.engine = engine
+        self.versao_df = None
+        self.origem = None
+
+        if engine.dialect.name == 'sqlite':
+            try:
+                self.con.execute(
+                    "ATTACH ? AS ledger (TYPE sqlite, READ_ONLY)",
+                    [engine.url.database]
+                )
+                self.con.execute("CREATE VIEW receita_gastos AS SELECT * FROM ledger.receita_gastos")
+                self.con.execute(f"""
+                    CREATE VIEW receita_gastos_completa AS
+                    SELECT {COLUNAS} FROM ledger.receita_gastos
+                    UNION ALL
+                    SELECT {COLUNAS} FROM ledger.receita_gastos_arquivo
+                """)
+                self.origem = 'sqlite'
+            except duckdb.Error:
+                self.origem = None
+
+        if self.origem is None:
+            self.origem = 'snapshot'
+            self._sincronizar()
+
+        # O SQL do agente roda nesta conexão: sem acesso a arquivos/rede
+        # (read_text, read_csv, ATTACH...) e sem poder reverter a configuração.
+        # DataFrames registrados e o banco já anexado continuam acessíveis
+        self.con.execute("SET enable_external_access = false")
+        self.con.execute("SET lock_configuration = true")
+
+    def _sincronizar(self):
+        """
+        Re-materializa o livro-caixa quando o DataFrame em cache mudou.
+        carregar_dados já junta snapshot colunar + delta do banco; a mudança é
+        detectada pela versão do change feed e pelo tamanho/maior id, não pela
+        identidade do objeto.
+        """
+        df = carregar_dados(self.engine)
+        versao = (
+            df.attrs.get('versao_dados'),
+            len(df),
+            int(df['id'].max()) if 'id' in df.columns and not df.empty else None
+        )
+        if versao == self.versao_df:
+            return
+
+        # Views registradas são locais à conexão; materializa para os cursores enxergarem.
+        # O DataFrame já é o histórico completo: as duas tabelas apontam para ele
+        self.con.register('livro_caixa_df', df)
+        self.con.execute("CREATE OR REPLACE TABLE receita_gastos_completa AS SELECT * FROM livro_caixa_df")
+        self.con.execute("CREATE OR REPLACE VIEW receita_gastos AS SELECT * FROM receita_gastos_completa")
+        self.con.unregister('livro_caixa_df')
+        self.versao_df = versao
+
+    def consultar(self, sql, params=None):
+        """Executa uma consulta e retorna DataFrame (cursor próprio por chamada)"""
+        with self.lock:
+            if self.origem == 'snapshot':
+                self._sincronizar()
+            cursor = self.con.cursor()
+        try:
+            return cursor.execute(sql, params or []).df()
+        finally:
+            cursor.close()
+
+@st.cache_resource
+def get_motor_duckdb(_engine):
+    """Retorna o motor DuckDB com cache de recurso (um por processo)"""
+    return MotorDuckDB(_engine)
+
+def metricas_gerais(engine):
+    """Totais por tipo e número de meses com dados"""
+    return get_motor_duckdb(engine).consultar(f"""
+        SELECT
+            COALESCE(SUM(Valor) FILTER (WHERE Tipo = 'Ativo'), 0) AS receitas_total,
+            COALESCE(SUM(Valor) FILTER (WHERE Tipo = 'Passivo'), 0) AS gastos_total,
+            COUNT(DISTINCT strftime({DATA_SQL}, '%Y-%m')) AS meses_com_dados
+        FROM receita_gastos_completa
+    """).iloc[0]
+
+def gastos_por_categoria(engine):
+    """Soma de gastos por categoria, em ordem decrescente"""
+    return get_motor_duckdb(engine).consultar("""
+        SELECT Categorias, SUM(Valor) AS Valor
+        FROM receita_gastos_completa
+        WHERE Tipo = 'Passivo'
+        GROUP BY Categorias
+        ORDER BY Valor DESC
+    """)
+
+def serie_por_periodo(engine, resolucao, inicio=None, fim=None):
+    """
+    Receitas e gastos agregados por bucket (date_trunc), no mesmo formato
+    de timeseries.agregar_serie (buckets vazios preenchidos com zero).
+    """
+    df = get_motor_duckdb(engine).consultar(f"""
+        WITH base AS (
+            SELECT {DATA_SQL} AS dia, Valor, Tipo FROM receita_gastos_completa
+        )
+        SELECT
+            date_trunc('{UNIDADES[resolucao]}', dia) AS Periodo,
+            COALESCE(SUM(Valor) FILTER (WHERE Tipo = 'Ativo'), 0) AS Ativo,
+            COALESCE(SUM(Valor) FILTER (WHERE Tipo = 'Passivo'), 0) AS Passivo
+        FROM base
+        WHERE dia IS NOT NULL
+          AND (CAST(? AS DATE) IS NULL OR dia >= CAST(? AS DATE))
+          AND (CAST(? AS DATE) IS NULL OR dia <= CAST(? AS DATE))
+        GROUP BY ALL
+        ORDER BY Periodo
+    """, [inicio, inicio, fim, fim])
+
+    if df.empty:
+        return pd.DataFrame(columns=['Periodo', 'Ativo', 'Passivo', 'Saldo'])
+
+    df['Periodo'] = pd.to_datetime(df['Periodo'])
+    todos = pd.period_range(
+        pd.Timestamp(inicio) if inicio is not None else df['Periodo'].min(),
+        pd.Timestamp(fim) if fim is not None else df['Periodo'].max(),
+        freq=resolucao
+    ).start_time
+
+    df = df.set_index('Periodo').reindex(todos, fill_value=0)
+    df.index.name = 'Periodo'
+    df['Saldo'] = df['Ativo'] - df['Passivo']
+    return df.reset_index()
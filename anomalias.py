@@ -0,0 +1,168 @@
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from config import get_app_config
+
+# Estatísticas de Welford por (Categorias, Tipo): n, média e M2 (soma dos quadrados
+# dos desvios), mantidas pelos triggers em O(1) a cada INSERT/UPDATE/DELETE,
+# venha a escrita do app, do SQL do agente ou de importações em lote.
+TABELA_SQL = """
+CREATE TABLE IF NOT EXISTS estatisticas_categoria (
+    Categorias TEXT NOT NULL,
+    Tipo TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    media REAL NOT NULL,
+    m2 REAL NOT NULL,
+    PRIMARY KEY (Categorias, Tipo)
+)
+"""
+
+# Carga inicial (duas passadas, só na criação da tabela)
+CARGA_INICIAL_SQL = """
+INSERT INTO estatisticas_categoria (Categorias, Tipo, n, media, m2)
+SELECT r.Categorias, r.Tipo, COUNT(*), a.media, SUM((r.Valor - a.media) * (r.Valor - a.media))
+FROM receita_gastos r
+JOIN (
+    SELECT Categorias, Tipo, AVG(Valor) AS media FROM receita_gastos GROUP BY Categorias, Tipo
+) a ON a.Categorias = r.Categorias AND a.Tipo = r.Tipo
+GROUP BY r.Categorias, r.Tipo, a.media
+"""
+
+# Passo de Welford (SET enxerga os valores antigos da linha)
+_ADICIONAR = """
+INSERT INTO estatisticas_categoria (Categorias, Tipo, n, media, m2)
+VALUES ({v}.Categorias, {v}.Tipo, 1, {v}.Valor, 0)
+ON CONFLICT (Categorias, Tipo) DO UPDATE SET
+    n = estatisticas_categoria.n + 1,
+    media = estatisticas_categoria.media
+        + (excluded.media - estatisticas_categoria.media) / (estatisticas_categoria.n + 1),
+    m2 = estatisticas_categoria.m2
+        + (excluded.media - estatisticas_categoria.media)
+        * (excluded.media - (estatisticas_categoria.media
+            + (excluded.media - estatisticas_categoria.media) / (estatisticas_categoria.n + 1)));
+"""
+
+# Welford reverso: remove um valor da média/M2
+_REMOVER = """
+UPDATE estatisticas_categoria SET
+    n = n - 1,
+    media = CASE WHEN n > 1 THEN (n * media - {v}.Valor) / (n - 1) ELSE 0 END,
+    m2 = CASE WHEN n > 1
+        THEN {maximo}(m2 - ({v}.Valor - media) * ({v}.Valor - (n * media - {v}.Valor) / (n - 1)), 0)
+        ELSE 0 END
+WHERE Categorias = {v}.Categorias AND Tipo = {v}.Tipo;
+"""
+
+DDL_SQLITE = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_estatisticas_insert AFTER INSERT ON receita_gastos
+    BEGIN
+        {_ADICIONAR.format(v='new')}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_estatisticas_delete AFTER DELETE ON receita_gastos
+    BEGIN
+        {_REMOVER.format(v='old', maximo='MAX')}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_estatisticas_update AFTER UPDATE OF Valor, Categorias, Tipo ON receita_gastos
+    BEGIN
+        {_REMOVER.format(v='old', maximo='MAX')}
+        {_ADICIONAR.format(v='new')}
+    END
+    """
+]
+
+DDL_POSTGRES = [
+    f"""
+    CREATE OR REPLACE FUNCTION atualizar_estatisticas_categoria() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP IN ('DELETE', 'UPDATE') THEN
+            {_REMOVER.format(v='OLD', maximo='GREATEST')}
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            {_ADICIONAR.format(v='NEW')}
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS trg_estatisticas_categoria ON receita_gastos",
+    """
+    CREATE TRIGGER trg_estatisticas_categoria
+    AFTER INSERT OR UPDATE OR DELETE ON receita_gastos
+    FOR EACH ROW EXECUTE FUNCTION atualizar_estatisticas_categoria()
+    """
+]
+
+def instalar_estatisticas(conn):
+    """Cria a tabela de estatísticas (com carga inicial) e os triggers (idempotente)"""
+    if conn.dialect.name == 'sqlite':
+        existia = conn.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE name = 'estatisticas_categoria'"
+        ).fetchone()
+    else:
+        existia = conn.exec_driver_sql("SELECT to_regclass('estatisticas_categoria')").scalar()
+
+    conn.exec_driver_sql(TABELA_SQL)
+    if not existia:
+        conn.exec_driver_sql(CARGA_INICIAL_SQL)
+
+    for comando in (DDL_SQLITE if conn.dialect.name == 'sqlite' else DDL_POSTGRES):
+        conn.exec_driver_sql(comando)
+
+def pontuar(df):
+    """
+    z-score de cada transação contra as estatísticas da sua categoria
+    SEM ela própria (Welford reverso, vetorizado). Marca as anomalias.
+    """
+    config = get_app_config()['anomalias']
+    x = df['Valor'].to_numpy(dtype=float)
+    n = df['n'].to_numpy(dtype=float) - 1
+    media = np.divide(df['n'] * df['media'] - x, n, out=np.zeros_like(x), where=n > 0)
+    m2 = np.maximum(df['m2'] - (x - df['media']) * (x - media), 0)
+    desvio = np.sqrt(np.divide(m2, n - 1, out=np.zeros_like(x), where=n > 1))
+    z = np.divide(x - media, desvio, out=np.zeros_like(x), where=desvio > 0)
+
+    return df.assign(
+        media_categoria=media,
+        desvio_categoria=desvio,
+        z=z,
+        anomalia=(n >= config['min_amostras']) & (z >= config['limiar_z'])
+    )
+
+def _consultar(engine, filtro, params):
+    consulta = text(f"""
+        SELECT r.id, r.Data, r.Descrição, r.Valor, r.Categorias, r.Tipo, e.n, e.media, e.m2
+        FROM receita_gastos r
+        JOIN estatisticas_categoria e ON e.Categorias = r.Categorias AND e.Tipo = r.Tipo
+        WHERE r.Tipo = 'Passivo' {filtro}
+        ORDER BY r.id DESC
+        LIMIT :limite
+    """)
+    return pontuar(pd.read_sql(consulta, engine, params=params))
+
+def anomalias_desde(engine, desde_id, limite=50):
+    """Gastos gravados após desde_id que fogem do padrão da categoria (busca pela PK)"""
+    df = _consultar(engine, "AND r.id > :desde_id", {'desde_id': desde_id or 0, 'limite': limite})
+    return df[df['anomalia']]
+
+def anomalias_recentes(engine, ultimas=500):
+    """Gastos fora do padrão entre as últimas transações gravadas (sem varrer o livro-caixa)"""
+    df = _consultar(engine, "", {'limite': ultimas})
+    return df[df['anomalia']].sort_values('z', ascending=False)
+
+def ultimo_id(engine):
+    """Maior id do livro-caixa (marca o início de um turno do chat)"""
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT MAX(id) FROM receita_gastos")).scalar() or 0
+
+def descrever(linha):
+    """Texto curto de uma anomalia para o chat/dashboard"""
+    return (
+        f"{linha['Descrição']} — R$ {linha['Valor']:,.2f} em {linha['Categorias']} "
+        f"({linha['z']:.1f}σ acima da média de R$ {linha['media_categoria']:,.2f})"
+    )
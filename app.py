@@ -1,40 +1,18 @@
-from agno.agent import Agent, RunResponse
-from agno.models.google import Gemini
-from agno.tools.sql import SQLTools
 from datetime import datetime
 import streamlit as st
 import time
 import json
 import re
+import uuid
 
-# Importar módulos customizados
-from auth import check_auth, login_page, logout, get_user_info
-from database import get_database_engine, carregar_dados, invalidate_cache
-from config import get_api_keys, get_app_config, get_system_instructions
-from helpers import speetch_to_text, extract_text_from_transcription
+# Importar módulos customizados (leves: a tela de login só precisa destes)
+from auth import check_auth, login_page, logout, get_user_info, is_admin
+from config import get_app_config
+from prewarm import iniciar_prewarm
 
 # Configuração inicial
 config = get_app_config()
 
-# Cache do agente AI
-@st.cache_resource
-def get_ai_agent():
-    """Inicializa e retorna o agente AI com cache"""
-    api_keys = get_api_keys()
-    engine = get_database_engine()
-    
-    agente = Agent(
-        model=Gemini(id='gemini-2.0-flash-001', api_key=api_keys['GEMINI_API_KEY']),
-        add_history_to_messages=True,
-        markdown=False,
-        show_tool_calls=True,
-        retries=3,
-        system_message=get_system_instructions(),
-        tools=[SQLTools(db_engine=engine)],
-        store_events=True
-    )
-    return agente
-
 # Configuração do Streamlit
 st.set_page_config(
     page_icon=config['app_icon'], 
@@ -43,21 +21,108 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Pré-aquecer imports pesados, banco, snapshot e agente em background
+if config['inicializacao']['prewarm']:
+    iniciar_prewarm()
+
 # Verificar autenticação
 if not check_auth():
     login_page()
     st.stop()
 
-# Inicializar estado da sessão
-if "messages" not in st.session_state:
+# Módulos pesados só após o login (normalmente já carregados pelo prewarm)
+from database import get_database_engine, carregar_dados, invalidate_cache, get_versao_dados
+from historico import salvar_mensagem, carregar_mensagens
+from anomalias import ultimo_id, anomalias_desde, descrever
+from helpers import speetch_to_text
+from agente import get_ai_agent
+from tracing import span, registrar_metricas_llm, iniciar_exportador
+
+# Exportação periódica das métricas (se configurada)
+if config['metricas']['pasta_exportacao']:
+    iniciar_exportador(config['metricas']['pasta_exportacao'], config['metricas']['intervalo_exportacao'])
+
+# Histórico do chat: persistido no banco; a sessão guarda só a janela visível
+def carregar_janela():
+    """Carrega as mensagens mais recentes da conversa atual"""
+    try:
+        mensagens, tem_anteriores = carregar_mensagens(
+            get_database_engine(),
+            get_user_info()['username'],
+            st.session_state.sessao_id,
+            config['chat']['janela']
+        )
+    except Exception as e:
+        st.error(f"Erro ao carregar histórico: {e}")
+        mensagens, tem_anteriores = [], False
+    st.session_state.messages = mensagens
+    st.session_state.tem_anteriores = tem_anteriores
+    st.session_state.tem_posteriores = False
+
+def carregar_anteriores():
+    """Pagina mensagens mais antigas para o topo da janela"""
+    ids = [msg['id'] for msg in st.session_state.messages if 'id' in msg]
+    if not ids:
+        return
+    try:
+        anteriores, tem_anteriores = carregar_mensagens(
+            get_database_engine(),
+            get_user_info()['username'],
+            st.session_state.sessao_id,
+            config['chat']['pagina'],
+            antes_de_id=min(ids)
+        )
+    except Exception as e:
+        st.error(f"Erro ao carregar histórico: {e}")
+        return
+    mensagens = anteriores + st.session_state.messages
+    
+    # Teto de memória: descarta as mais recentes (voltam com "mais recentes")
+    if len(mensagens) > config['chat']['max_mensagens']:
+        mensagens = mensagens[:config['chat']['max_mensagens']]
+        st.session_state.tem_posteriores = True
+    st.session_state.messages = mensagens
+    st.session_state.tem_anteriores = tem_anteriores
+
+def registrar_mensagem(msg):
+    """Grava a mensagem no histórico e acrescenta na janela da sessão"""
+    try:
+        msg["id"] = salvar_mensagem(
+            get_database_engine(),
+            get_user_info()['username'],
+            st.session_state.sessao_id,
+            msg
+        )
+    except Exception as e:
+        st.error(f"Erro ao salvar mensagem: {e}")
+    
+    st.session_state.messages.append(msg)
+    
+    # Teto de memória: descarta as mais antigas (recarregáveis do banco)
+    excedente = len(st.session_state.messages) - config['chat']['max_mensagens']
+    if excedente > 0:
+        del st.session_state.messages[:excedente]
+        st.session_state.tem_anteriores = True
+
+def nova_conversa():
+    """Inicia uma nova conversa (a anterior continua gravada no banco)"""
+    st.session_state.sessao_id = uuid.uuid4().hex
+    st.query_params["chat"] = st.session_state.sessao_id
     st.session_state.messages = []
+    st.session_state.tem_anteriores = False
+    st.session_state.tem_posteriores = False
+
+# Inicializar estado da sessão (o id da conversa sobrevive a recarregar a página)
+if "sessao_id" not in st.session_state:
+    st.session_state.sessao_id = st.query_params.get("chat") or uuid.uuid4().hex
+if "messages" not in st.session_state:
+    carregar_janela()
 
 # Função para processar áudio
 def processar_audio(audio_file):
     """Processa áudio e retorna transcrição"""
     try:
-        audio_transcrito = speetch_to_text(audio=audio_file)
-        return extract_text_from_transcription(audio_transcrito)
+        return speetch_to_text(audio=audio_file)
     except Exception as e:
         st.error(f"Erro ao processar áudio: {e}")
         return "Erro na transcrição do áudio"
@@ -88,7 +153,10 @@ def processar_resposta(content, input_type="text"):
         "content": content,
         "input_type": input_type
     }
-    st.session_state.messages.append(user_msg)
+    # Nova mensagem sempre entra no fim da conversa
+    if st.session_state.tem_posteriores:
+        carregar_janela()
+    registrar_mensagem(user_msg)
     
     # Gerar resposta do assistente
     with st.chat_message("assistant"):
@@ -96,19 +164,32 @@ def processar_resposta(content, input_type="text"):
             # Obter agente
             agente = get_ai_agent()
             
+            # Versão dos dados antes do turno (detecta escritas de qualquer ferramenta)
+            engine = get_database_engine()
+            versao_antes = get_versao_dados(engine)
+            id_antes = ultimo_id(engine)
+            
             # Obter resposta
-            response = agente.run(content)
+            with span("agente.run", input_type=input_type):
+                response = agente.run(content)
+            registrar_metricas_llm(response)
             
-            # Extrair query SQL se houver
-            query = ""
-            if hasattr(response, 'tools') and response.tools:
-                query = response.tools[0].tool_args.get('query', '')
+            # Extrair queries SQL de todas as chamadas de ferramenta
+            queries = [
+                tool.tool_args.get('query', '')
+                for tool in (getattr(response, 'tools', None) or [])
+                if tool.tool_args and tool.tool_args.get('query')
+            ]
+            query = ";\n\n".join(queries)
+            if query:
                 with st.expander("🔍 Ver SQL executado"):
                     st.code(query, language='sql')
-                
-                # Invalidar cache se for operação de escrita
-                if any(cmd in query.upper() for cmd in ['INSERT', 'UPDATE', 'DELETE']):
-                    invalidate_cache()
+            
+            # Invalidar cache já nesta réplica se o turno escreveu no banco
+            # (as demais réplicas são avisadas pelo change feed)
+            versao_depois = get_versao_dados(engine)
+            if versao_depois[0] != versao_antes[0]:
+                invalidate_cache(snapshot_desatualizado=versao_depois[1] != versao_antes[1], aguardar=True)
             
             # Extrair conteúdo da resposta
             response_content = response.content if hasattr(response, 'content') else str(response)
@@ -117,6 +198,11 @@ def processar_resposta(content, input_type="text"):
             if input_type == "audio":
                 response_content = "🎤 Áudio processado: " + response_content
             
+            # Gastos recém-gravados fora do padrão da categoria (estatísticas mantidas pelo banco)
+            if versao_depois[0] != versao_antes[0]:
+                for _, linha in anomalias_desde(engine, id_antes).iterrows():
+                    response_content += f"\n\n⚠️ Gasto fora do padrão: {descrever(linha)}"
+            
             # Mostrar resposta com efeito de streaming
             placeholder = st.empty()
             full_text = ""
@@ -130,7 +216,7 @@ def processar_resposta(content, input_type="text"):
             assistant_msg = {"role": "assistant", "content": full_text}
             if query:
                 assistant_msg["query"] = query
-            st.session_state.messages.append(assistant_msg)
+            registrar_mensagem(assistant_msg)
             
         except Exception as e:
             st.error(f"❌ Erro ao processar: {e}")
@@ -138,6 +224,9 @@ def processar_resposta(content, input_type="text"):
 # Função da página de chat
 def chat_page():
     """Página principal do chat"""
+    # Mantém o id da conversa na URL (a navegação entre páginas o remove)
+    st.query_params["chat"] = st.session_state.sessao_id
+    
     # Sidebar com informações do usuário
     with st.sidebar:
         st.markdown(f"### 👤 {get_user_info()['username']}")
@@ -186,8 +275,24 @@ def chat_page():
         
         # Renderizar histórico
         with chat_container:
+            if st.session_state.tem_anteriores:
+                st.button(
+                    "⬆️ Carregar mensagens anteriores",
+                    key="chat_anteriores",
+                    on_click=carregar_anteriores,
+                    use_container_width=True
+                )
+            
             for msg in st.session_state.messages:
                 renderizar_mensagem(msg)
+            
+            if st.session_state.tem_posteriores:
+                st.button(
+                    "⬇️ Voltar às mensagens mais recentes",
+                    key="chat_recentes",
+                    on_click=carregar_janela,
+                    use_container_width=True
+                )
         
         # Área de input
         st.markdown("---")
@@ -209,8 +314,10 @@ def chat_page():
                 st.write(' ')
                 if st.button("📤 Enviar", key="send_audio", disabled=not audio_data, use_container_width=True):
                     if audio_data:
-                        transcricao = processar_audio(audio_data)
-                        processar_resposta(transcricao, "audio")
+                        # Latência total voz -> resposta
+                        with span("voz.resposta"):
+                            transcricao = processar_audio(audio_data)
+                            processar_resposta(transcricao, "audio")
                         st.rerun()
     
     with col2:
@@ -252,12 +359,12 @@ def chat_page():
         
         with col_btn1:
             if st.button("🔄 Atualizar", key="refresh_chat", use_container_width=True):
-                invalidate_cache()
+                invalidate_cache(snapshot_desatualizado=True, aguardar=True)
                 st.rerun()
         
         with col_btn2:
             if st.button("🗑️ Limpar Chat", key="clear_chat", use_container_width=True):
-                st.session_state.messages = []
+                nova_conversa()
                 st.rerun()
 
 # Configuração da navegação
@@ -266,6 +373,10 @@ pages = [
     st.Page("dashboard.py", title="Dashboard", icon="📊")
 ]
 
+# Painel de métricas apenas para o administrador
+if is_admin():
+    pages.append(st.Page("metricas.py", title="Métricas", icon="⏱️"))
+
 # Executar navegação
 pg = st.navigation(pages)
 pg.run()
\ No newline at end of file
@@ -0,0 +1,149 @@
+import logging
+from datetime import date
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+# Anos mantidos em receita_gastos (o atual incluso). Os anteriores são "fechados":
+# vão para receita_gastos_arquivo, sem os triggers e índices de texto da tabela
+# quente, e ficam somados em resumo_mensal_arquivo para os agregados do dashboard.
+ANOS_QUENTES = 2
+
+COLUNAS = "id, Data, Descrição, Valor, Categorias, Tipo"
+
+TABELA_SQL = """
+CREATE TABLE IF NOT EXISTS receita_gastos_arquivo (
+    id INTEGER PRIMARY KEY,
+    Data DATE NOT NULL,
+    Descrição TEXT NOT NULL,
+    Valor REAL NOT NULL,
+    Categorias TEXT NOT NULL,
+    Tipo TEXT NOT NULL
+)
+"""
+
+# Contagem/soma/mín/máx por mês: o suficiente para recompor totais e médias
+RESUMO_SQL = """
+CREATE TABLE IF NOT EXISTS resumo_mensal_arquivo (
+    MesAno TEXT NOT NULL,
+    Categorias TEXT NOT NULL,
+    Tipo TEXT NOT NULL,
+    qtd INTEGER NOT NULL,
+    total REAL NOT NULL,
+    minimo REAL NOT NULL,
+    maximo REAL NOT NULL,
+    PRIMARY KEY (MesAno, Categorias, Tipo)
+)
+"""
+
+INDICE_SQL = "CREATE INDEX IF NOT EXISTS idx_receita_gastos_arquivo_data ON receita_gastos_arquivo (Data)"
+
+# Histórico completo para leituras que atravessam períodos (escritas vão sempre em receita_gastos)
+_VIEW_SELECT = f"""
+    SELECT {COLUNAS} FROM receita_gastos
+    UNION ALL
+    SELECT {COLUNAS} FROM receita_gastos_arquivo
+"""
+
+DDL_SQLITE = [
+    TABELA_SQL,
+    RESUMO_SQL,
+    INDICE_SQL,
+    f"CREATE VIEW IF NOT EXISTS receita_gastos_completa AS {_VIEW_SELECT}"
+]
+
+DDL_POSTGRES = [
+    TABELA_SQL,
+    RESUMO_SQL,
+    INDICE_SQL,
+    f"CREATE OR REPLACE VIEW receita_gastos_completa AS {_VIEW_SELECT}"
+]
+
+# Soma os meses do ano ao resumo (um ano pode voltar a ser arquivado se
+# alguém lançar uma transação retroativa, então acumula em vez de sobrescrever)
+_RESUMIR = """
+INSERT INTO resumo_mensal_arquivo (MesAno, Categorias, Tipo, qtd, total, minimo, maximo)
+SELECT {mes}, Categorias, Tipo, COUNT(*), SUM(Valor), MIN(Valor), MAX(Valor)
+FROM {origem}
+GROUP BY 1, Categorias, Tipo
+ON CONFLICT (MesAno, Categorias, Tipo) DO UPDATE SET
+    qtd = resumo_mensal_arquivo.qtd + excluded.qtd,
+    total = resumo_mensal_arquivo.total + excluded.total,
+    minimo = {menor}(resumo_mensal_arquivo.minimo, excluded.minimo),
+    maximo = {maior}(resumo_mensal_arquivo.maximo, excluded.maximo)
+"""
+
+# PostgreSQL: um comando só, e o resumo soma apenas as linhas que ESTE comando
+# removeu. Duas réplicas arquivando juntas: a segunda espera o lock das linhas,
+# o DELETE dela não encontra mais nada e o resumo não é contado duas vezes
+_MOVER_POSTGRES = f"""
+WITH movidas AS (
+    DELETE FROM receita_gastos WHERE Data >= :inicio AND Data < :fim
+    RETURNING {COLUNAS}
+),
+arquivadas AS (
+    INSERT INTO receita_gastos_arquivo ({COLUNAS})
+    SELECT {COLUNAS} FROM movidas
+    RETURNING Data, Valor, Categorias, Tipo
+),
+resumidas AS (
+    {_RESUMIR.format(mes="TO_CHAR(Data, 'YYYY-MM')", origem='arquivadas', menor='LEAST', maior='GREATEST').strip()}
+    RETURNING 1
+)
+SELECT COUNT(*) FROM arquivadas
+"""
+
+# SQLite: o primeiro comando já pega o lock de escrita do banco, então as três
+# etapas do ano rodam serializadas; outro processo recebe "database is locked",
+# desfaz e encontra o ano já arquivado na próxima inicialização
+_ANO_SQLITE = "(SELECT * FROM receita_gastos WHERE Data >= :inicio AND Data < :fim)"
+
+def instalar_arquivo(conn):
+    """Cria a tabela de arquivo, o resumo mensal e a view receita_gastos_completa (idempotente)"""
+    for comando in (DDL_SQLITE if conn.dialect.name == 'sqlite' else DDL_POSTGRES):
+        conn.exec_driver_sql(comando)
+
+def _mover_sqlite(conn, periodo):
+    conn.execute(text(_RESUMIR.format(
+        mes="strftime('%Y-%m', Data)", origem=_ANO_SQLITE, menor='MIN', maior='MAX'
+    )), periodo)
+    conn.execute(text(f"""
+        INSERT INTO receita_gastos_arquivo ({COLUNAS})
+        SELECT {COLUNAS} FROM receita_gastos WHERE Data >= :inicio AND Data < :fim
+    """), periodo)
+    return conn.execute(
+        text("DELETE FROM receita_gastos WHERE Data >= :inicio AND Data < :fim"), periodo
+    ).rowcount
+
+def arquivar(conn, anos_quentes=ANOS_QUENTES):
+    """
+    Move de receita_gastos para o arquivo as transações dos anos fechados,
+    um ano por transação, somando ao resumo mensal só as linhas movidas.
+    As linhas saem da tabela quente por DELETE, então também deixam o índice
+    de busca e a linha de base das anomalias (que passa a refletir só os anos quentes).
+    Retorna o número de linhas arquivadas.
+    """
+    limite = date(date.today().year - anos_quentes + 1, 1, 1)
+    menor = conn.exec_driver_sql("SELECT MIN(Data) FROM receita_gastos").scalar()
+    if menor is None or str(menor) >= limite.isoformat():
+        return 0
+
+    arquivadas = 0
+    for ano in range(int(str(menor)[:4]), limite.year):
+        periodo = {'inicio': f"{ano}-01-01", 'fim': f"{ano + 1}-01-01"}
+        try:
+            if conn.dialect.name == 'sqlite':
+                movidas = _mover_sqlite(conn, periodo)
+            else:
+                movidas = conn.execute(text(_MOVER_POSTGRES), periodo).scalar()
+            conn.commit()
+        except Exception as e:
+            # Ex.: lock disputado com outro processo; o ano fica para a próxima inicialização
+            conn.rollback()
+            logger.warning("Arquivamento de %d interrompido: %s", ano, e)
+            continue
+        if movidas:
+            logger.info("%d transações de %d arquivadas", movidas, ano)
+        arquivadas += movidas
+
+    return arquivadas
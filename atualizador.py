@@ -0,0 +1,167 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+import streamlit as st
+
+from config import get_app_config
+from singleflight import get_single_flight
+from tracing import get_coletor, span
+
+logger = logging.getLogger(__name__)
+
+class _Entrada:
+    """Último valor bom de uma chave e o estado da revalidação"""
+
+    def __init__(self, funcao, ttl):
+        self.funcao = funcao
+        self.ttl = ttl
+        self.valor = None
+        self.pronta = False
+        self.atualizada_em = 0.0
+        self.geracao = 0  # Incrementada a cada notificação de escrita
+        self.suja = False
+        self.em_voo = None  # Future da revalidação em andamento
+
+    def vencida(self, agora):
+        return self.suja or agora - self.atualizada_em >= self.ttl
+
+class AtualizadorCache:
+    """
+    Stale-while-revalidate: quem lê recebe na hora o último valor bom; o
+    recálculo roda num worker quando o TTL vence (verificado também por uma
+    thread vigia, antes que alguém leia) ou quando chega uma notificação de
+    escrita. A cada valor novo rodam os aquecedores registrados para a chave
+    (ex.: agregados do dashboard), fora de qualquer requisição.
+    Um por processo; thread-safe.
+    """
+
+    def __init__(self, intervalo=30):
+        self.lock = threading.Lock()
+        self.entradas = {}
+        self.aquecedores = {}
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="atualizador")
+        self.intervalo = intervalo
+        self.vigia = threading.Thread(target=self._vigiar, name="atualizador-vigia", daemon=True)
+        self.vigia.start()
+
+    def servir(self, chave, funcao, ttl):
+        """
+        Valor da chave. Só o primeiro acesso (cache frio) calcula na thread
+        de quem pede; chamadas concorrentes nesse momento compartilham o cálculo.
+        """
+        with self.lock:
+            entrada = self.entradas.get(chave)
+            if entrada is None:
+                entrada = self.entradas[chave] = _Entrada(funcao, ttl)
+            entrada.funcao, entrada.ttl = funcao, ttl
+            if entrada.pronta:
+                if entrada.vencida(time.monotonic()):
+                    self._agendar(chave, entrada)
+                return entrada.valor
+
+        get_coletor().incrementar("atualizador.frio")
+        valor = get_single_flight().executar(f"atualizador:{chave}", self._carregar_frio, chave, entrada)
+        return valor
+
+    def _carregar_frio(self, chave, entrada):
+        with self.lock:
+            if entrada.pronta:
+                return entrada.valor
+            geracao = entrada.geracao
+        valor = entrada.funcao()
+        self._guardar(chave, entrada, valor, geracao)
+        return valor
+
+    def _guardar(self, chave, entrada, valor, geracao):
+        """Publica o valor novo e agenda os aquecedores (e outra rodada se houve escrita no meio)"""
+        with self.lock:
+            entrada.valor = valor
+            entrada.pronta = True
+            entrada.atualizada_em = time.monotonic()
+            entrada.suja = entrada.geracao != geracao
+            aquecedores = list(self.aquecedores.get(chave, {}).values())
+            if entrada.suja:
+                self._agendar(chave, entrada)
+        for aquecedor in aquecedores:
+            self.executor.submit(self._aquecer, chave, aquecedor, valor)
+
+    def _agendar(self, chave, entrada):
+        """Agenda a revalidação (uma por chave em voo); chamar com o lock"""
+        if entrada.em_voo is None:
+            entrada.em_voo = self.executor.submit(self._revalidar, chave, entrada)
+
+    def _revalidar(self, chave, entrada):
+        with self.lock:
+            geracao = entrada.geracao
+        try:
+            with span(f"atualizador.{chave}"):
+                valor = entrada.funcao()
+        except Exception as e:
+            # Mantém o último valor bom; a vigia tenta de novo no próximo ciclo
+            get_coletor().incrementar("atualizador.erros")
+            logger.warning(f"Atualizador: erro ao recalcular {chave}: {e}")
+            with self.lock:
+                entrada.em_voo = None
+                entrada.atualizada_em = time.monotonic()
+            return
+
+        get_coletor().incrementar("atualizador.revalidacoes")
+        with self.lock:
+            entrada.em_voo = None
+        self._guardar(chave, entrada, valor, geracao)
+
+    def _aquecer(self, chave, aquecedor, valor):
+        try:
+            with span(f"atualizador.aquecer.{aquecedor.__name__}"):
+                aquecedor(valor)
+        except Exception as e:
+            logger.warning(f"Atualizador: erro ao aquecer {aquecedor.__name__} ({chave}): {e}")
+
+    def _vigiar(self):
+        """Revalida as chaves vencidas pelo TTL antes que uma requisição as encontre"""
+        while True:
+            time.sleep(self.intervalo)
+            agora = time.monotonic()
+            with self.lock:
+                for chave, entrada in self.entradas.items():
+                    if entrada.pronta and entrada.vencida(agora):
+                        self._agendar(chave, entrada)
+
+    def registrar_aquecedor(self, chave, aquecedor):
+        """aquecedor(valor) roda no worker após cada valor novo da chave (idempotente por nome)"""
+        with self.lock:
+            self.aquecedores.setdefault(chave, {})[f"{aquecedor.__module__}.{aquecedor.__qualname__}"] = aquecedor
+            entrada = self.entradas.get(chave)
+            valor = entrada.valor if entrada is not None and entrada.pronta else None
+            pronta = entrada is not None and entrada.pronta
+        if pronta:
+            self.executor.submit(self._aquecer, chave, aquecedor, valor)
+
+    def invalidar(self):
+        """Notificação de escrita: marca tudo como vencido e revalida em background"""
+        with self.lock:
+            for chave, entrada in self.entradas.items():
+                entrada.geracao += 1
+                entrada.suja = True
+                if entrada.pronta:
+                    self._agendar(chave, entrada)
+
+    def aguardar(self, timeout=None):
+        """
+        Espera as revalidações em andamento (leitura das próprias escritas),
+        inclusive a rodada extra agendada quando a escrita chegou no meio de uma.
+        """
+        prazo = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self.lock:
+                pendentes = [entrada.em_voo for entrada in self.entradas.values() if entrada.em_voo is not None]
+            restante = None if prazo is None else prazo - time.monotonic()
+            if not pendentes or (restante is not None and restante <= 0):
+                return
+            wait(pendentes, timeout=restante)
+
+@st.cache_resource
+def get_atualizador():
+    """Retorna o atualizador de caches do processo com cache de recurso"""
+    return AtualizadorCache(get_app_config()['atualizador']['intervalo'])
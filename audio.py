@@ -0,0 +1,127 @@
+import io
+import wave
+import numpy as np
+
+# Whisper trabalha internamente em 16 kHz mono: enviar mais que isso só gasta upload
+TAXA_ALVO = 16000
+
+# Silêncio: janelas de 20 ms abaixo deste nível (relativo ao pico) são cortadas
+JANELA_MS = 20
+LIMIAR_SILENCIO_DB = -35.0
+MARGEM_MS = 200
+
+def _ler_wav(audio_bytes):
+    """Decodifica WAV PCM em (amostras float32 [-1, 1] por canal, taxa). None se não for WAV"""
+    try:
+        with wave.open(io.BytesIO(audio_bytes), 'rb') as wav:
+            canais = wav.getnchannels()
+            largura = wav.getsampwidth()
+            taxa = wav.getframerate()
+            frames = wav.readframes(wav.getnframes())
+    except (wave.Error, EOFError):
+        return None
+
+    if largura == 1:
+        amostras = (np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128) / 128
+    elif largura == 2:
+        amostras = np.frombuffer(frames, dtype='<i2').astype(np.float32) / 32768
+    elif largura == 4:
+        amostras = np.frombuffer(frames, dtype='<i4').astype(np.float32) / 2147483648
+    else:
+        return None
+
+    return amostras.reshape(-1, canais), taxa
+
+def para_mono(amostras):
+    """Downmix: média dos canais"""
+    return amostras.mean(axis=1) if amostras.ndim == 2 else amostras
+
+def cortar_silencio(sinal, taxa):
+    """Remove silêncio do início e do fim (mantém uma pequena margem)"""
+    janela = max(int(taxa * JANELA_MS / 1000), 1)
+    n_janelas = len(sinal) // janela
+    if n_janelas == 0:
+        return sinal
+
+    energia = np.sqrt(np.mean(sinal[:n_janelas * janela].reshape(n_janelas, janela) ** 2, axis=1))
+    pico = energia.max()
+    if pico <= 0:
+        return sinal[:0]
+
+    ativas = np.flatnonzero(20 * np.log10(np.maximum(energia, 1e-10) / pico) > LIMIAR_SILENCIO_DB)
+    margem = int(taxa * MARGEM_MS / 1000)
+    inicio = max(ativas[0] * janela - margem, 0)
+    fim = min((ativas[-1] + 1) * janela + margem, len(sinal))
+    return sinal[inicio:fim]
+
+def _passa_baixa(sinal, corte_relativo, taps=63):
+    """FIR sinc janelado (anti-aliasing antes de reduzir a taxa)"""
+    n = np.arange(taps) - (taps - 1) / 2
+    filtro = np.sinc(2 * corte_relativo * n) * np.hamming(taps)
+    filtro /= filtro.sum()
+    return np.convolve(sinal, filtro, mode='same')
+
+def reamostrar(sinal, taxa, taxa_alvo=TAXA_ALVO):
+    """Converte a taxa de amostragem (scipy se disponível; senão FIR + interpolação)"""
+    if taxa == taxa_alvo or len(sinal) == 0:
+        return sinal
+
+    try:
+        from math import gcd
+        from scipy.signal import resample_poly
+        divisor = gcd(taxa, taxa_alvo)
+        return resample_poly(sinal, taxa_alvo // divisor, taxa // divisor).astype(np.float32)
+    except ImportError:
+        pass
+
+    if taxa_alvo < taxa:
+        sinal = _passa_baixa(sinal, 0.5 * taxa_alvo / taxa)
+
+    duracao = len(sinal) / taxa
+    t_origem = np.arange(len(sinal)) / taxa
+    t_alvo = np.arange(int(duracao * taxa_alvo)) / taxa_alvo
+    return np.interp(t_alvo, t_origem, sinal).astype(np.float32)
+
+def codificar(sinal, taxa):
+    """
+    Codifica mono 16 bits: FLAC (sem perdas, ~50% do WAV) se o soundfile
+    estiver instalado, senão WAV. Retorna (bytes, extensão, mime).
+    """
+    pcm = (np.clip(sinal, -1, 1) * 32767).astype('<i2')
+
+    try:
+        import soundfile
+        buffer = io.BytesIO()
+        soundfile.write(buffer, pcm, taxa, format='FLAC')
+        return buffer.getvalue(), 'flac', 'audio/flac'
+    except ImportError:
+        pass
+
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(taxa)
+        wav.writeframes(pcm.tobytes())
+    return buffer.getvalue(), 'wav', 'audio/wav'
+
+def preparar_audio(audio_bytes, nome, mime):
+    """
+    Pipeline antes do Whisper: corta silêncio, converte para mono 16 kHz e
+    recodifica. Formatos que não são WAV PCM seguem sem alteração.
+    Retorna (bytes, nome, mime).
+    """
+    decodificado = _ler_wav(audio_bytes)
+    if decodificado is None:
+        return audio_bytes, nome, mime
+
+    amostras, taxa = decodificado
+    sinal = cortar_silencio(para_mono(amostras), taxa)
+    if len(sinal) == 0:
+        return audio_bytes, nome, mime
+
+    sinal = reamostrar(sinal, taxa)
+    dados, extensao, mime_final = codificar(sinal, TAXA_ALVO)
+
+    base = nome.rsplit('.', 1)[0] if nome else 'audio'
+    return dados, f"{base}.{extensao}", mime_final
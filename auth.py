@@ -1,11 +1,168 @@
 import streamlit as st
+import base64
 import hashlib
+import hmac
+import json
+import os
+import secrets
 from functools import wraps
 import time
 
+from config import get_app_config
+
+# Formato do hash armazenado: pbkdf2_sha256$<iterações>$<salt hex>$<hash hex>
+ALGORITMO_HASH = 'pbkdf2_sha256'
+ITERACOES_PADRAO = 600_000
+
+def gerar_hash_senha(senha, iteracoes=ITERACOES_PADRAO):
+    """Gera o hash para colocar em auth.password_hash no secrets.toml"""
+    salt = secrets.token_bytes(16)
+    derivada = hashlib.pbkdf2_hmac('sha256', senha.encode(), salt, iteracoes)
+    return f"{ALGORITMO_HASH}${iteracoes}${salt.hex()}${derivada.hex()}"
+
+def verificar_senha(senha, armazenada):
+    """Compara a senha com o hash (ou texto puro legado) em tempo constante"""
+    if armazenada.startswith(f"{ALGORITMO_HASH}$"):
+        try:
+            _, iteracoes, salt, esperado = armazenada.split('$')
+            derivada = hashlib.pbkdf2_hmac('sha256', senha.encode(), bytes.fromhex(salt), int(iteracoes))
+        except ValueError:
+            return False
+        return hmac.compare_digest(derivada.hex(), esperado)
+    return hmac.compare_digest(senha.encode(), armazenada.encode())
+
+def _credenciais():
+    """
+    Retorna {usuario: senha armazenada} a partir do secrets
+    (password_hash tem prioridade sobre password). None se não houver [auth].
+    """
+    try:
+        auth = st.secrets["auth"]
+        credenciais = {auth["username"]: auth.get("password_hash") or auth["password"]}
+    except Exception:
+        return None
+    credenciais.setdefault(
+        auth.get("demo_username", "demo"),
+        auth.get("demo_password_hash") or auth.get("demo_password", "demo")
+    )
+    return credenciais
+
+@st.cache_resource
+def _chave_tokens():
+    """
+    Chave HMAC dos tokens. Deve ser a mesma em todas as réplicas:
+    auth.TOKEN_SECRET (ou AUTH_TOKEN_SECRET). Sem ela, a chave é aleatória
+    por processo (tokens valem só neste processo); nunca é derivada das
+    credenciais, para um token vazado não servir de oráculo para a senha.
+    """
+    try:
+        segredo = st.secrets.get("auth", {}).get("TOKEN_SECRET")
+    except Exception:
+        segredo = None
+    segredo = segredo or os.getenv('AUTH_TOKEN_SECRET')
+    if segredo:
+        return segredo.encode()
+    return secrets.token_bytes(32)
+
+def _geracao(usuario):
+    """Geração das sessões do usuário no banco (None se não for possível ler)"""
+    from database import get_database_engine
+    from sessoes import ler_geracao
+
+    try:
+        return ler_geracao(get_database_engine(), usuario)
+    except Exception:
+        return None
+
+def _b64(dados):
+    return base64.urlsafe_b64encode(dados).rstrip(b'=').decode()
+
+def _b64_decodificar(texto):
+    return base64.urlsafe_b64decode(texto + '=' * (-len(texto) % 4))
+
+def _assinar(corpo):
+    return _b64(hmac.new(_chave_tokens(), corpo.encode(), hashlib.sha256).digest())
+
+def emitir_token(usuario):
+    """Token assinado e com validade: <payload base64>.<HMAC-SHA256 base64>"""
+    agora = int(time.time())
+    payload = {
+        'u': usuario,
+        'iat': agora,
+        'exp': agora + get_app_config()['sessao']['validade_token'],
+        'g': _geracao(usuario)  # Revogado quando o logout incrementa a geração
+    }
+    corpo = _b64(json.dumps(payload, separators=(',', ':')).encode())
+    return f"{corpo}.{_assinar(corpo)}"
+
+def verificar_token(token):
+    """Retorna o payload se a assinatura confere, o token não expirou nem foi revogado; senão None"""
+    try:
+        corpo, assinatura = token.split('.')
+        if not hmac.compare_digest(assinatura, _assinar(corpo)):
+            return None
+        payload = json.loads(_b64_decodificar(corpo))
+    except (ValueError, TypeError):
+        return None
+    if payload.get('exp', 0) < time.time():
+        return None
+    geracao = payload.get('g')
+    if geracao is None or geracao != _geracao(payload.get('u')):
+        return None
+    return payload
+
+def _iniciar_sessao(usuario, token, payload):
+    """Preenche o session_state a partir de um token válido"""
+    st.session_state['authenticated'] = True
+    st.session_state['username'] = usuario
+    st.session_state['login_time'] = payload['iat']
+    st.session_state['token'] = token
+    st.session_state['token_exp'] = payload['exp']
+    st.query_params['token'] = token
+
+def _limpar_sessao():
+    for key in ['authenticated', 'username', 'login_time', 'token', 'token_exp']:
+        if key in st.session_state:
+            del st.session_state[key]
+    if 'token' in st.query_params:
+        del st.query_params['token']
+
 def check_auth():
-    """Verifica se usuário está autenticado"""
-    return st.session_state.get('authenticated', False)
+    """
+    Verifica se usuário está autenticado: pelo session_state ou, numa sessão
+    nova (reconexão, outra réplica), pelo token assinado da URL.
+    """
+    if st.session_state.get('authenticated', False):
+        if st.session_state.get('token_exp', float('inf')) < time.time():
+            _limpar_sessao()
+            return False
+        # A navegação entre páginas limpa os query params: recoloca o token
+        token = st.session_state.get('token')
+        if token and st.query_params.get('token') != token:
+            st.query_params['token'] = token
+        return True
+
+    token = st.query_params.get('token')
+    if token:
+        payload = verificar_token(token)
+        if payload:
+            _iniciar_sessao(payload['u'], token, payload)
+            return True
+        del st.query_params['token']
+    return False
+
+def autenticar(username, password, demo=False):
+    """Valida as credenciais; retorna True se o login é aceito"""
+    credenciais = _credenciais()
+
+    # Fallback para desenvolvimento local (sem secrets)
+    if credenciais is None:
+        return hmac.compare_digest(f"{username}:{password}".encode(), b"admin:admin123")
+
+    armazenada = credenciais.get(username)
+    if armazenada is not None and verificar_senha(password, armazenada):
+        return True
+    return demo and username == "demo" and password == "demo"
 
 def login_page():
     """Página de login"""
@@ -71,43 +228,20 @@ def login_page():
             
             if submit or demo:
                 # Validar credenciais
-                try:
-                    # Credenciais do secrets
-                    stored_user = st.secrets["auth"]["username"]
-                    stored_pass = st.secrets["auth"]["password"]
-                    
-                    # Credenciais demo
-                    demo_user = st.secrets.get("auth", {}).get("demo_username", "demo")
-                    demo_pass = st.secrets.get("auth", {}).get("demo_password", "demo")
-                    
-                    # Verificar login
-                    if (username == stored_user and password == stored_pass) or \
-                       (username == demo_user and password == demo_pass) or \
-                       (demo and username == "demo" and password == "demo"):
-                        
-                        st.session_state['authenticated'] = True
-                        st.session_state['username'] = username
-                        st.session_state['login_time'] = time.time()
-                        
-                        st.success("✅ Login realizado com sucesso!")
-                        st.balloons()
-                        time.sleep(1)
-                        st.rerun()
+                if autenticar(username, password, demo):
+                    token = emitir_token(username)
+                    payload = verificar_token(token)
+                    # Sem a geração das sessões (banco indisponível) o token não valeria
+                    if payload is None:
+                        st.error("❌ Não foi possível iniciar a sessão, tente novamente.")
                     else:
-                        st.error("❌ Credenciais inválidas!")
-                        st.caption("Dica: Use demo/demo para testar")
-                        
-                except Exception as e:
-                    # Fallback para desenvolvimento local
-                    if username == "admin" and password == "admin123":
-                        st.session_state['authenticated'] = True
-                        st.session_state['username'] = username
-                        st.session_state['login_time'] = time.time()
-                        st.success("✅ Login local realizado!")
-                        time.sleep(1)
+                        _iniciar_sessao(username, token, payload)
                         st.rerun()
-                    else:
-                        st.error("❌ Erro na autenticação. Use admin/admin123 localmente.")
+                elif _credenciais() is None:
+                    st.error("❌ Erro na autenticação. Use admin/admin123 localmente.")
+                else:
+                    st.error("❌ Credenciais inválidas!")
+                    st.caption("Dica: Use demo/demo para testar")
         
         st.markdown('</div>', unsafe_allow_html=True)
         
@@ -126,12 +260,30 @@ def require_auth(func):
     return wrapper
 
 def logout():
-    """Realiza logout do usuário"""
-    for key in ['authenticated', 'username', 'login_time']:
-        if key in st.session_state:
-            del st.session_state[key]
+    """Realiza logout do usuário: revoga os tokens emitidos e remove o da URL"""
+    usuario = st.session_state.get('username')
+    if usuario:
+        from database import get_database_engine
+        from sessoes import revogar_sessoes
+
+        try:
+            revogar_sessoes(get_database_engine(), usuario)
+        except Exception as e:
+            st.error(f"Erro ao encerrar as sessões: {e}")
+    _limpar_sessao()
     st.rerun()
 
+def is_admin():
+    """Verifica se o usuário logado é o administrador (não o demo)"""
+    if not check_auth():
+        return False
+    try:
+        admin_user = st.secrets["auth"]["username"]
+    except Exception:
+        # Fallback para desenvolvimento local
+        admin_user = "admin"
+    return st.session_state.get('username') == admin_user
+
 def get_user_info():
     """Retorna informações do usuário logado"""
     if check_auth():
@@ -140,4 +292,9 @@ def get_user_info():
             'login_time': st.session_state.get('login_time', time.time()),
             'session_duration': time.time() - st.session_state.get('login_time', time.time())
         }
-    return None
\ No newline at end of file
+    return None
+
+if __name__ == "__main__":
+    # Uso: python auth.py "minha senha"  ->  cole em auth.password_hash
+    import sys
+    print(gerar_hash_senha(sys.argv[1]))
@@ -0,0 +1 @@
+"""Benchmarks dos caminhos quentes do economiza.ai"""
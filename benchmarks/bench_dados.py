@@ -0,0 +1,18 @@
+"""Benchmarks de leitura do livro-caixa (ler_dados, o que o atualizador executa a cada recarga)"""
+
+from database import ler_dados
+from snapshot import remover_snapshot, salvar_snapshot
+
+def test_carregar_dados_frio(benchmark, engine, n_linhas):
+    """Cold start: sem snapshot, leitura completa via pd.read_sql"""
+    def setup():
+        remover_snapshot()
+
+    benchmark.pedantic(ler_dados, args=(engine,), setup=setup, rounds=5)
+
+def test_carregar_dados_snapshot(benchmark, engine, df_ledger, n_linhas):
+    """Com snapshot colunar válido: memory map + delta vazio"""
+    def setup():
+        salvar_snapshot(df_ledger, versao_reescrita=df_ledger.attrs['versao_dados'][1])
+
+    benchmark.pedantic(ler_dados, args=(engine,), setup=setup, rounds=5)
@@ -0,0 +1,27 @@
+"""Benchmarks das funções de preparo e renderização do dashboard"""
+
+from datetime import date
+
+import dashboard
+import previsao
+
+def test_calcular_metricas(benchmark, df_ledger, n_linhas):
+    benchmark(dashboard.calcular_metricas.__wrapped__, df_ledger)
+
+def test_preparar_dados_pizza(benchmark, df_ledger, n_linhas):
+    benchmark(dashboard.preparar_dados_pizza.__wrapped__, df_ledger)
+
+def test_preparar_dados_evolucao_mensal(benchmark, df_ledger, n_linhas):
+    benchmark(dashboard.preparar_dados_evolucao.__wrapped__, df_ledger, 'M')
+
+def test_preparar_dados_evolucao_diaria(benchmark, df_ledger, n_linhas):
+    """Pior caso: resolução diária sobre todo o histórico"""
+    benchmark(dashboard.preparar_dados_evolucao.__wrapped__, df_ledger, 'D')
+
+def test_criar_tabela_transacoes(benchmark, df_ledger, n_linhas):
+    benchmark(dashboard.criar_tabela_transacoes, df_ledger)
+
+def test_calcular_previsao(benchmark, df_ledger, n_linhas):
+    """Rollup mensal + projeção sazonal de 6 meses (sem cache)"""
+    hoje = date.today()
+    benchmark(previsao.calcular_previsao.__wrapped__, df_ledger, None, hoje.year * 12 + hoje.month - 1)
@@ -0,0 +1,58 @@
+"""
+Reruns completos de página via AppTest (Streamlit headless).
+Gemini e Groq são substituídos pelos stubs de conftest.stubs_llm.
+"""
+
+import pytest
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+from conftest import PASTA_BENCH, RAIZ_REPO
+
+TIMEOUT = 120
+
+def _app(arquivo, caminho_banco):
+    """Cria o AppTest já autenticado e apontando para o banco sintético"""
+    st.cache_data.clear()
+    st.cache_resource.clear()
+
+    at = AppTest.from_file(str(RAIZ_REPO / arquivo), default_timeout=TIMEOUT)
+    at.secrets['database'] = {
+        'SQLITE_PATH': caminho_banco.as_posix(),
+        'SNAPSHOT_PATH': (PASTA_BENCH / f'{caminho_banco.stem}.arrow').as_posix()
+    }
+    at.secrets['api_keys'] = {'GEMINI_API_KEY': 'bench', 'GROQ_API_KEY': 'bench'}
+    at.session_state['authenticated'] = True
+    at.session_state['username'] = 'bench'
+    at.session_state['login_time'] = 0.0
+    return at
+
+def _rodar(at):
+    at.run()
+    assert not at.exception, at.exception
+
+@pytest.mark.usefixtures('stubs_llm')
+def test_rerun_dashboard(benchmark, caminho_banco, n_linhas):
+    """Rerun do dashboard com caches quentes (o caso comum de interação)"""
+    at = _app('dashboard.py', caminho_banco)
+    _rodar(at)
+    benchmark.pedantic(_rodar, args=(at,), rounds=5)
+
+@pytest.mark.usefixtures('stubs_llm')
+def test_rerun_chat_page(benchmark, caminho_banco, n_linhas):
+    """Rerun da página de chat (sidebar + transações recentes)"""
+    at = _app('app.py', caminho_banco)
+    _rodar(at)
+    benchmark.pedantic(_rodar, args=(at,), rounds=5)
+
+@pytest.mark.usefixtures('stubs_llm')
+def test_turno_chat_texto(benchmark, caminho_banco, n_linhas):
+    """Turno completo de chat por texto, com o agente respondendo localmente"""
+    at = _app('app.py', caminho_banco)
+    _rodar(at)
+
+    def turno():
+        at.chat_input[0].set_value('gastei 20 reais no mercado')
+        _rodar(at)
+
+    benchmark.pedantic(turno, rounds=5)
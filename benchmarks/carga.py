@@ -0,0 +1,588 @@
+"""
+Teste de carga: N sessões simultâneas contra um servidor Streamlit local,
+falando o mesmo protocolo do navegador (websocket + BackMsg/ForwardMsg).
+
+Cada sessão faz login e depois alterna, com tempo de reflexão entre as
+ações, turnos de chat por texto, turnos por áudio (upload + envio) e visitas
+ao dashboard. Gemini, Groq e a latência das ferramentas SQL são stand-ins
+locais (benchmarks/carga_servidor.py) com latência sorteada.
+
+    python -m benchmarks.carga --sessoes 20 --duracao 60
+    python -m benchmarks.carga --sessoes 50 --linhas 100000 \\
+        --latencia-modelo lognormal:1500:0.5 --json carga.json
+
+Relata vazão, p50/p95 dos reruns por ação, contenção de lock no banco e
+memória do servidor por sessão.
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import math
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+import wave
+from pathlib import Path
+
+import numpy as np
+import requests
+
+# psutil é opcional: sem ele a memória do servidor vem de /proc (Linux)
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+RAIZ_REPO = Path(__file__).resolve().parent.parent
+
+# Credenciais das sessões simuladas (gravadas no secrets do servidor de carga)
+USUARIO = 'carga'
+SENHA = 'carga'
+
+# Rótulos dos widgets que as sessões acionam (os mesmos do app)
+ROTULO_USUARIO = 'Usuário'
+ROTULO_SENHA = 'Senha'
+ROTULO_ENTRAR = '🔓 Entrar'
+ROTULO_AUDIO = 'Gravar mensagem de voz'
+ROTULO_ENVIAR_AUDIO = '📤 Enviar'
+PAGINA_CHAT = 'Chat'
+PAGINA_DASHBOARD = 'Dashboard'
+
+MENSAGENS = [
+    'gastei 20 reais no mercado',
+    'paguei 35 na farmácia',
+    'uber de 18 reais',
+    'comprei um livro por 50',
+    'quanto gastei este mês?',
+    'quanto gastei com alimentação?'
+]
+
+class Distribuicao:
+    """
+    Latência sorteada (especificação em milissegundos, sorteio em segundos):
+        fixa:200 | uniforme:100:300 | exponencial:500 | lognormal:900:0.4 (mediana, sigma)
+    """
+
+    PARAMETROS = {'fixa': 1, 'uniforme': 2, 'exponencial': 1, 'lognormal': 2}
+
+    def __init__(self, especificacao):
+        tipo, *parametros = especificacao.split(':')
+        if self.PARAMETROS.get(tipo) != len(parametros):
+            raise ValueError(f"distribuição inválida: {especificacao}")
+        self.especificacao = especificacao
+        self.tipo = tipo
+        self.parametros = [float(p) for p in parametros]
+        self.rng = random.Random()
+
+    def sortear(self):
+        """Uma amostra, em segundos"""
+        a, *resto = self.parametros
+        if self.tipo == 'fixa':
+            ms = a
+        elif self.tipo == 'uniforme':
+            ms = self.rng.uniform(a, resto[0])
+        elif self.tipo == 'exponencial':
+            ms = self.rng.expovariate(1 / a) if a > 0 else 0
+        else:
+            ms = a * math.exp(self.rng.gauss(0, resto[0]))
+        return max(ms, 0) / 1000
+
+    def __str__(self):
+        return self.especificacao
+
+def _mix(texto):
+    """'texto=6,audio=2,dashboard=2' -> pesos por ação"""
+    pesos = {}
+    for parte in texto.split(','):
+        acao, peso = parte.split('=')
+        if acao not in ('texto', 'audio', 'dashboard'):
+            raise ValueError(f"ação desconhecida: {acao}")
+        pesos[acao] = float(peso)
+    return pesos
+
+def gerar_audio(rng, segundos=2.0, taxa=16000):
+    """WAV PCM com um tom entre silêncios (frequência sorteada: cada envio tem hash próprio)"""
+    t = np.arange(int(segundos * taxa)) / taxa
+    sinal = 0.4 * np.sin(2 * np.pi * rng.uniform(200, 800) * t)
+    sinal[(t < 0.3) | (t > segundos - 0.3)] = 0
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as arquivo:
+        arquivo.setnchannels(1)
+        arquivo.setsampwidth(2)
+        arquivo.setframerate(taxa)
+        arquivo.writeframes((sinal * 32767).astype('<i2').tobytes())
+    return buffer.getvalue()
+
+class SessaoSimulada:
+    """Uma aba do navegador: websocket, estado dos widgets e página atual"""
+
+    def __init__(self, porta, timeout):
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        self.porta = porta
+        self.timeout = timeout
+        self.ws = None
+        self.http = requests.Session()
+        self.xsrf = None
+        self.session_id = None
+        self.widgets = {}       # (tipo, rótulo) -> id do widget
+        self.paginas = {}       # nome da página -> page_script_hash
+        self.pagina = ''
+        self.query_string = ''
+        self.estados = {}       # id -> WidgetState com valor que persiste entre reruns
+        self.erros = []         # exceções e st.error exibidos pelo app
+        self.medicoes = []      # (rótulo, segundos, erros no rerun)
+        self.falha = None
+        # Streamlit recente envia o chat_input em chat_input_value; versões antigas, string_trigger_value
+        campos = WidgetState.DESCRIPTOR.fields_by_name
+        self.campo_chat = 'chat_input_value' if 'chat_input_value' in campos else 'string_trigger_value'
+
+    async def conectar(self):
+        import websockets
+
+        # Como o navegador: o health check entrega o cookie XSRF, que segue no websocket e nos uploads
+        await asyncio.to_thread(self.http.get, f"http://127.0.0.1:{self.porta}/_stcore/health", timeout=self.timeout)
+        self.xsrf = self.http.cookies.get('_streamlit_xsrf')
+        self.ws = await websockets.connect(
+            f"ws://127.0.0.1:{self.porta}/_stcore/stream",
+            subprotocols=['streamlit', self.xsrf] if self.xsrf else ['streamlit'],
+            max_size=None,
+            open_timeout=self.timeout
+        )
+        await self.rerun('conexao')
+
+    async def fechar(self):
+        if self.ws is not None:
+            await self.ws.close()
+        self.http.close()
+
+    async def _receber(self):
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        msg = ForwardMsg()
+        msg.ParseFromString(await asyncio.wait_for(self.ws.recv(), self.timeout))
+        self._processar(msg)
+        return msg
+
+    def _processar(self, msg):
+        from streamlit.proto.Alert_pb2 import Alert
+
+        tipo = msg.WhichOneof('type')
+        if tipo == 'new_session':
+            if msg.new_session.HasField('initialize'):
+                self.session_id = msg.new_session.initialize.session_id
+            self.pagina = msg.new_session.page_script_hash
+            self._registrar_paginas(msg.new_session.app_pages)
+        elif tipo == 'navigation':
+            self._registrar_paginas(msg.navigation.app_pages)
+            self.pagina = msg.navigation.page_script_hash or self.pagina
+        elif tipo == 'page_info_changed':
+            self.query_string = msg.page_info_changed.query_string
+        elif tipo == 'delta' and msg.delta.WhichOneof('type') == 'new_element':
+            elemento = msg.delta.new_element
+            tipo_elemento = elemento.WhichOneof('type')
+            if tipo_elemento == 'exception':
+                self.erros.append(f"{elemento.exception.type}: {elemento.exception.message}")
+            elif tipo_elemento == 'alert' and elemento.alert.format == Alert.ERROR:
+                self.erros.append(elemento.alert.body)
+            elif tipo_elemento:
+                widget = getattr(elemento, tipo_elemento)
+                widget_id = getattr(widget, 'id', '')
+                if widget_id:
+                    rotulo = getattr(widget, 'label', '') or getattr(widget, 'placeholder', '')
+                    self.widgets[(tipo_elemento, rotulo)] = widget_id
+
+    def _registrar_paginas(self, paginas):
+        for pagina in paginas:
+            self.paginas[pagina.page_name] = pagina.page_script_hash
+
+    def widget(self, tipo, rotulo=None):
+        """Id de um widget já renderizado (pelo tipo e, opcionalmente, rótulo)"""
+        for (tipo_widget, rotulo_widget), widget_id in self.widgets.items():
+            if tipo_widget == tipo and (rotulo is None or rotulo_widget == rotulo):
+                return widget_id
+        raise LookupError(f"widget não encontrado: {tipo} {rotulo or ''}")
+
+    async def rerun(self, rotulo, gatilhos=(), pagina=None):
+        """
+        Envia um rerun como o navegador faz após uma interação e espera o script
+        terminar (inclusive os st.rerun() do app). Registra a duração.
+        """
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        msg = BackMsg()
+        estado = msg.rerun_script
+        if pagina is not None:
+            # Trocar de página limpa os query params, como no navegador
+            estado.page_script_hash = self.paginas[pagina]
+        else:
+            estado.page_script_hash = self.pagina
+            estado.query_string = self.query_string
+        estado.widget_states.widgets.extend(list(self.estados.values()) + list(gatilhos))
+
+        erros_antes = len(self.erros)
+        inicio = time.perf_counter()
+        await self.ws.send(msg.SerializeToString())
+        while True:
+            resposta = await self._receber()
+            if (resposta.WhichOneof('type') == 'script_finished'
+                    and resposta.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN):
+                break
+        self.medicoes.append((rotulo, time.perf_counter() - inicio, len(self.erros) - erros_antes))
+
+    async def login(self):
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        usuario = self.widget('text_input', ROTULO_USUARIO)
+        senha = self.widget('text_input', ROTULO_SENHA)
+        entrar = self.widget('button', ROTULO_ENTRAR)
+        await self.rerun('login', [
+            WidgetState(id=usuario, string_value=USUARIO),
+            WidgetState(id=senha, string_value=SENHA),
+            WidgetState(id=entrar, trigger_value=True)
+        ])
+
+    async def turno_texto(self, texto):
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        estado = WidgetState(id=self.widget('chat_input'))
+        getattr(estado, self.campo_chat).data = texto
+        await self.rerun('texto', [estado])
+
+    async def turno_audio(self, audio):
+        from streamlit.proto.Common_pb2 import FileUploaderState
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        widget = self.widget('audio_input', ROTULO_AUDIO)
+        info = await self._enviar_arquivo('voz.wav', audio)
+        self.estados[widget] = WidgetState(
+            id=widget, file_uploader_state_value=FileUploaderState(uploaded_file_info=[info])
+        )
+        try:
+            # Com o áudio gravado, o botão Enviar fica habilitado
+            await self.rerun('audio.gravacao')
+            await self.rerun('audio.envio', [WidgetState(id=self.widget('button', ROTULO_ENVIAR_AUDIO), trigger_value=True)])
+        finally:
+            # O usuário descarta a gravação depois de enviar
+            del self.estados[widget]
+
+    async def _enviar_arquivo(self, nome, dados):
+        """Pede a URL de upload pelo websocket e envia o arquivo por HTTP, como o st.audio_input"""
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.Common_pb2 import UploadedFileInfo
+
+        msg = BackMsg()
+        pedido = msg.file_urls_request
+        pedido.request_id = uuid.uuid4().hex
+        pedido.file_names.append(nome)
+        pedido.session_id = self.session_id
+        await self.ws.send(msg.SerializeToString())
+
+        while True:
+            resposta = await self._receber()
+            if (resposta.WhichOneof('type') == 'file_urls_response'
+                    and resposta.file_urls_response.response_id == pedido.request_id):
+                break
+
+        urls = resposta.file_urls_response.file_urls[0]
+        url = urls.upload_url if urls.upload_url.startswith('http') else f"http://127.0.0.1:{self.porta}{urls.upload_url}"
+        envio = await asyncio.to_thread(
+            self.http.put, url,
+            files={'file': (nome, dados, 'audio/wav')},
+            headers={'X-Xsrftoken': self.xsrf} if self.xsrf else {},
+            timeout=self.timeout
+        )
+        envio.raise_for_status()
+
+        info = UploadedFileInfo(name=nome, size=len(dados), file_id=urls.file_id)
+        info.file_urls.CopyFrom(urls)
+        return info
+
+    async def ver_dashboard(self):
+        await self.rerun('dashboard', pagina=PAGINA_DASHBOARD)
+        await self.rerun('chat', pagina=PAGINA_CHAT)
+
+async def simular_sessao(indice, args, fim):
+    """Login e ações sorteadas pelo mix até o fim do teste"""
+    rng = random.Random(indice)
+    sessao = SessaoSimulada(args.porta, args.timeout)
+    acoes, pesos = zip(*args.mix.items())
+
+    # Rampa: as sessões entram espalhadas, não todas no mesmo instante
+    await asyncio.sleep(args.rampa * indice / max(args.sessoes, 1))
+    try:
+        await sessao.conectar()
+        await sessao.login()
+        while True:
+            await asyncio.sleep(args.reflexao.sortear())
+            if time.monotonic() >= fim:
+                break
+            acao = rng.choices(acoes, pesos)[0]
+            if acao == 'texto':
+                await sessao.turno_texto(rng.choice(MENSAGENS))
+            elif acao == 'audio':
+                await sessao.turno_audio(gerar_audio(rng))
+            else:
+                await sessao.ver_dashboard()
+    except Exception as e:
+        sessao.falha = f"{type(e).__name__}: {e}"
+    finally:
+        try:
+            await sessao.fechar()
+        except Exception:
+            pass
+    return sessao
+
+def rss_mb(pid):
+    """Memória residente do processo em MB (psutil, se instalado; senão /proc)"""
+    if psutil is not None:
+        try:
+            return psutil.Process(pid).memory_info().rss / 2**20
+        except psutil.Error:
+            return None
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for linha in f:
+                if linha.startswith('VmRSS:'):
+                    return int(linha.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+async def amostrar_memoria(pid, amostras, intervalo=0.5):
+    while True:
+        rss = rss_mb(pid)
+        if rss is not None:
+            amostras.append(rss)
+        await asyncio.sleep(intervalo)
+
+def _porta_livre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def preparar_pasta(args, pasta):
+    """Banco sintético + secrets do servidor de carga"""
+    from sqlalchemy import create_engine
+    from benchmarks.gerador import popular_banco
+
+    if args.database_url:
+        banco = f'DATABASE_URL = "{args.database_url}"\n'
+    else:
+        caminho = pasta / f'carga_{args.linhas}.db'
+        if not caminho.exists():
+            popular_banco(create_engine(f"sqlite:///{caminho.as_posix()}"), args.linhas)
+        banco = f'SQLITE_PATH = "{caminho.as_posix()}"\n'
+
+    (pasta / 'secrets.toml').write_text(
+        '[auth]\n'
+        f'username = "{USUARIO}"\n'
+        f'password = "{SENHA}"\n'
+        f'TOKEN_SECRET = "{uuid.uuid4().hex}"\n'
+        '[api_keys]\n'
+        'GEMINI_API_KEY = "carga"\n'
+        'GROQ_API_KEY = "carga"\n'
+        '[database]\n'
+        f'{banco}'
+        f'SNAPSHOT_PATH = "{(pasta / "carga.arrow").as_posix()}"\n',
+        encoding='utf-8'
+    )
+
+def iniciar_servidor(args, pasta):
+    """Sobe benchmarks.carga_servidor e espera o health check"""
+    comando = [
+        sys.executable, '-m', 'benchmarks.carga_servidor',
+        '--porta', str(args.porta),
+        '--pasta', str(pasta),
+        '--latencia-modelo', str(args.latencia_modelo),
+        '--latencia-sql', str(args.latencia_sql),
+        '--latencia-groq', str(args.latencia_groq)
+    ]
+    log = open(pasta / 'servidor.log', 'w', encoding='utf-8')
+    processo = subprocess.Popen(comando, cwd=RAIZ_REPO, stdout=log, stderr=subprocess.STDOUT)
+
+    limite = time.monotonic() + args.timeout
+    while time.monotonic() < limite:
+        if processo.poll() is not None:
+            raise RuntimeError(f"o servidor terminou na inicialização (veja {pasta / 'servidor.log'})")
+        try:
+            if requests.get(f"http://127.0.0.1:{args.porta}/_stcore/health", timeout=1).ok:
+                return processo
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+
+    processo.terminate()
+    raise RuntimeError(f"o servidor não respondeu em {args.timeout}s (veja {pasta / 'servidor.log'})")
+
+def parar_servidor(processo, pasta):
+    """Encerra o servidor e lê as métricas que ele exportou"""
+    processo.terminate()
+    try:
+        processo.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        processo.kill()
+    try:
+        return json.loads((pasta / 'servidor.json').read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return {'spans': [], 'contadores': {}}
+
+async def executar(args, pid):
+    """Aquecimento com uma sessão, depois as N sessões simultâneas"""
+    # Aquecimento: imports, caches e agente carregados antes de medir a memória base
+    aquecimento = SessaoSimulada(args.porta, args.timeout)
+    await aquecimento.conectar()
+    await aquecimento.login()
+    await aquecimento.turno_texto(MENSAGENS[0])
+    await aquecimento.ver_dashboard()
+    await aquecimento.fechar()
+    await asyncio.sleep(1)
+    memoria_base = rss_mb(pid)
+
+    amostras = []
+    amostrador = asyncio.create_task(amostrar_memoria(pid, amostras))
+    inicio = time.monotonic()
+    fim = inicio + args.rampa + args.duracao
+    sessoes = await asyncio.gather(*(simular_sessao(i, args, fim) for i in range(args.sessoes)))
+    duracao = time.monotonic() - inicio
+    amostrador.cancel()
+
+    return sessoes, duracao, memoria_base, max(amostras, default=None)
+
+def _percentil(valores, p):
+    return float(np.percentile(valores, p)) if valores else 0.0
+
+def montar_relatorio(args, sessoes, duracao, memoria_base, memoria_pico, servidor):
+    medicoes = [m for sessao in sessoes for m in sessao.medicoes]
+    por_rotulo = {}
+    for rotulo, segundos, erros in medicoes:
+        item = por_rotulo.setdefault(rotulo, {'duracoes': [], 'erros': 0})
+        item['duracoes'].append(segundos * 1000)
+        item['erros'] += erros
+
+    reruns = {
+        rotulo: {
+            'chamadas': len(item['duracoes']),
+            'erros': item['erros'],
+            'p50_ms': _percentil(item['duracoes'], 50),
+            'p95_ms': _percentil(item['duracoes'], 95),
+            'max_ms': max(item['duracoes'])
+        }
+        for rotulo, item in sorted(por_rotulo.items())
+    }
+    todas = [segundos * 1000 for rotulo, segundos, _ in medicoes if rotulo != 'conexao']
+    turnos = sum(1 for rotulo, _, _ in medicoes if rotulo in ('texto', 'audio.envio'))
+
+    spans = {span['span']: span for span in servidor.get('spans', [])}
+    contadores = servidor.get('contadores', {})
+    banco = {
+        nome: {chave: spans[nome][chave] for chave in ('chamadas', 'p50_ms', 'p95_ms', 'max_ms')}
+        for nome in spans
+        if nome.startswith('carga.db.') or (nome.startswith('pool.') and nome.endswith('.espera'))
+    }
+    banco['bloqueios'] = contadores.get('carga.db.bloqueios', 0)
+    banco['erros'] = contadores.get('carga.db.erros', 0)
+
+    return {
+        'config': {
+            'sessoes': args.sessoes,
+            'duracao_s': args.duracao,
+            'rampa_s': args.rampa,
+            'linhas': None if args.database_url else args.linhas,
+            'mix': args.mix,
+            'reflexao': str(args.reflexao),
+            'latencia_modelo': str(args.latencia_modelo),
+            'latencia_sql': str(args.latencia_sql),
+            'latencia_groq': str(args.latencia_groq)
+        },
+        'vazao': {
+            'duracao_s': duracao,
+            'reruns_por_s': len(todas) / duracao if duracao else 0.0,
+            'turnos_chat_por_min': turnos * 60 / duracao if duracao else 0.0,
+            'rerun_p50_ms': _percentil(todas, 50),
+            'rerun_p95_ms': _percentil(todas, 95)
+        },
+        'reruns': reruns,
+        'banco': banco,
+        'memoria': {
+            'base_mb': memoria_base,
+            'pico_mb': memoria_pico,
+            'por_sessao_mb': (memoria_pico - memoria_base) / args.sessoes
+                if memoria_base is not None and memoria_pico is not None and args.sessoes else None
+        },
+        'falhas': [sessao.falha for sessao in sessoes if sessao.falha],
+        'erros_app': sorted({erro for sessao in sessoes for erro in sessao.erros})[:20]
+    }
+
+def imprimir_relatorio(relatorio):
+    vazao = relatorio['vazao']
+    print(f"\n{relatorio['config']['sessoes']} sessões em {vazao['duracao_s']:.0f}s: "
+          f"{vazao['reruns_por_s']:.2f} reruns/s, {vazao['turnos_chat_por_min']:.1f} turnos de chat/min, "
+          f"rerun p50 {vazao['rerun_p50_ms']:.0f} ms / p95 {vazao['rerun_p95_ms']:.0f} ms")
+
+    print(f"\n{'rerun':<16} {'chamadas':>8} {'erros':>6} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9}")
+    for rotulo, item in relatorio['reruns'].items():
+        print(f"{rotulo:<16} {item['chamadas']:>8} {item['erros']:>6} "
+              f"{item['p50_ms']:>9.0f} {item['p95_ms']:>9.0f} {item['max_ms']:>9.0f}")
+
+    banco = relatorio['banco']
+    print(f"\nbanco: {banco['bloqueios']:g} erros de lock, {banco['erros']:g} outros erros")
+    for nome, item in banco.items():
+        if isinstance(item, dict):
+            print(f"  {nome:<22} {item['chamadas']:>8} {item['p50_ms']:>9.1f} {item['p95_ms']:>9.1f} {item['max_ms']:>9.1f}")
+
+    memoria = relatorio['memoria']
+    if memoria['por_sessao_mb'] is not None:
+        print(f"\nmemória do servidor: base {memoria['base_mb']:.0f} MB, pico {memoria['pico_mb']:.0f} MB, "
+              f"~{memoria['por_sessao_mb']:.1f} MB por sessão")
+
+    for falha in relatorio['falhas']:
+        print(f"❌ sessão interrompida: {falha}")
+    for erro in relatorio['erros_app']:
+        print(f"⚠️ erro exibido pelo app: {erro}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sessoes', type=int, default=10, help='sessões simultâneas')
+    parser.add_argument('--duracao', type=float, default=60, help='segundos de carga após a rampa')
+    parser.add_argument('--rampa', type=float, default=10, help='segundos para todas as sessões entrarem')
+    parser.add_argument('--linhas', type=int, default=10000, help='tamanho do livro-caixa sintético (SQLite)')
+    parser.add_argument('--database-url', help='PostgreSQL de teste (em vez do SQLite sintético)')
+    parser.add_argument('--mix', type=_mix, default='texto=6,audio=2,dashboard=2', help='peso de cada ação')
+    parser.add_argument('--reflexao', type=Distribuicao, default='lognormal:3000:0.5', help='tempo entre ações')
+    parser.add_argument('--latencia-modelo', type=Distribuicao, default='lognormal:1200:0.4', help='cada chamada ao Gemini')
+    parser.add_argument('--latencia-sql', type=Distribuicao, default='fixa:0', help='extra por ferramenta SQL')
+    parser.add_argument('--latencia-groq', type=Distribuicao, default='lognormal:400:0.3', help='cada chamada ao Groq')
+    parser.add_argument('--porta', type=int, default=0, help='porta do servidor (padrão: livre)')
+    parser.add_argument('--timeout', type=float, default=120, help='limite por rerun e para o servidor subir')
+    parser.add_argument('--pasta', help='pasta de trabalho (banco, secrets, log do servidor)')
+    parser.add_argument('--json', help='grava o relatório neste arquivo')
+    args = parser.parse_args()
+
+    args.porta = args.porta or _porta_livre()
+    pasta = Path(args.pasta or tempfile.mkdtemp(prefix='economiza_carga_'))
+    pasta.mkdir(parents=True, exist_ok=True)
+
+    preparar_pasta(args, pasta)
+    processo = iniciar_servidor(args, pasta)
+    try:
+        sessoes, duracao, memoria_base, memoria_pico = asyncio.run(executar(args, processo.pid))
+    finally:
+        servidor = parar_servidor(processo, pasta)
+
+    relatorio = montar_relatorio(args, sessoes, duracao, memoria_base, memoria_pico, servidor)
+    imprimir_relatorio(relatorio)
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(relatorio, indent=2, ensure_ascii=False), encoding='utf-8')
+        print(f"\n✅ Relatório salvo em {args.json}")
+
+if __name__ == "__main__":
+    main()
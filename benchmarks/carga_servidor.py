@@ -0,0 +1,189 @@
+"""
+Servidor do teste de carga (iniciado por benchmarks.carga): o app real via
+`streamlit run`, com stand-ins locais no lugar do Gemini, da latência das
+ferramentas SQL e do Groq, e medição de cada instrução enviada ao banco.
+
+    python -m benchmarks.carga_servidor --porta 8599 --pasta /tmp/carga \\
+        --latencia-modelo lognormal:1200:0.4 --latencia-sql fixa:0 --latencia-groq lognormal:400:0.3
+
+Espera em --pasta o secrets.toml gerado por benchmarks.carga e grava lá
+servidor.json (resumo dos spans e contadores do processo) a cada segundo.
+"""
+
+import argparse
+import atexit
+import json
+import os
+import re
+import sys
+import threading
+import time
+from datetime import date
+from pathlib import Path
+from types import SimpleNamespace
+
+from benchmarks.carga import RAIZ_REPO, Distribuicao
+
+sys.path.insert(0, str(RAIZ_REPO))
+
+# Texto devolvido pela transcrição falsa
+TRANSCRICAO = 'gastei 35 reais na farmácia'
+
+# Palavra da mensagem -> (descrição, categoria) do INSERT que o modelo geraria
+CATEGORIAS = {
+    'mercado': ('Mercado', 'Alimentação'),
+    'farmácia': ('Farmácia', 'Saúde'),
+    'uber': ('Uber', 'Transporte'),
+    'livro': ('Livro', 'Educação')
+}
+
+# Mensagens de erro do driver que indicam disputa por lock
+ERROS_LOCK = ('database is locked', 'database table is locked', 'lock timeout', 'deadlock', 'could not obtain lock')
+
+def sql_para(mensagem):
+    """SQL que o modelo geraria: INSERT para gastos, agregação para perguntas"""
+    texto = mensagem.lower()
+    valor = re.search(r'\d+(?:[.,]\d+)?', texto)
+    if texto.startswith('quanto') or valor is None:
+        inicio_mes = date.today().replace(day=1).isoformat()
+        return (
+            "SELECT Categorias, SUM(Valor) AS Total FROM receita_gastos "
+            f"WHERE Tipo = 'Passivo' AND Data >= '{inicio_mes}' GROUP BY Categorias"
+        )
+
+    descricao, categoria = next(
+        (item for palavra, item in CATEGORIAS.items() if palavra in texto),
+        ('Compra', 'Compras')
+    )
+    return (
+        "INSERT INTO receita_gastos (Data, Descrição, Valor, Categorias, Tipo) "
+        f"VALUES ('{date.today().isoformat()}', '{descricao}', {valor.group().replace(',', '.')}, '{categoria}', 'Passivo')"
+    )
+
+def instalar_substitutos(modelo, sql, groq):
+    """
+    Agent.run: duas chamadas ao "modelo" (escolher a ferramenta e redigir a
+    resposta) em volta de uma execução real da ferramenta SQL do agente.
+    Groq: cliente local com a interface usada por helpers.py.
+    """
+    import groq as sdk_groq
+    from agno.agent import Agent
+    from agno.models.response import ToolExecution
+    from agno.run.response import RunResponse
+    from tracing import span
+
+    def run_falso(self, message=None, *args, **kwargs):
+        query = sql_para(str(message or ''))
+        time.sleep(modelo.sortear())
+
+        resultado = None
+        ferramenta = next((t for t in self.tools or [] if hasattr(t, 'run_sql_query')), None)
+        if ferramenta is not None:
+            with span("tool.run_sql_query"):
+                time.sleep(sql.sortear())
+                resultado = ferramenta.run_sql_query(query)
+
+        time.sleep(modelo.sortear())
+        return RunResponse(
+            content="🤖 economiza.ai: Pronto! Registrei e atualizei seu resumo.",
+            tools=[ToolExecution(tool_name='run_sql_query', tool_args={'query': query}, result=resultado)],
+            metrics={'input_tokens': [1200, 1500], 'output_tokens': [60, 120], 'total_tokens': [1260, 1620]}
+        )
+
+    class GroqFalso:
+        """Transcrição e visão locais, com a latência sorteada do Groq"""
+
+        def __init__(self, *args, **kwargs):
+            self.audio = SimpleNamespace(transcriptions=SimpleNamespace(create=self._transcrever))
+            self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._completar))
+
+        def _transcrever(self, **kwargs):
+            time.sleep(groq.sortear())
+            return {'text': TRANSCRICAO}
+
+        def _completar(self, **kwargs):
+            time.sleep(groq.sortear())
+            mensagem = SimpleNamespace(content='Farmácia - R$ 35,00')
+            return SimpleNamespace(choices=[SimpleNamespace(message=mensagem)])
+
+    Agent.run = run_falso
+    sdk_groq.Groq = GroqFalso
+
+def instalar_medicao_banco():
+    """Span por instrução (leitura/escrita) e contadores de erro/lock em todos os engines"""
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+    from tracing import get_coletor
+
+    @event.listens_for(Engine, 'before_cursor_execute')
+    def antes(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._carga_inicio = time.perf_counter()
+
+    @event.listens_for(Engine, 'after_cursor_execute')
+    def depois(conn, cursor, statement, parameters, context, executemany):
+        inicio = getattr(context, '_carga_inicio', None)
+        if inicio is None:
+            return
+        # Com SQLite, a espera pelo lock (busy timeout) entra na duração das escritas
+        tipo = 'escrita' if statement.lstrip()[:6].upper() in ('INSERT', 'UPDATE', 'DELETE') else 'leitura'
+        get_coletor().registrar(f"carga.db.{tipo}", (time.perf_counter() - inicio) * 1000)
+
+    @event.listens_for(Engine, 'handle_error')
+    def erro(contexto):
+        mensagem = str(contexto.original_exception).lower()
+        bloqueio = any(trecho in mensagem for trecho in ERROS_LOCK)
+        get_coletor().incrementar('carga.db.bloqueios' if bloqueio else 'carga.db.erros')
+
+def exportar(pasta):
+    """Grava o resumo de spans e os contadores do processo em servidor.json"""
+    from tracing import get_coletor
+
+    coletor = get_coletor()
+    with coletor.lock:
+        contadores = dict(coletor.contadores)
+    conteudo = json.dumps({'spans': coletor.resumo().to_dict('records'), 'contadores': contadores}, default=str)
+
+    temporario = pasta / '.servidor.json.tmp'
+    temporario.write_text(conteudo, encoding='utf-8')
+    os.replace(temporario, pasta / 'servidor.json')
+
+def exportar_periodicamente(pasta, intervalo=1.0):
+    while True:
+        time.sleep(intervalo)
+        try:
+            exportar(pasta)
+        except Exception:
+            pass
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--porta', type=int, required=True)
+    parser.add_argument('--pasta', required=True)
+    parser.add_argument('--latencia-modelo', type=Distribuicao, default='lognormal:1200:0.4')
+    parser.add_argument('--latencia-sql', type=Distribuicao, default='fixa:0')
+    parser.add_argument('--latencia-groq', type=Distribuicao, default='lognormal:400:0.3')
+    args = parser.parse_args()
+    pasta = Path(args.pasta)
+
+    instalar_substitutos(args.latencia_modelo, args.latencia_sql, args.latencia_groq)
+    instalar_medicao_banco()
+    threading.Thread(target=exportar_periodicamente, args=(pasta,), name="exportador-carga", daemon=True).start()
+    atexit.register(exportar, pasta)
+
+    from streamlit.web import cli
+
+    os.chdir(RAIZ_REPO)
+    sys.argv = [
+        'streamlit', 'run', str(RAIZ_REPO / 'app.py'),
+        '--server.port', str(args.porta),
+        '--server.address', '127.0.0.1',
+        '--server.headless', 'true',
+        '--server.fileWatcherType', 'none',
+        '--browser.gatherUsageStats', 'false',
+        '--secrets.files', str(pasta / 'secrets.toml')
+    ]
+    cli.main()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+import pytest
+from sqlalchemy import create_engine
+
+RAIZ_REPO = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ_REPO))
+
+# Sem prewarm em background: cada benchmark mede o próprio aquecimento
+os.environ.setdefault('PREWARM', '0')
+
+# Secrets próprios do benchmark (antes de qualquer acesso a st.secrets)
+PASTA_BENCH = Path(os.getenv('BENCH_DIR') or tempfile.mkdtemp(prefix='economiza_bench_'))
+SECRETS_BENCH = PASTA_BENCH / 'secrets.toml'
+SECRETS_BENCH.write_text(
+    '[database]\n'
+    f'SQLITE_PATH = "{(PASTA_BENCH / "bench.db").as_posix()}"\n'
+    f'SNAPSHOT_PATH = "{(PASTA_BENCH / "bench.arrow").as_posix()}"\n',
+    encoding='utf-8'
+)
+
+from streamlit import config as st_config  # noqa: E402
+
+st_config.set_option('secrets.files', [str(SECRETS_BENCH)])
+
+from benchmarks.gerador import popular_banco  # noqa: E402
+
+# Tamanhos do ledger (linhas). Ex.: BENCH_TAMANHOS=1000,10000,100000,1000000,10000000
+TAMANHOS = [int(n) for n in os.getenv('BENCH_TAMANHOS', '1000,10000,100000').split(',')]
+
+def pytest_generate_tests(metafunc):
+    """Parametriza todo benchmark que recebe n_linhas com os tamanhos configurados"""
+    if 'n_linhas' in metafunc.fixturenames:
+        metafunc.parametrize('n_linhas', TAMANHOS, ids=[f'{n}_linhas' for n in TAMANHOS], scope='session')
+
+@pytest.fixture(scope='session')
+def caminho_banco(n_linhas):
+    """Arquivo SQLite com n_linhas sintéticas (reaproveitado entre execuções)"""
+    caminho = PASTA_BENCH / f'ledger_{n_linhas}.db'
+    if not caminho.exists():
+        popular_banco(create_engine(f"sqlite:///{caminho.as_posix()}"), n_linhas)
+    return caminho
+
+@pytest.fixture(scope='session')
+def engine(caminho_banco):
+    """Engine SQLAlchemy do banco sintético"""
+    return create_engine(f"sqlite:///{caminho_banco.as_posix()}")
+
+@pytest.fixture(scope='session')
+def df_ledger(engine):
+    """DataFrame como carregar_dados devolve, sem passar pelo cache"""
+    from database import ler_dados
+    return ler_dados(engine)
+
+@pytest.fixture
+def stubs_llm():
+    """
+    Substitui Gemini (Agent.run) e Groq por respostas locais.
+    Mede só o custo do app, sem rede nem cota.
+    """
+    from agno.run.response import RunResponse
+
+    def run_falso(self, message=None, *args, **kwargs):
+        return RunResponse(content="🤖 economiza.ai: Gasto registrado com sucesso!")
+
+    groq_falso = mock.MagicMock()
+    groq_falso.return_value.audio.transcriptions.create.return_value = {'text': 'gastei 20 reais no mercado'}
+    groq_falso.return_value.chat.completions.create.return_value.choices = [
+        mock.MagicMock(message=mock.MagicMock(content='Mercado - R$ 20,00'))
+    ]
+
+    with mock.patch('agno.agent.Agent.run', run_falso), \
+         mock.patch('groq.Groq', groq_falso):
+        yield
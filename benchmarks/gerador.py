@@ -0,0 +1,114 @@
+"""
+Gerador determinístico de dados sintéticos para a tabela receita_gastos.
+
+Uso direto (popula um SQLite para testes manuais):
+    python -m benchmarks.gerador 100000 ./data/bench.db
+"""
+
+import sys
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+
+# Valor médio mensal aproximado por categoria de gasto (R$)
+VALOR_BASE = {
+    'Alimentação': 45.0,
+    'Transporte': 30.0,
+    'Saúde': 120.0,
+    'Casa': 90.0,
+    'Compras': 150.0,
+    'Entretenimento': 40.0,
+    'Educação': 80.0
+}
+
+# Peso de cada categoria na quantidade de lançamentos
+FREQUENCIA = {
+    'Alimentação': 0.35,
+    'Transporte': 0.25,
+    'Saúde': 0.06,
+    'Casa': 0.12,
+    'Compras': 0.08,
+    'Entretenimento': 0.09,
+    'Educação': 0.05
+}
+
+DESCRICOES = {
+    'Alimentação': ['Mercado', 'Restaurante', 'iFood', 'Padaria', 'Lanche'],
+    'Transporte': ['Uber', 'Gasolina', 'Ônibus', 'Estacionamento'],
+    'Saúde': ['Farmácia', 'Consulta médica', 'Psicólogo', 'Remédios'],
+    'Casa': ['Internet', 'Conta de luz', 'Ração', 'Limpeza'],
+    'Compras': ['Roupas', 'Eletrônicos', 'Barbeador', 'Acessórios'],
+    'Entretenimento': ['Netflix', 'Spotify', 'Cinema', 'Jogos'],
+    'Educação': ['Livro', 'Curso', 'Mensalidade', 'Material'],
+    'Receita': ['Salário', 'Diárias', 'Freelance', 'Venda']
+}
+
+# Fração de linhas que são receitas
+FRACAO_RECEITAS = 0.08
+
+def _categorias_gastos():
+    """Categorias de gasto do app (get_app_config), com fallback fora do Streamlit"""
+    try:
+        from config import get_app_config
+        return get_app_config()['categorias']['gastos']
+    except Exception:
+        return list(VALOR_BASE)
+
+def gerar_ledger(n_linhas, seed=42, inicio='2015-01-01', fim='2025-12-31'):
+    """
+    Gera n_linhas de transações com sazonalidade mensal.
+    Mesmo seed -> mesmos dados, para resultados comparáveis entre commits.
+    """
+    rng = np.random.default_rng(seed)
+
+    categorias = _categorias_gastos()
+    pesos = np.array([FREQUENCIA.get(cat, 0.05) for cat in categorias])
+    pesos = pesos / pesos.sum()
+
+    inicio = pd.Timestamp(inicio)
+    dias = (pd.Timestamp(fim) - inicio).days + 1
+    datas = inicio + pd.to_timedelta(rng.integers(0, dias, n_linhas), unit='D')
+
+    eh_receita = rng.random(n_linhas) < FRACAO_RECEITAS
+    cat_idx = rng.choice(len(categorias), size=n_linhas, p=pesos)
+    cat_gasto = np.array(categorias, dtype=object)[cat_idx]
+
+    # Sazonalidade: gastos sobem em dezembro/janeiro, receitas têm 13º em dezembro
+    mes = datas.month.to_numpy()
+    sazonal = 1.0 + 0.25 * np.cos(2 * np.pi * (mes - 12) / 12)
+    base = np.array([VALOR_BASE.get(cat, 60.0) for cat in categorias])[cat_idx]
+    valor_gasto = base * sazonal * rng.lognormal(0.0, 0.5, n_linhas)
+
+    decimo_terceiro = np.where(mes == 12, 2.0, 1.0)
+    valor_receita = 1500.0 * decimo_terceiro * rng.lognormal(0.0, 0.3, n_linhas)
+
+    categorias_finais = np.where(eh_receita, 'Receita', cat_gasto)
+    desc_idx = rng.integers(0, 60, n_linhas)
+    descricoes = np.empty(n_linhas, dtype=object)
+    for cat in np.unique(categorias_finais):
+        mascara = categorias_finais == cat
+        opcoes = np.array(DESCRICOES.get(cat, ['Outros']), dtype=object)
+        descricoes[mascara] = opcoes[desc_idx[mascara] % len(opcoes)]
+
+    return pd.DataFrame({
+        'Data': datas.strftime('%Y-%m-%d'),
+        'Descrição': descricoes,
+        'Valor': np.round(np.where(eh_receita, valor_receita, valor_gasto), 2),
+        'Categorias': categorias_finais,
+        'Tipo': np.where(eh_receita, 'Ativo', 'Passivo')
+    })
+
+def popular_banco(engine, n_linhas, seed=42, tamanho_lote=100_000):
+    """Insere o ledger sintético em receita_gastos, em lotes"""
+    from database import init_database
+
+    init_database(engine)
+    for inicio in range(0, n_linhas, tamanho_lote):
+        lote = gerar_ledger(min(tamanho_lote, n_linhas - inicio), seed=seed + inicio)
+        lote.to_sql('receita_gastos', engine, if_exists='append', index=False)
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    caminho = sys.argv[2] if len(sys.argv) > 2 else './data/bench.db'
+    popular_banco(create_engine(f"sqlite:///{caminho}"), n)
+    print(f"✅ {n} transações sintéticas gravadas em {caminho}")
@@ -0,0 +1,83 @@
+"""
+Relatório de tempo de import (estilo `python -X importtime`) dos módulos do app.
+
+Cada módulo é importado num processo novo, para medir o custo a frio.
+    python -m benchmarks.importtime              # tabela
+    python -m benchmarks.importtime --json out.json
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+RAIZ_REPO = Path(__file__).resolve().parent.parent
+
+# Módulos de entrada do app e dependências pesadas que eles puxam
+MODULOS = [
+    'auth',
+    'config',
+    'prewarm',
+    'database',
+    'helpers',
+    'tracing',
+    'agente',
+    'analytics',
+    'timeseries',
+    'groq',
+    'agno.agent',
+    'agno.models.google',
+    'plotly.express'
+]
+
+# Conjunto importado antes de a tela de login aparecer
+MODULOS_LOGIN = ['streamlit', 'auth', 'config', 'prewarm']
+
+def medir_imports(modulos):
+    """
+    Roda `python -X importtime -c "import ..."` e retorna
+    (tempo total em ms, top 10 imports por tempo acumulado).
+    """
+    codigo = '; '.join(f'import {m}' for m in modulos)
+    resultado = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', codigo],
+        cwd=RAIZ_REPO, capture_output=True, text=True
+    )
+    if resultado.returncode != 0:
+        raise RuntimeError(resultado.stderr.strip().splitlines()[-1])
+
+    linhas = []
+    for linha in resultado.stderr.splitlines():
+        if not linha.startswith('import time:') or 'self [us]' in linha:
+            continue
+        proprio, acumulado, nome = linha.split(':', 1)[1].split('|')
+        # A indentação do nome indica o nível de aninhamento (1 espaço = topo)
+        nivel = len(nome) - len(nome.lstrip())
+        linhas.append((nome.strip(), nivel, int(acumulado)))
+
+    total_us = sum(acumulado for _, nivel, acumulado in linhas if nivel == 1)
+    top = sorted(linhas, key=lambda l: l[2], reverse=True)[:10]
+    return total_us / 1000, [{'modulo': nome, 'acumulado_ms': acumulado / 1000} for nome, _, acumulado in top]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--json', help='grava o relatório neste arquivo')
+    args = parser.parse_args()
+
+    relatorio = {}
+    for nome, modulos in [('login', MODULOS_LOGIN)] + [(m, [m]) for m in MODULOS]:
+        try:
+            total_ms, top = medir_imports(modulos)
+            relatorio[nome] = {'total_ms': total_ms, 'top': top}
+            print(f"{nome:<22} {total_ms:9.1f} ms")
+        except RuntimeError as e:
+            relatorio[nome] = {'erro': str(e)}
+            print(f"{nome:<22} {'erro':>9}  {e}")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(relatorio, indent=2, ensure_ascii=False), encoding='utf-8')
+        print(f"\n✅ Relatório salvo em {args.json}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+import logging
+import re
+import pandas as pd
+from sqlalchemy import text
+
+from tracing import medir
+
+logger = logging.getLogger(__name__)
+
+# SQLite: FTS5 external-content (o texto fica só em receita_gastos), sem acentos
+DDL_SQLITE = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS receita_gastos_fts USING fts5(
+        Descrição, Categorias,
+        content='receita_gastos', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_receita_gastos_fts_insert AFTER INSERT ON receita_gastos
+    BEGIN
+        INSERT INTO receita_gastos_fts (rowid, Descrição, Categorias)
+        VALUES (new.id, new.Descrição, new.Categorias);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_receita_gastos_fts_delete AFTER DELETE ON receita_gastos
+    BEGIN
+        INSERT INTO receita_gastos_fts (receita_gastos_fts, rowid, Descrição, Categorias)
+        VALUES ('delete', old.id, old.Descrição, old.Categorias);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_receita_gastos_fts_update AFTER UPDATE ON receita_gastos
+    BEGIN
+        INSERT INTO receita_gastos_fts (receita_gastos_fts, rowid, Descrição, Categorias)
+        VALUES ('delete', old.id, old.Descrição, old.Categorias);
+        INSERT INTO receita_gastos_fts (rowid, Descrição, Categorias)
+        VALUES (new.id, new.Descrição, new.Categorias);
+    END
+    """,
+    # Arquivo dos anos fechados (só recebe INSERT ao arquivar): índice próprio
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS receita_gastos_arquivo_fts USING fts5(
+        Descrição, Categorias,
+        content='receita_gastos_arquivo', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_receita_gastos_arquivo_fts_insert AFTER INSERT ON receita_gastos_arquivo
+    BEGIN
+        INSERT INTO receita_gastos_arquivo_fts (rowid, Descrição, Categorias)
+        VALUES (new.id, new.Descrição, new.Categorias);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_receita_gastos_arquivo_fts_delete AFTER DELETE ON receita_gastos_arquivo
+    BEGIN
+        INSERT INTO receita_gastos_arquivo_fts (receita_gastos_arquivo_fts, rowid, Descrição, Categorias)
+        VALUES ('delete', old.id, old.Descrição, old.Categorias);
+    END
+    """
+]
+
+# Tabelas de texto (FTS5) e o conteúdo que indexam
+TABELAS_FTS = {'receita_gastos_fts': 'receita_gastos', 'receita_gastos_arquivo_fts': 'receita_gastos_arquivo'}
+
+# PostgreSQL: trigramas sobre descrição + categoria sem acentos (unaccent não é IMMUTABLE, daí o wrapper)
+DDL_POSTGRES = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    """
+    CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+    AS $$ SELECT public.unaccent('public.unaccent', $1) $$
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_receita_gastos_descricao_trgm
+    ON receita_gastos USING gin (f_unaccent(lower(Descrição || ' ' || Categorias)) gin_trgm_ops)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_receita_gastos_arquivo_descricao_trgm
+    ON receita_gastos_arquivo USING gin (f_unaccent(lower(Descrição || ' ' || Categorias)) gin_trgm_ops)
+    """
+]
+
+def instalar_busca(conn):
+    """
+    Cria os índices de texto (tabela atual e arquivo) e os triggers de
+    sincronização (idempotente). Roda depois de instalar_arquivo.
+    """
+    if conn.dialect.name == 'sqlite':
+        existiam = {
+            nome for (nome,) in conn.exec_driver_sql(
+                "SELECT name FROM sqlite_master WHERE name IN ('receita_gastos_fts', 'receita_gastos_arquivo_fts')"
+            )
+        }
+        for comando in DDL_SQLITE:
+            conn.exec_driver_sql(comando)
+        # Tabela criada agora sobre um livro-caixa existente: indexa o que já há
+        for tabela in TABELAS_FTS:
+            if tabela not in existiam:
+                conn.exec_driver_sql(f"INSERT INTO {tabela} ({tabela}) VALUES ('rebuild')")
+        return
+
+    # Extensões podem exigir permissão: sem elas a busca cai no LIKE simples
+    try:
+        with conn.begin_nested():
+            for comando in DDL_POSTGRES:
+                conn.exec_driver_sql(comando)
+    except Exception as e:
+        logger.warning(f"Busca: índice de trigramas indisponível ({e}); usando LIKE")
+
+def _termos(termo):
+    """Palavras da busca (letras/números), sem operadores"""
+    return re.findall(r'\w+', termo.lower())
+
+def _consulta_sqlite(termos):
+    # Cada palavra vira prefixo entre aspas ("rac"* casa "ração"); todas obrigatórias
+    partes = " UNION ALL ".join(f"""
+        SELECT r.id, r.Data, r.Descrição, r.Valor, r.Categorias, r.Tipo,
+               {int(arquivada)} AS arquivada, bm25({fts}) AS relevancia
+        FROM {fts}
+        JOIN {tabela} r ON r.id = {fts}.rowid
+        WHERE {fts} MATCH :expressao
+    """ for arquivada, (fts, tabela) in enumerate(TABELAS_FTS.items()))
+    return text(f"""
+        SELECT id, Data, Descrição, Valor, Categorias, Tipo, arquivada
+        FROM ({partes})
+        ORDER BY relevancia, Data DESC
+        LIMIT :limite
+    """), {'expressao': ' '.join(f'"{t}"*' for t in termos)}
+
+def _consulta_postgres(termos, indice):
+    # Com o índice: mesma expressão indexada, para o planner usá-lo
+    coluna = "f_unaccent(lower(Descrição || ' ' || Categorias))" if indice else "lower(Descrição || ' ' || Categorias)"
+    valor = "f_unaccent(:t{i})" if indice else ":t{i}"
+    filtros = " AND ".join(f"{coluna} LIKE {valor.format(i=i)}" for i in range(len(termos)))
+    return text(f"""
+        SELECT id, Data, Descrição, Valor, Categorias, Tipo, 0 AS arquivada
+        FROM receita_gastos
+        WHERE {filtros}
+        UNION ALL
+        SELECT id, Data, Descrição, Valor, Categorias, Tipo, 1 AS arquivada
+        FROM receita_gastos_arquivo
+        WHERE {filtros}
+        ORDER BY Data DESC
+        LIMIT :limite
+    """), {f't{i}': f'%{t}%' for i, t in enumerate(termos)}
+
+@medir("db.buscar_transacoes")
+def buscar_transacoes(engine, termo, limite=20):
+    """
+    Busca transações pela descrição/categoria, sem diferenciar acentos e
+    maiúsculas ('racao' encontra 'Ração'), na tabela atual e no arquivo.
+    Retorna DataFrame (mais relevantes primeiro); arquivada=1 marca as
+    transações dos anos fechados, que não podem ser editadas.
+    """
+    termos = _termos(termo)
+    if not termos:
+        return pd.DataFrame(columns=['id', 'Data', 'Descrição', 'Valor', 'Categorias', 'Tipo', 'arquivada'])
+
+    if engine.dialect.name == 'sqlite':
+        consulta, params = _consulta_sqlite(termos)
+        return pd.read_sql(consulta, engine, params={**params, 'limite': limite})
+
+    try:
+        consulta, params = _consulta_postgres(termos, indice=True)
+        return pd.read_sql(consulta, engine, params={**params, 'limite': limite})
+    except Exception:
+        # Sem unaccent/pg_trgm: varredura com LIKE (sensível a acentos)
+        consulta, params = _consulta_postgres(termos, indice=False)
+        return pd.read_sql(consulta, engine, params={**params, 'limite': limite})
@@ -0,0 +1,178 @@
+import logging
+import select
+import sqlite3
+import threading
+import time
+import streamlit as st
+
+logger = logging.getLogger(__name__)
+
+# Canal do LISTEN/NOTIFY no PostgreSQL
+CANAL_PG = 'receita_gastos_mudancas'
+
+# versao: toda escrita; versao_reescrita: só UPDATE/DELETE (invalidam o snapshot)
+DDL_SQLITE = [
+    """
+    CREATE TABLE IF NOT EXISTS versao_dados (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        versao INTEGER NOT NULL DEFAULT 0,
+        versao_reescrita INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    "INSERT OR IGNORE INTO versao_dados (id) VALUES (1)",
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_receita_gastos_insert AFTER INSERT ON receita_gastos
+    BEGIN
+        UPDATE versao_dados SET versao = versao + 1 WHERE id = 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_receita_gastos_update AFTER UPDATE ON receita_gastos
+    BEGIN
+        UPDATE versao_dados SET versao = versao + 1, versao_reescrita = versao_reescrita + 1 WHERE id = 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_receita_gastos_delete AFTER DELETE ON receita_gastos
+    BEGIN
+        UPDATE versao_dados SET versao = versao + 1, versao_reescrita = versao_reescrita + 1 WHERE id = 1;
+    END
+    """
+]
+
+DDL_POSTGRES = [
+    """
+    CREATE TABLE IF NOT EXISTS versao_dados (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        versao BIGINT NOT NULL DEFAULT 0,
+        versao_reescrita BIGINT NOT NULL DEFAULT 0
+    )
+    """,
+    "INSERT INTO versao_dados (id) VALUES (1) ON CONFLICT DO NOTHING",
+    f"""
+    CREATE OR REPLACE FUNCTION notificar_mudanca_receita_gastos() RETURNS trigger AS $$
+    DECLARE
+        v BIGINT;
+        r BIGINT;
+    BEGIN
+        UPDATE versao_dados
+        SET versao = versao + 1,
+            versao_reescrita = versao_reescrita + CASE WHEN TG_OP = 'INSERT' THEN 0 ELSE 1 END
+        WHERE id = 1
+        RETURNING versao, versao_reescrita INTO v, r;
+        PERFORM pg_notify('{CANAL_PG}', v || ',' || r);
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS trg_receita_gastos_mudancas ON receita_gastos",
+    """
+    CREATE TRIGGER trg_receita_gastos_mudancas
+    AFTER INSERT OR UPDATE OR DELETE ON receita_gastos
+    FOR EACH STATEMENT EXECUTE FUNCTION notificar_mudanca_receita_gastos()
+    """
+]
+
+def instalar_change_feed(conn):
+    """Cria a tabela de versão e os triggers (idempotente)"""
+    ddl = DDL_SQLITE if conn.dialect.name == 'sqlite' else DDL_POSTGRES
+    for comando in ddl:
+        conn.exec_driver_sql(comando)
+
+def ler_versao(conn):
+    """Retorna (versao, versao_reescrita) atuais"""
+    linha = conn.exec_driver_sql("SELECT versao, versao_reescrita FROM versao_dados WHERE id = 1").fetchone()
+    return (linha[0], linha[1]) if linha else (0, 0)
+
+class ObservadorMudancas:
+    """
+    Thread que observa escritas em receita_gastos feitas por qualquer processo
+    e chama callback(reescrita: bool) quando a versão muda.
+    SQLite: polling barato de PRAGMA data_version numa conexão dedicada.
+    PostgreSQL: LISTEN/NOTIFY (psycopg2); outros drivers caem no polling da versão.
+    """
+
+    def __init__(self, engine, callback, intervalo=0.1):
+        self.engine = engine
+        self.callback = callback
+        self.intervalo = intervalo
+        self.versao = None
+        self.thread = threading.Thread(target=self._loop, name="change-feed", daemon=True)
+
+    def iniciar(self):
+        self.thread.start()
+        return self
+
+    def _processar(self, versao, versao_reescrita):
+        """Compara com a última versão vista e dispara o callback"""
+        anterior = self.versao
+        self.versao = (versao, versao_reescrita)
+        if anterior is None or anterior[0] == versao:
+            return
+        try:
+            self.callback(reescrita=versao_reescrita != anterior[1])
+        except Exception as e:
+            logger.warning(f"Change feed: erro no callback: {e}")
+
+    def _loop(self):
+        while True:
+            try:
+                if self.engine.dialect.name == 'sqlite':
+                    self._observar_sqlite()
+                else:
+                    self._observar_postgres()
+            except Exception as e:
+                logger.warning(f"Change feed: reconectando após erro: {e}")
+                time.sleep(1)
+
+    def _observar_sqlite(self):
+        conn = sqlite3.connect(self.engine.url.database, check_same_thread=False)
+        try:
+            ultimo_data_version = None
+            while True:
+                # data_version muda a cada commit de OUTRA conexão (inclusive de outros processos)
+                data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+                if data_version != ultimo_data_version:
+                    ultimo_data_version = data_version
+                    linha = conn.execute(
+                        "SELECT versao, versao_reescrita FROM versao_dados WHERE id = 1"
+                    ).fetchone()
+                    if linha:
+                        self._processar(*linha)
+                time.sleep(self.intervalo)
+        finally:
+            conn.close()
+
+    def _observar_postgres(self):
+        raw = self.engine.raw_connection()
+        try:
+            dbapi = raw.driver_connection
+            dbapi.autocommit = True
+            cursor = dbapi.cursor()
+            cursor.execute("SELECT versao, versao_reescrita FROM versao_dados WHERE id = 1")
+            self._processar(*cursor.fetchone())
+
+            # psycopg2: espera notificações no socket
+            if hasattr(dbapi, 'poll') and hasattr(dbapi, 'notifies'):
+                cursor.execute(f"LISTEN {CANAL_PG}")
+                while True:
+                    if select.select([dbapi], [], [], 5) == ([], [], []):
+                        continue
+                    dbapi.poll()
+                    while dbapi.notifies:
+                        notificacao = dbapi.notifies.pop(0)
+                        versao, versao_reescrita = (int(v) for v in notificacao.payload.split(','))
+                        self._processar(versao, versao_reescrita)
+
+            # Outros drivers: polling da tabela de versão
+            while True:
+                time.sleep(self.intervalo)
+                cursor.execute("SELECT versao, versao_reescrita FROM versao_dados WHERE id = 1")
+                self._processar(*cursor.fetchone())
+        finally:
+            raw.close()
+
+@st.cache_resource
+def iniciar_observador(_engine, _callback, intervalo=0.1):
+    """Inicia o observador de mudanças uma única vez por processo"""
+    return ObservadorMudancas(_engine, _callback, intervalo).iniciar()
@@ -21,6 +21,43 @@ def get_api_keys():
         'GROQ_API_KEY': os.getenv('GROQ_API_KEY', '')
     }
 
+def get_pasta_metricas():
+    """Pasta para exportar métricas (JSONL/Prometheus); None desativa a exportação"""
+    try:
+        pasta = st.secrets.get("metrics", {}).get("EXPORT_DIR")
+    except Exception:
+        pasta = None
+    return pasta or os.getenv('METRICS_EXPORT_DIR') or None
+
+def get_motor_analitico():
+    """Motor das agregações analíticas: 'pandas' (padrão) ou 'duckdb'"""
+    try:
+        motor = st.secrets.get("database", {}).get("ANALYTICS_ENGINE")
+    except Exception:
+        motor = None
+    return (motor or os.getenv('ANALYTICS_ENGINE', 'pandas')).lower()
+
+def get_config_pool():
+    """Pool de conexões e timeouts do PostgreSQL ([database] no secrets, com padrões)"""
+    try:
+        database = st.secrets.get("database", {})
+    except Exception:
+        database = {}
+    return {
+        'pool_size': int(database.get("POOL_SIZE", 5)),
+        'max_overflow': int(database.get("POOL_MAX_OVERFLOW", 10)),
+        'pool_recycle': int(database.get("POOL_RECYCLE", 1800)),  # segundos
+        'pool_timeout': int(database.get("POOL_TIMEOUT", 30)),  # segundos esperando conexão livre
+        # statement_timeout por papel (ms): escritas do app, leituras do app, SQL do agente
+        'statement_timeout': {
+            'escrita': int(database.get("STATEMENT_TIMEOUT_ESCRITA_MS", 15000)),
+            'leitura': int(database.get("STATEMENT_TIMEOUT_LEITURA_MS", 30000)),
+            'agente': int(database.get("STATEMENT_TIMEOUT_AGENTE_MS", 5000))
+        },
+        # Segundos lendo do principal após uma escrita (a réplica pode estar atrasada)
+        'leitura_propria': float(database.get("LEITURA_PROPRIA_S", 10))
+    }
+
 @st.cache_resource
 def get_app_config():
     """Retorna configurações gerais da aplicação"""
@@ -40,6 +77,62 @@ def get_app_config():
             'data': 300,  # 5 minutos
             'stats': 600,  # 10 minutos
             'ai_response': 3600  # 1 hora
+        },
+        'snapshot': {
+            'max_idade': 3600,  # Reconstrói o snapshot colunar a cada 1 hora
+            'max_delta': 1000,  # Ou quando o delta passar desse número de linhas
+            # PostgreSQL: ids SERIAL podem ser commitados fora de ordem; o delta relê
+            # os últimos N ids do snapshot para não perder uma linha que chegou atrasada
+            'janela_ids': 1000
+        },
+        'analytics': {
+            'motor': get_motor_analitico()
+        },
+        'arquivo': {
+            'anos_quentes': 2,  # Anos em receita_gastos (o atual incluso); os anteriores vão para o arquivo
+            'automatico': os.getenv('ARQUIVAR', '1') != '0'  # Arquivar anos fechados ao iniciar
+        },
+        'inicializacao': {
+            'prewarm': os.getenv('PREWARM', '1') != '0'  # Aquecer caches em background no boot
+        },
+        'atualizador': {
+            'intervalo': 30,  # Segundos entre verificações de TTL vencido (revalidação em background)
+            'espera_escrita': 5  # Segundos que quem escreveu espera a recarga antes do rerun
+        },
+        'change_feed': {
+            'intervalo': 0.1  # Segundos entre verificações de PRAGMA data_version / versão
+        },
+        'metricas': {
+            'pasta_exportacao': get_pasta_metricas(),
+            'intervalo_exportacao': 60  # segundos
+        },
+        'grafico': {
+            'max_pontos': 400  # Orçamento de pontos por série no gráfico de evolução
+        },
+        'pool': get_config_pool(),
+        'guarda_sql': {
+            'max_linhas': 200,  # Teto de linhas por consulta do agente (LIMIT reescrito)
+            'timeout_ms': 5000,  # Tempo máximo de execução por consulta
+            'verificar_plano': True,  # EXPLAIN antes de executar leituras
+            'custo_maximo': 100000,  # Custo estimado máximo no PostgreSQL
+            'max_lote': 50  # Transações por chamada de registrar_transacoes
+        },
+        'resultados': {
+            'linhas': 20,  # Linhas entregues ao agente por resultado; o resto vai resumido
+            'validade_continuacao': 600,  # segundos para o agente pedir o restante
+            'max_continuacoes': 256  # Resultados pendentes guardados por processo
+        },
+        'anomalias': {
+            'min_amostras': 5,  # Transações mínimas na categoria antes de alertar
+            'limiar_z': 3.0  # Desvios-padrão acima da média da categoria
+        },
+        'sessao': {
+            'validade_token': 12 * 3600  # segundos até o token de login expirar
+        },
+        'chat': {
+            'janela': 20,  # Mensagens renderizadas ao abrir o chat
+            'pagina': 20,  # Mensagens carregadas por clique em "anteriores"
+            'max_mensagens': 100  # Teto de mensagens mantidas na sessão
         }
     }
 
@@ -51,7 +144,7 @@ def get_system_instructions():
     return f'''
 # System Message - Assistente Financeiro SQLite
 
-Voce tem que adicionar os gastos no formato de data YYYY/MM/DD
+Voce tem que adicionar os gastos no formato de data YYYY-MM-DD
 
 **Identificação**: Sempre se apresente como "🤖 economiza.ai: [seu conteúdo]"
 
@@ -61,12 +154,21 @@ Você é um assistente financeiro especializado em SQLite que gerencia automatic
 
 |Campo|Tipo|Descrição|
 |---|---|---|
-|Data|DATE|Data da transação (padrão: data atual)|
+|Data|DATE|Data da transação no formato YYYY-MM-DD (padrão: data atual)|
 |Descrição|TEXT|Descrição clara da transação|
 |Valor|REAL|Valor monetário (sempre positivo)|
 |Categorias|TEXT|Categoria predefinida|
 |Tipo|TEXT|"Ativo" (receita) ou "Passivo" (gasto)|
 
+## Histórico Arquivado
+
+Transações de anos fechados (antes de {data_atual.year - config['arquivo']['anos_quentes'] + 1}) ficam em `receita_gastos_arquivo`, somente leitura.
+
+- Para consultas sobre esses anos ou sobre o histórico todo (totais gerais, comparação entre anos), leia de `receita_gastos_completa`: mesmas colunas, une a tabela atual e o arquivo
+- Para o período recente, consulte `receita_gastos` direto (menor e mais rápida)
+- INSERT, UPDATE e DELETE sempre em `receita_gastos`
+- Transações arquivadas (arquivada=1 em buscar_transacoes) não podem ser editadas nem excluídas: se o usuário pedir, explique que o ano está fechado
+
 ## Categorias Predefinidas
 
 - **Alimentação**: Restaurantes, supermercado, delivery, lanches, mercado
@@ -119,11 +221,21 @@ Execute operações imediatamente sem solicitar confirmações desnecessárias.
 4. **Edição**: Corrigir registros quando solicitado
 5. **Exclusão**: Remover transações específicas
 
+### Perguntas Frequentes (sem SQL):
+
+Para estas perguntas use direto a ferramenta indicada, numa única chamada, em vez de gerar SQL:
+
+- **Saldo e totais gerais**: `resumo_financeiro`
+- **Totais do mês / últimos meses**: `totais_mensais` (o último mês retornado é o atual)
+- **Onde mais gastei**: `top_categorias` (com `mes` no formato YYYY-MM para um mês específico)
+- **Últimos lançamentos**: `ultimas_transacoes`
+
 ### Filtros Inteligentes:
 
 - **Temporal**: "este mês", "semana passada", "últimos 30 dias"
 - **Categoria**: "gastos com alimentação", "receitas do trabalho"
 - **Valor**: "gastos acima de 100", "menores despesas"
+- **Descrição**: use a ferramenta `buscar_transacoes` ("gastos com Uber", "a ração de semana passada") em vez de `LIKE '%...%'`; ela ignora acentos e retorna os ids para editar/excluir
 
 ## Comunicação e Resposta
 
@@ -133,6 +245,10 @@ Execute operações imediatamente sem solicitar confirmações desnecessárias.
 - **Análise**: Apresente dados em formato claro com totais e percentuais
 - **Sugestões**: Ofereça insights sobre padrões de gastos quando relevante
 
+### Vários Lançamentos na Mesma Mensagem:
+
+Quando a mensagem trouxer mais de um gasto/receita ("gastei 20 no mercado, 35 de uber e 120 na farmácia"), chame `registrar_transacoes` **uma única vez** com todos os itens, em vez de um INSERT por item.
+
 ### Exemplos de Interação:
 
 **Usuário**: "Comprei um livro por 50 reais" **SQL Executado**:
@@ -148,7 +264,7 @@ VALUES (DATE('now'), 'Livro', 50.0, 'Educação', 'Passivo');
 
 ```sql
 SELECT SUM(Valor) as Total FROM receita_gastos 
-WHERE Tipo = 'Passivo' AND strftime('%Y-%m', Data) = strftime('%Y-%m', 'now');
+WHERE Tipo = 'Passivo' AND Data >= DATE('now', 'start of month');
 ```
 
 ## Diretrizes Operacionais
@@ -163,8 +279,12 @@ WHERE Tipo = 'Passivo' AND strftime('%Y-%m', Data) = strftime('%Y-%m', 'now');
 ### Mantenha Precisão:
 
 - Valide valores numéricos
+- Envie um comando SQL por vez; prefira agregações (SUM, COUNT, GROUP BY) a listar linhas
+- Se uma consulta voltar "Consulta rejeitada" ou "Consulta cancelada", corrija conforme o motivo e tente de novo
+- Resultados vêm em JSON colunar: `colunas` (uma lista de valores por coluna, alinhadas por posição) e `constantes` (colunas com o mesmo valor em todas as linhas). Se houver `omitidas`, use `resumo_omitidas` (soma/min/max) para responder e só chame `continuar_resultado` com o valor de `continuar` quando precisar das linhas em si
 - Garanta classificação correta de categorias
 - Use sempre data atual para novos registros
+- Filtre períodos comparando a coluna Data direto com datas YYYY-MM-DD (ex.: `Data BETWEEN '2025-01-01' AND '2025-01-31'`), sem funções sobre a coluna
 - Mantenha consistência na nomenclatura
 
 ### Comunicação Natural:
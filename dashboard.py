@@ -5,11 +5,20 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 from datetime import datetime, timedelta
 import calendar
+from functools import partial
 
 # Importar módulos customizados
 from auth import require_auth, get_user_info
-from database import get_database_engine, carregar_dados, get_summary_stats, get_category_summary
+from database import get_database_engine, carregar_dados, get_summary_stats, get_category_summary, invalidate_cache
 from config import get_app_config
+from analytics import usar_duckdb
+from agregados import calcular_metricas, preparar_dados_pizza, preparar_dados_evolucao, limites_evolucao
+from tracing import medir
+from busca import buscar_transacoes
+from previsao import HORIZONTE_PADRAO, obter_previsao
+from anomalias import anomalias_recentes, descrever
+from exportacao import FORMATOS, formatos_disponiveis, exportar
+from timeseries import RESOLUCOES, converter_datas, escolher_resolucao, reduzir_serie
 
 # Configuração
 config = get_app_config()
@@ -25,35 +34,7 @@ CORES = {
     'gradient_vermelho': ['#FFA07A', '#DC143C', "#070404"]
 }
 
-@st.cache_data(ttl=config['cache_ttl']['stats'])
-def calcular_metricas(df):
-    """Calcula métricas principais com cache"""
-    if df.empty:
-        return None
-    
-    # Calcular médias mensais
-    meses_com_dados = df['MesAno'].nunique()
-    media_receitas = df[df['Tipo'] == 'Ativo']['Valor'].sum() / max(meses_com_dados, 1)
-    media_gastos = df[df['Tipo'] == 'Passivo']['Valor'].sum() / max(meses_com_dados, 1)
-    
-    # Saldo atual total
-    receitas_total = df[df['Tipo'] == 'Ativo']['Valor'].sum()
-    gastos_total = df[df['Tipo'] == 'Passivo']['Valor'].sum()
-    saldo_atual = receitas_total - gastos_total
-    
-    # Meses de cobertura
-    meses_cobertura = saldo_atual / media_gastos if media_gastos > 0 else float('inf')
-    
-    return {
-        'meses_com_dados': meses_com_dados,
-        'media_receitas': media_receitas,
-        'media_gastos': media_gastos,
-        'receitas_total': receitas_total,
-        'gastos_total': gastos_total,
-        'saldo_atual': saldo_atual,
-        'meses_cobertura': meses_cobertura
-    }
-
+@medir("dashboard.criar_metricas_e_termometro")
 def criar_metricas_e_termometro(df):
     """Cria métricas principais e termômetro financeiro"""
     if df.empty:
@@ -64,6 +45,10 @@ def criar_metricas_e_termometro(df):
     if not metricas:
         return
     
+    # Cobertura pelos gastos previstos (média móvel sazonal), não pela média histórica
+    previsao = obter_previsao(df, get_database_engine())
+    metricas['meses_cobertura'] = previsao['meses_cobertura'] if previsao else None
+    
     # Layout principal
     col1, col3 = st.columns([1, 2])
     
@@ -87,7 +72,9 @@ def criar_metricas_e_termometro(df):
         # Termômetro financeiro
         st.markdown("### 🌡️ Termômetro Financeiro")
         
-        if metricas['meses_cobertura'] == float('inf'):
+        if metricas['meses_cobertura'] is None:
+            st.info("Sem transações até o mês atual para projetar a cobertura.")
+        elif metricas['meses_cobertura'] == float('inf'):
             st.success("✨ Sem gastos registrados!")
         else:
             # Criar gauge/termômetro
@@ -124,6 +111,8 @@ def criar_metricas_e_termometro(df):
             
             st.plotly_chart(fig, use_container_width=True)
             
+            st.caption(f"Gastos previstos: R$ {previsao['media_gastos_prevista']:,.2f}/mês nos próximos {len(previsao['projecao'])} meses")
+            
             # Interpretação
             if metricas['meses_cobertura'] < 3:
                 st.warning(f"⚠️ Atenção: Saldo cobre apenas {metricas['meses_cobertura']:.1f} meses")
@@ -132,15 +121,7 @@ def criar_metricas_e_termometro(df):
             else:
                 st.success(f"✅ Excelente! Saldo cobre {metricas['meses_cobertura']:.1f} meses")
 
-@st.cache_data(ttl=config['cache_ttl']['stats'])
-def preparar_dados_pizza(df):
-    """Prepara dados para gráfico de pizza com cache"""
-    if df.empty:
-        return None
-    
-    gastos_df = df[df['Tipo'] == 'Passivo'].groupby('Categorias')['Valor'].sum().reset_index()
-    return gastos_df.sort_values('Valor', ascending=False)
-
+@medir("dashboard.criar_grafico_pizza")
 def criar_grafico_pizza(df):
     """Gráfico de pizza - Distribuição de gastos por categoria"""
     st.subheader("🎯 Distribuição de Gastos por Categoria")
@@ -178,73 +159,111 @@ def criar_grafico_pizza(df):
     else:
         st.info("Nenhum gasto registrado ainda.")
 
-@st.cache_data(ttl=config['cache_ttl']['stats'])
-def preparar_dados_evolucao(df):
-    """Prepara dados para gráfico de evolução com cache"""
-    if df.empty:
-        return None
+def selecionar_periodo_evolucao(df):
+    """Controles de zoom (intervalo de datas) e resolução do gráfico de evolução"""
+    limites = limites_evolucao(df)
+    if limites is None:
+        return None, None, 'M'
+    
+    data_min, data_max = limites
     
-    df_mensal = df.groupby(['MesAno', 'Tipo'])['Valor'].sum().reset_index()
-    df_pivot = df_mensal.pivot(index='MesAno', columns='Tipo', values='Valor').fillna(0)
-    df_pivot['Saldo'] = df_pivot.get('Ativo', 0) - df_pivot.get('Passivo', 0)
-    return df_pivot.reset_index()
+    col_periodo, col_resolucao = st.columns([3, 1])
+    
+    with col_periodo:
+        if data_min < data_max:
+            inicio, fim = st.slider(
+                "Período",
+                min_value=data_min,
+                max_value=data_max,
+                value=(data_min, data_max),
+                format="DD/MM/YYYY",
+                key="evolucao_periodo"
+            )
+        else:
+            inicio, fim = data_min, data_max
+    
+    with col_resolucao:
+        opcoes = ['Automática'] + list(RESOLUCOES.values())
+        escolha = st.selectbox("Resolução", opcoes, key="evolucao_resolucao")
+    
+    # Resolução automática: a mais fina que cabe no orçamento de pontos
+    if escolha == 'Automática':
+        resolucao = escolher_resolucao(inicio, fim, config['grafico']['max_pontos'])
+    else:
+        resolucao = next(cod for cod, nome in RESOLUCOES.items() if nome == escolha)
+    
+    return inicio, fim, resolucao
 
+@medir("dashboard.criar_grafico_evolucao")
 def criar_grafico_evolucao(df):
-    """Gráfico combinado - Evolução e saldo mensal"""
-    st.subheader("📈 Evolução Financeira Mensal")
+    """Gráfico combinado - Evolução e saldo por período"""
+    st.subheader("📈 Evolução Financeira")
     
-    df_pivot = preparar_dados_evolucao(df)
+    if df.empty:
+        st.info("Dados insuficientes para mostrar evolução temporal.")
+        return
+    
+    # Re-agregar conforme o zoom escolhido
+    inicio, fim, resolucao = selecionar_periodo_evolucao(df)
+    df_serie = preparar_dados_evolucao(df, resolucao, inicio, fim)
     
-    if df_pivot is not None and not df_pivot.empty:
+    if df_serie is not None and not df_serie.empty:
+        max_pontos = config['grafico']['max_pontos']
+        nome_resolucao = RESOLUCOES[resolucao]
+        
         # Criar subplot com 2 gráficos
         fig = make_subplots(
             rows=2, cols=1,
             row_heights=[0.7, 0.3],
             shared_xaxes=True,
             vertical_spacing=0.05,
-            subplot_titles=("Receitas vs Gastos", "Saldo Mensal")
+            subplot_titles=("Receitas vs Gastos", f"Saldo ({nome_resolucao})")
         )
         
-        # Gráfico 1: Linhas de receitas e gastos
-        if 'Ativo' in df_pivot.columns:
-            fig.add_trace(
-                go.Scatter(
-                    x=df_pivot['MesAno'],
-                    y=df_pivot['Ativo'],
-                    mode='lines+markers',
-                    name='Receitas',
-                    line=dict(color=CORES['receita'], width=3),
-                    marker=dict(size=8),
-                    hovertemplate='<b>Receitas</b><br>%{x}<br>R$ %{y:,.2f}<extra></extra>'
-                ),
-                row=1, col=1
-            )
+        # Gráfico 1: Linhas de receitas e gastos (reduzidas com LTTB)
+        receitas = reduzir_serie(df_serie, 'Ativo', max_pontos)
+        fig.add_trace(
+            go.Scatter(
+                x=receitas['Periodo'],
+                y=receitas['Ativo'],
+                mode='lines+markers',
+                name='Receitas',
+                line=dict(color=CORES['receita'], width=3),
+                marker=dict(size=8 if len(receitas) <= 60 else 3),
+                hovertemplate='<b>Receitas</b><br>%{x}<br>R$ %{y:,.2f}<extra></extra>'
+            ),
+            row=1, col=1
+        )
         
-        if 'Passivo' in df_pivot.columns:
-            fig.add_trace(
-                go.Scatter(
-                    x=df_pivot['MesAno'],
-                    y=df_pivot['Passivo'],
-                    mode='lines+markers',
-                    name='Gastos',
-                    line=dict(color=CORES['gasto'], width=3),
-                    marker=dict(size=8),
-                    hovertemplate='<b>Gastos</b><br>%{x}<br>R$ %{y:,.2f}<extra></extra>'
-                ),
-                row=1, col=1
-            )
+        gastos = reduzir_serie(df_serie, 'Passivo', max_pontos)
+        fig.add_trace(
+            go.Scatter(
+                x=gastos['Periodo'],
+                y=gastos['Passivo'],
+                mode='lines+markers',
+                name='Gastos',
+                line=dict(color=CORES['gasto'], width=3),
+                marker=dict(size=8 if len(gastos) <= 60 else 3),
+                hovertemplate='<b>Gastos</b><br>%{x}<br>R$ %{y:,.2f}<extra></extra>'
+            ),
+            row=1, col=1
+        )
         
         # Gráfico 2: Barras de saldo
-        cores_saldo = [CORES['saldo_positivo'] if x >= 0 else CORES['saldo_negativo'] for x in df_pivot['Saldo']]
+        saldo = reduzir_serie(df_serie, 'Saldo', max_pontos)
+        cores_saldo = [CORES['saldo_positivo'] if x >= 0 else CORES['saldo_negativo'] for x in saldo['Saldo']]
+        
+        # Rótulos só quando há poucas barras
+        mostrar_rotulos = len(saldo) <= 24
         
         fig.add_trace(
             go.Bar(
-                x=df_pivot['MesAno'],
-                y=df_pivot['Saldo'],
+                x=saldo['Periodo'],
+                y=saldo['Saldo'],
                 marker_color=cores_saldo,
                 name='Saldo',
-                text=[f'R$ {x:,.0f}' for x in df_pivot['Saldo']],
-                textposition='outside',
+                text=[f'R$ {x:,.0f}' for x in saldo['Saldo']] if mostrar_rotulos else None,
+                textposition='outside' if mostrar_rotulos else None,
                 hovertemplate='<b>Saldo</b><br>%{x}<br>R$ %{y:,.2f}<extra></extra>'
             ),
             row=2, col=1
@@ -265,9 +284,99 @@ def criar_grafico_evolucao(df):
         )
         
         st.plotly_chart(fig, use_container_width=True)
+        
+        if len(df_serie) > max_pontos:
+            st.caption(f"📉 {len(df_serie)} períodos reduzidos para até {max_pontos} pontos por série")
     else:
         st.info("Dados insuficientes para mostrar evolução temporal.")
 
+@medir("dashboard.criar_alertas_anomalias")
+def criar_alertas_anomalias():
+    """Gastos recentes fora do padrão da categoria (estatísticas incrementais do banco)"""
+    try:
+        anomalias = anomalias_recentes(get_database_engine())
+    except Exception:
+        return
+    
+    if anomalias.empty:
+        return
+    
+    with st.expander(f"⚠️ Gastos fora do padrão ({len(anomalias)})"):
+        for _, linha in anomalias.head(10).iterrows():
+            st.markdown(f"- **{linha['Data']}** · {descrever(linha)}")
+
+@medir("dashboard.criar_grafico_projecao")
+def criar_grafico_projecao(df):
+    """Saldo realizado + projeção dos próximos meses (receitas/gastos previstos por categoria)"""
+    st.subheader("🔮 Projeção de Saldo")
+    
+    if df.empty:
+        st.info("Sem dados para projetar.")
+        return
+    
+    horizonte = st.slider("Meses à frente", min_value=3, max_value=24, value=HORIZONTE_PADRAO, key="horizonte_projecao")
+    previsao = obter_previsao(df, get_database_engine(), horizonte)
+    if previsao is None:
+        st.info("Sem transações até o mês atual para projetar.")
+        return
+    historico = previsao['historico'].tail(24)
+    projecao = previsao['projecao']
+    
+    fig = make_subplots(specs=[[{"secondary_y": True}]])
+    
+    # Fluxo previsto do mês (barras)
+    fig.add_trace(go.Bar(
+        x=projecao['Periodo'].astype(str), y=projecao['Receitas'],
+        name='Receitas previstas', marker_color=CORES['receita'], opacity=0.5
+    ), secondary_y=False)
+    fig.add_trace(go.Bar(
+        x=projecao['Periodo'].astype(str), y=projecao['Gastos'],
+        name='Gastos previstos', marker_color=CORES['gasto'], opacity=0.5
+    ), secondary_y=False)
+    
+    # Saldo acumulado: realizado (linha cheia) e projetado (tracejado)
+    fig.add_trace(go.Scatter(
+        x=historico['Periodo'].astype(str), y=historico['Saldo'],
+        name='Saldo realizado', mode='lines', line=dict(color=CORES['neutral'], width=2)
+    ), secondary_y=True)
+    fig.add_trace(go.Scatter(
+        x=projecao['Periodo'].astype(str), y=projecao['Saldo'],
+        name='Saldo projetado', mode='lines+markers',
+        line=dict(
+            color=CORES['saldo_positivo'] if projecao['Saldo'].iloc[-1] >= 0 else CORES['saldo_negativo'],
+            width=3, dash='dash'
+        )
+    ), secondary_y=True)
+    
+    fig.update_layout(
+        height=400,
+        barmode='group',
+        hovermode='x unified',
+        margin=dict(l=0, r=0, t=30, b=0),
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+    )
+    fig.update_yaxes(title_text="Fluxo mensal (R$)", secondary_y=False)
+    fig.update_yaxes(title_text="Saldo (R$)", secondary_y=True)
+    
+    st.plotly_chart(fig, use_container_width=True)
+    
+    # Maiores itens previstos para o próximo mês
+    with st.expander("📋 Previsão por categoria"):
+        tabela = previsao['por_categoria'][['Categorias', 'Tipo', 'media_movel', 'proximo_mes', 'total_horizonte']]
+        st.dataframe(
+            tabela,
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "Categorias": st.column_config.TextColumn("🏷️ Categoria"),
+                "Tipo": st.column_config.TextColumn("Tipo"),
+                "media_movel": st.column_config.NumberColumn("Média recente", format="R$ %.2f"),
+                "proximo_mes": st.column_config.NumberColumn("Próximo mês", format="R$ %.2f"),
+                "total_horizonte": st.column_config.NumberColumn(f"Total {horizonte} meses", format="R$ %.2f"),
+            }
+        )
+
+@medir("dashboard.criar_tabela_transacoes")
 def criar_tabela_transacoes(df):
     """Exibe tabela de transações recentes"""
     st.subheader("📋 Transações Recentes")
@@ -276,9 +385,17 @@ def criar_tabela_transacoes(df):
         st.info("Nenhuma transação registrada.")
         return
     
+    # Busca pelo índice de texto (sem acentos); sem termo, as mais recentes
+    termo = st.text_input("🔎 Buscar transações", placeholder="Ex.: ração, uber, farmacia", key="busca_transacoes")
+    if termo.strip():
+        df = buscar_transacoes(get_database_engine(), termo)
+        if df.empty:
+            st.info(f"Nenhuma transação encontrada para \"{termo}\".")
+            return
+    
     # Preparar dados
     df_display = df.copy()
-    df_display['Data'] = pd.to_datetime(df_display['Data'], format='mixed').dt.strftime('%d/%m/%Y')
+    df_display['Data'] = converter_datas(df_display['Data']).dt.strftime('%d/%m/%Y')
     df_display['Valor_Formatado'] = df_display.apply(
         lambda x: f"+ R$ {x['Valor']:,.2f}" if x['Tipo'] == 'Ativo' else f"- R$ {x['Valor']:,.2f}",
         axis=1
@@ -301,6 +418,61 @@ def criar_tabela_transacoes(df):
         }
     )
 
+def gerar_exportacao(formato, inicio, fim, categorias):
+    """
+    Executado no clique do download: gera o arquivo em blocos num temporário
+    e entrega os bytes ao Streamlit, que os guarda em memória para servir
+    """
+    with exportar(get_database_engine(), formato, inicio, fim, categorias) as arquivo:
+        return arquivo.read()
+
+@medir("dashboard.criar_exportacao")
+def criar_exportacao(df):
+    """Download do histórico filtrado; o arquivo só é gerado no clique, em blocos"""
+    if df.empty:
+        return
+    
+    with st.expander("⬇️ Exportar histórico"):
+        datas = converter_datas(df['Data']).dropna()
+        col1, col2, col3 = st.columns([1.2, 1.5, 0.8])
+        
+        with col1:
+            periodo = st.date_input(
+                "Período",
+                value=(datas.min().date(), datas.max().date()),
+                format="DD/MM/YYYY",
+                key="exportacao_periodo"
+            )
+        with col2:
+            categorias = st.multiselect(
+                "Categorias",
+                sorted(df['Categorias'].dropna().unique()),
+                placeholder="Todas",
+                key="exportacao_categorias"
+            )
+        with col3:
+            formato = st.selectbox(
+                "Formato",
+                formatos_disponiveis(),
+                format_func=lambda f: FORMATOS[f][0],
+                key="exportacao_formato"
+            )
+        
+        # Período ainda sendo escolhido (só a data inicial)
+        if len(periodo) != 2:
+            st.caption("Selecione a data final do período.")
+            return
+        
+        inicio, fim = periodo
+        _, extensao, mime = FORMATOS[formato]
+        st.download_button(
+            f"⬇️ Baixar {FORMATOS[formato][0]}",
+            data=partial(gerar_exportacao, formato, inicio, fim, categorias),
+            file_name=f"transacoes_{inicio:%Y%m%d}_{fim:%Y%m%d}.{extensao}",
+            mime=mime,
+            key="exportacao_download"
+        )
+
 # Interface principal do dashboard
 @require_auth
 def main():
@@ -325,6 +497,9 @@ def main():
     # Métricas e termômetro
     criar_metricas_e_termometro(df)
     
+    # Alertas de gastos atípicos
+    criar_alertas_anomalias()
+    
     st.markdown("---")
     
     # Gráficos principais
@@ -338,15 +513,24 @@ def main():
     
     st.markdown("---")
     
+    # Projeção de fluxo de caixa
+    criar_grafico_projecao(df)
+    
+    st.markdown("---")
+    
     # Tabela de transações
     criar_tabela_transacoes(df)
     
+    # Exportação do histórico
+    criar_exportacao(df)
+    
     # Botão de atualização
+    st.caption(f"⚙️ Motor analítico: {'DuckDB' if usar_duckdb() else 'pandas'}")
     col1, col2, col3 = st.columns([1, 1, 1])
     with col2:
         if st.button("🔄 Atualizar Dashboard", key="refresh_dashboard", use_container_width=True):
             # Limpar cache específico do dashboard
-            st.cache_data.clear()
+            invalidate_cache(snapshot_desatualizado=True, aguardar=True)
             st.rerun()
 
 if __name__ == "__main__":
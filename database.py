@@ -1,7 +1,22 @@
 import os
+import time
+from functools import partial
 import streamlit as st
 from sqlalchemy import create_engine, text
 import pandas as pd
+from config import get_app_config
+from tracing import medir
+from singleflight import get_single_flight
+from changefeed import instalar_change_feed, iniciar_observador, ler_versao
+from historico import init_historico
+from sessoes import instalar_sessoes
+from busca import instalar_busca
+from anomalias import instalar_estatisticas
+from datas import instalar_datas, migrar_datas, normalizar_data
+from arquivo import instalar_arquivo, arquivar
+from snapshot import snapshot_disponivel, ler_snapshot, salvar_snapshot, remover_snapshot
+from pool import criar_engine_postgres
+from atualizador import get_atualizador
 
 @st.cache_resource
 def get_database_engine():
@@ -12,7 +27,7 @@ def get_database_engine():
     # Produção: PostgreSQL (se configurado)
     if "DATABASE_URL" in st.secrets.get("database", {}):
         db_url = st.secrets["database"]["DATABASE_URL"]
-        engine = create_engine(db_url, pool_pre_ping=True)
+        engine = criar_engine_postgres(db_url, 'escrita')
     
     # Desenvolvimento/Padrão: SQLite
     else:
@@ -22,6 +37,52 @@ def get_database_engine():
     
     # Inicializar tabela se não existir
     init_database(engine)
+    
+    # Invalidar caches quando qualquer réplica/processo escrever no banco
+    iniciar_observador(engine, _ao_mudar_dados, get_app_config()['change_feed']['intervalo'])
+    return engine
+
+@st.cache_resource
+def get_engine_leitura():
+    """
+    Engine da réplica de leitura (DATABASE_REPLICA_URL), se configurada.
+    Retorna None quando as leituras devem ir ao banco principal.
+    """
+    database = st.secrets.get("database", {})
+    if "DATABASE_URL" in database and "DATABASE_REPLICA_URL" in database:
+        return criar_engine_postgres(database["DATABASE_REPLICA_URL"], 'leitura')
+    return None
+
+@st.cache_resource
+def get_engine_agente():
+    """
+    Engine das leituras do agente: réplica (ou principal) com o statement_timeout
+    mais curto do papel 'agente'. No SQLite é o próprio engine principal.
+    """
+    database = st.secrets.get("database", {})
+    if "DATABASE_URL" in database:
+        return criar_engine_postgres(database.get("DATABASE_REPLICA_URL", database["DATABASE_URL"]), 'agente')
+    return get_database_engine()
+
+# Momento (monotonic) da última escrita vista por este processo
+_ultima_escrita = [0.0]
+
+def marcar_escrita():
+    """Registra uma escrita: por alguns segundos as leituras vão ao principal"""
+    _ultima_escrita[0] = time.monotonic()
+
+def escrita_recente():
+    """True se houve escrita há menos de pool.leitura_propria segundos (a réplica pode não tê-la)"""
+    return time.monotonic() - _ultima_escrita[0] < get_app_config()['pool']['leitura_propria']
+
+def _para_leitura(engine):
+    """
+    Troca o engine principal pela réplica de leitura (quando houver), exceto
+    logo após uma escrita: aí lê do principal, para ver a própria escrita.
+    """
+    replica = get_engine_leitura()
+    if replica is not None and engine is get_database_engine() and not escrita_recente():
+        return replica
     return engine
 
 def init_database(engine):
@@ -49,85 +110,280 @@ def init_database(engine):
                     "SERIAL PRIMARY KEY"
                 )
                 conn.execute(text(create_table_sql_pg))
+            
+            # Versão dos dados + triggers para o change feed
+            instalar_change_feed(conn)
+            
+            # Anos fechados: arquivo + resumo mensal, e a view com o histórico completo
+            instalar_arquivo(conn)
+            
+            # Índice de texto da descrição, na tabela atual e no arquivo (busca sem acentos)
+            instalar_busca(conn)
+            
+            # Estatísticas por categoria para detectar gastos fora do padrão
+            instalar_estatisticas(conn)
+            
+            # Histórico persistido do chat
+            init_historico(conn)
+            
+            # Geração das sessões de login (revogação dos tokens no logout)
+            instalar_sessoes(conn)
+            
+            # Datas no formato ISO (normalizadas na escrita) + índice para filtros de período
+            instalar_datas(conn)
             conn.commit()
+            
+            # Datas antigas em outros formatos: migração em lotes (só roda se houver)
+            if migrar_datas(conn):
+                remover_snapshot()
+            
+            # Anos fechados saem da tabela atual (em lotes por ano)
+            config_arquivo = get_app_config()['arquivo']
+            if config_arquivo['automatico']:
+                arquivar(conn, config_arquivo['anos_quentes'])
     except Exception as e:
         st.error(f"Erro ao inicializar banco: {e}")
 
-@st.cache_data(ttl=300)  # Cache por 5 minutos
-def carregar_dados(_engine):
+def _query_dados(dialeto, apenas_novos=False):
+    """Monta a query do livro-caixa (opcionalmente só as linhas com id acima de :corte)"""
+    filtro = "WHERE id > :corte" if apenas_novos else ""
+    
+    # PostgreSQL
+    if dialeto == 'postgresql':
+        return f"""
+        SELECT id, Data, Descrição, Valor, Categorias, Tipo,
+               TO_CHAR(Data, 'YYYY-MM') as MesAno,
+               EXTRACT(YEAR FROM Data)::TEXT as Ano,
+               EXTRACT(MONTH FROM Data)::TEXT as Mes
+        FROM receita_gastos_completa 
+        {filtro}
+        ORDER BY Data DESC
+        """
+    
+    # SQLite
+    return f"""
+    SELECT id, Data, Descrição, Valor, Categorias, Tipo, 
+           strftime('%Y-%m', Data) as MesAno,
+           strftime('%Y', Data) as Ano,
+           strftime('%m', Data) as Mes
+    FROM receita_gastos_completa 
+    {filtro}
+    ORDER BY Data DESC
+    """
+
+def _ler_completo_e_salvar(engine, dialeto):
+    """Leitura completa do livro-caixa + gravação do snapshot colunar"""
+    versao = get_versao_dados(engine)
+    df = pd.read_sql(text(_query_dados(dialeto)), engine)
+    salvar_snapshot(df, versao_reescrita=versao[1])
+    df.attrs['versao_dados'] = versao
+    return df
+
+@medir("db.carregar_dados")
+def ler_dados(engine):
+    """
+    Lê o livro-caixa (sem cache): usa o snapshot colunar (se houver)
+    e busca no banco só o delta. df.attrs['versao_dados'] guarda a versão
+    do change feed lida antes da consulta.
+    O snapshot vale enquanto não houver UPDATE/DELETE (versao_reescrita) e
+    só é gravado a partir do principal: a réplica pode estar atrasada.
+    """
+    principal = engine
+    engine = _para_leitura(engine)
+    dialeto = engine.dialect.name
+    config = get_app_config()['snapshot']
+    
+    snapshot = None
+    if snapshot_disponivel():
+        versao_principal = get_versao_dados(principal)
+        snapshot = ler_snapshot(max_idade=config['max_idade'], versao_reescrita=versao_principal[1])
+    
+    # Cold start: leitura completa (do principal) e criação do snapshot
+    if snapshot is None:
+        # Sessões concorrentes com cache vazio compartilham uma única leitura
+        return get_single_flight().executar(
+            "carregar_dados:completo", _ler_completo_e_salvar, principal, dialeto
+        )
+    
+    # Versão lida antes dos dados: o DataFrame é no mínimo tão novo quanto ela
+    versao = get_versao_dados(engine)
+    
+    # PostgreSQL: relê uma janela abaixo do max_id (ids commitados fora de ordem)
+    df_snapshot, max_id = snapshot
+    corte = max_id - config['janela_ids'] if dialeto == 'postgresql' else max_id
+    delta = get_single_flight().executar(
+        f"carregar_dados:delta:{corte}",
+        pd.read_sql, text(_query_dados(dialeto, apenas_novos=True)), engine, params={'corte': corte}
+    )
+    
+    if delta.empty:
+        df_snapshot.attrs['versao_dados'] = versao
+        return df_snapshot
+    
+    if corte < max_id:
+        df_snapshot = df_snapshot[df_snapshot['id'] <= corte]
+    df = pd.concat([delta, df_snapshot], ignore_index=True)
+    df = df.sort_values('Data', ascending=False, kind='stable', ignore_index=True)
+    
+    # Compactar: delta grande (lido do principal) vira snapshot novo
+    if int((delta['id'] > max_id).sum()) >= config['max_delta'] and engine is principal:
+        salvar_snapshot(df, versao_reescrita=versao[1])
+    
+    df.attrs['versao_dados'] = versao
+    return df
+
+def carregar_dados(engine):
     """
-    Carrega dados do banco com cache.
-    O underscore em _engine evita que o engine seja hasheado.
+    Carrega dados com cache stale-while-revalidate: devolve na hora o último
+    DataFrame bom e recarrega em background quando o TTL vence ou há escrita.
+    Só o primeiro acesso do processo (normalmente feito pelo prewarm) espera a leitura.
     """
     try:
-        query = """
-        SELECT Data, Descrição, Valor, Categorias, Tipo, 
-               strftime('%Y-%m', Data) as MesAno,
-               strftime('%Y', Data) as Ano,
-               strftime('%m', Data) as Mes
-        FROM receita_gastos 
-        ORDER BY Data DESC
-        """
-        
-        # Ajustar query para PostgreSQL
-        if _engine.dialect.name == 'postgresql':
-            query = """
-            SELECT Data, Descrição, Valor, Categorias, Tipo,
-                   TO_CHAR(Data, 'YYYY-MM') as MesAno,
-                   EXTRACT(YEAR FROM Data)::TEXT as Ano,
-                   EXTRACT(MONTH FROM Data)::TEXT as Mes
-            FROM receita_gastos 
-            ORDER BY Data DESC
-            """
-        
-        df = pd.read_sql(query, _engine)
-        return df
+        return get_atualizador().servir('dados', partial(ler_dados, engine), get_app_config()['cache_ttl']['data'])
     except Exception as e:
         st.error(f"Erro ao carregar dados: {e}")
         return pd.DataFrame()
 
+# Agregações cacheadas: erros de consulta sobem para quem chamou, em vez de
+# virarem um DataFrame vazio que se confunde com "sem transações"
 @st.cache_data(ttl=300)  # Cache por 5 minutos
+@medir("db.get_summary_stats")
 def get_summary_stats(_engine):
     """Retorna estatísticas resumidas com cache"""
-    try:
-        query = """
-        SELECT 
-            Tipo,
-            COUNT(*) as total_transacoes,
-            SUM(Valor) as valor_total,
-            AVG(Valor) as valor_medio,
-            MAX(Valor) as valor_maximo,
-            MIN(Valor) as valor_minimo
+    # Tabela quente + resumo pré-calculado dos anos arquivados
+    query = """
+    SELECT 
+        Tipo,
+        SUM(qtd) as total_transacoes,
+        SUM(total) as valor_total,
+        SUM(total) / SUM(qtd) as valor_medio,
+        MAX(maximo) as valor_maximo,
+        MIN(minimo) as valor_minimo
+    FROM (
+        SELECT Tipo, COUNT(*) as qtd, SUM(Valor) as total, MAX(Valor) as maximo, MIN(Valor) as minimo
         FROM receita_gastos
         GROUP BY Tipo
-        """
-        
-        return pd.read_sql(query, _engine)
-    except:
-        return pd.DataFrame()
+        UNION ALL
+        SELECT Tipo, qtd, total, maximo, minimo FROM resumo_mensal_arquivo
+    ) partes
+    GROUP BY Tipo
+    """
+    
+    return pd.read_sql(query, _para_leitura(_engine))
 
 @st.cache_data(ttl=300)
-def get_category_summary(_engine):
-    """Retorna resumo por categoria com cache"""
-    try:
-        query = """
-        SELECT 
-            Categorias,
-            Tipo,
-            COUNT(*) as qtd,
-            SUM(Valor) as total
+@medir("db.get_category_summary")
+def get_category_summary(_engine, inicio=None, fim=None):
+    """
+    Retorna resumo por categoria com cache.
+    inicio/fim (YYYY-MM-DD, fim exclusivo) restringem o período pelo índice de Data;
+    sem período, os anos arquivados vêm do resumo pré-calculado.
+    """
+    filtros = []
+    if inicio is not None:
+        filtros.append("Data >= :inicio")
+    if fim is not None:
+        filtros.append("Data < :fim")
+    
+    if filtros:
+        origem = f"""
+        SELECT Categorias, Tipo, COUNT(*) as qtd, SUM(Valor) as total
+        FROM receita_gastos_completa
+        WHERE {' AND '.join(filtros)}
+        GROUP BY Categorias, Tipo
+        """
+    else:
+        origem = """
+        SELECT Categorias, Tipo, COUNT(*) as qtd, SUM(Valor) as total
         FROM receita_gastos
         GROUP BY Categorias, Tipo
-        ORDER BY total DESC
+        UNION ALL
+        SELECT Categorias, Tipo, qtd, total FROM resumo_mensal_arquivo
         """
-        
-        return pd.read_sql(query, _engine)
-    except:
-        return pd.DataFrame()
+    
+    query = f"""
+    SELECT 
+        Categorias,
+        Tipo,
+        SUM(qtd) as qtd,
+        SUM(total) as total
+    FROM ({origem}) partes
+    GROUP BY Categorias, Tipo
+    ORDER BY total DESC
+    """
+    
+    return pd.read_sql(text(query), _para_leitura(_engine), params={'inicio': inicio, 'fim': fim})
 
-def invalidate_cache():
-    """Invalida todos os caches quando há mudanças nos dados"""
-    st.cache_data.clear()
+@st.cache_data(ttl=300)
+@medir("db.get_monthly_summary")
+def get_monthly_summary(_engine, inicio):
+    """Retorna receitas, gastos e número de transações por mês (a partir de inicio, YYYY-MM-DD) com cache"""
+    _engine = _para_leitura(_engine)
+    mes = "TO_CHAR(Data, 'YYYY-MM')" if _engine.dialect.name == 'postgresql' else "strftime('%Y-%m', Data)"
+    query = f"""
+    SELECT 
+        {mes} as MesAno,
+        COUNT(*) as qtd,
+        COALESCE(SUM(CASE WHEN Tipo = 'Ativo' THEN Valor END), 0) as receitas,
+        COALESCE(SUM(CASE WHEN Tipo = 'Passivo' THEN Valor END), 0) as gastos
+    FROM receita_gastos_completa
+    WHERE Data >= :inicio
+    GROUP BY MesAno
+    ORDER BY MesAno
+    """
+    
+    df = pd.read_sql(text(query), _engine, params={'inicio': inicio})
+    df['saldo'] = df['receitas'] - df['gastos']
+    return df
+
+@st.cache_data(ttl=300)
+@medir("db.get_recent_transactions")
+def get_recent_transactions(_engine, limite):
+    """Retorna as últimas transações (pela data, mais recentes primeiro) com cache"""
+    query = """
+    SELECT id, Data, Descrição, Valor, Categorias, Tipo
+    FROM receita_gastos_completa
+    ORDER BY Data DESC, id DESC
+    LIMIT :limite
+    """
+    
+    return pd.read_sql(text(query), _para_leitura(_engine), params={'limite': int(limite)})
+
+def invalidate_cache(snapshot_desatualizado=False, aguardar=False):
+    """
+    Invalida os caches de dados quando há mudanças no livro-caixa.
+    INSERTs são cobertos pelo delta do snapshot; UPDATE/DELETE o descartam
+    (e o snapshot também deixa de valer pela versao_reescrita gravada nele).
+    Caches de visão/transcrição não dependem do banco e são mantidos.
+    O livro-caixa é recarregado em background (quem lê nesse meio-tempo recebe
+    o valor anterior); aguardar=True espera a recarga, para quem acabou de
+    escrever ver a própria escrita no próximo rerun.
+    Os caches do dashboard são chaveados pelo DataFrame e o atualizador os reaquece.
+    """
+    marcar_escrita()
+    if snapshot_desatualizado:
+        remover_snapshot()
+    get_summary_stats.clear()
+    get_category_summary.clear()
+    get_monthly_summary.clear()
+    get_recent_transactions.clear()
+    
+    atualizador = get_atualizador()
+    atualizador.invalidar()
+    if aguardar:
+        atualizador.aguardar(get_app_config()['atualizador']['espera_escrita'])
+
+def get_versao_dados(engine):
+    """Retorna (versao, versao_reescrita) mantidas pelos triggers do change feed"""
+    try:
+        with engine.connect() as conn:
+            return ler_versao(conn)
+    except Exception:
+        return (None, None)
+
+def _ao_mudar_dados(reescrita):
+    """Callback do change feed: escrita detectada (possivelmente em outra réplica)"""
+    invalidate_cache(snapshot_desatualizado=reescrita)
 
 # Funções para manipulação de dados (sem cache)
 def insert_transaction(engine, data, descricao, valor, categoria, tipo):
@@ -140,7 +396,7 @@ def insert_transaction(engine, data, descricao, valor, categoria, tipo):
             """)
             
             conn.execute(query, {
-                'data': data,
+                'data': normalizar_data(data),
                 'descricao': descricao,
                 'valor': valor,
                 'categoria': categoria,
@@ -155,6 +411,33 @@ def insert_transaction(engine, data, descricao, valor, categoria, tipo):
         st.error(f"Erro ao inserir transação: {e}")
         return False
 
+def insert_transactions(engine, transacoes):
+    """
+    Insere várias transações (dicts com data, descricao, valor, categoria, tipo)
+    numa única transação via executemany: tudo ou nada, um commit e uma invalidação de cache.
+    Erros do banco sobem para quem chamou (a ferramenta do agente devolve o texto ao modelo).
+    """
+    with engine.connect() as conn:
+        query = text("""
+            INSERT INTO receita_gastos (Data, Descrição, Valor, Categorias, Tipo)
+            VALUES (:data, :descricao, :valor, :categoria, :tipo)
+        """)
+        
+        conn.execute(query, [
+            {
+                'data': normalizar_data(t['data']),
+                'descricao': t['descricao'],
+                'valor': t['valor'],
+                'categoria': t['categoria'],
+                'tipo': t['tipo']
+            }
+            for t in transacoes
+        ])
+        conn.commit()
+    
+    # Invalidar cache uma vez para o lote inteiro
+    invalidate_cache()
+
 def delete_transaction(engine, transaction_id):
     """Deleta transação e invalida cache"""
     try:
@@ -164,7 +447,7 @@ def delete_transaction(engine, transaction_id):
             conn.commit()
         
         # Invalidar cache após deleção
-        invalidate_cache()
+        invalidate_cache(snapshot_desatualizado=True)
         return True
     except Exception as e:
         st.error(f"Erro ao deletar transação: {e}")
@@ -0,0 +1,130 @@
+import logging
+import re
+from datetime import date
+
+logger = logging.getLogger(__name__)
+
+# Formato canônico da coluna Data: texto ISO (YYYY-MM-DD), que ordena e
+# compara como data e usa o índice em filtros de período.
+# No PostgreSQL a coluna já é DATE de verdade; só o SQLite guarda texto livre.
+FORMATO_ISO = '%Y-%m-%d'
+
+# Linhas atualizadas por transação na migração das datas antigas
+LOTE_MIGRACAO = 5000
+
+# Já canônica (o GLOB não usa índice, mas só roda na migração)
+_ISO_GLOB = "'[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]'"
+
+def _canonica(v):
+    """
+    Expressão SQLite que leva {v} ao formato ISO (NULL se não reconhecer).
+    Aceita YYYY-MM-DD, YYYY/MM/DD (com ou sem hora) e DD/MM/YYYY.
+    """
+    return f"""(CASE
+        WHEN {v} GLOB '[0-9][0-9]/[0-9][0-9]/[0-9][0-9][0-9][0-9]*'
+            THEN date(substr({v}, 7, 4) || '-' || substr({v}, 4, 2) || '-' || substr({v}, 1, 2))
+        ELSE date(replace({v}, '/', '-'))
+    END)"""
+
+_DD_MM_AAAA = re.compile(r'(\d{2})/(\d{2})/(\d{4})')
+_AAAA_MM_DD = re.compile(r'(\d{4})[-/](\d{2})[-/](\d{2})')
+
+def normalizar_data(v):
+    """
+    Leva a data ao formato ISO antes do INSERT (mesmas variantes de _canonica).
+    Feito na aplicação para a inserção não precisar de um UPDATE, que contaria
+    como reescrita e invalidaria o snapshot. Valor irreconhecível volta como
+    está e o trigger do banco o recusa.
+    """
+    if isinstance(v, date):
+        return v.strftime(FORMATO_ISO)
+    texto = str(v).strip()
+    partes = _DD_MM_AAAA.match(texto)
+    if partes:
+        dia, mes, ano = partes.groups()
+    else:
+        partes = _AAAA_MM_DD.match(texto)
+        if not partes:
+            return v
+        ano, mes, dia = partes.groups()
+    try:
+        return date(int(ano), int(mes), int(dia)).strftime(FORMATO_ISO)
+    except ValueError:
+        return v
+
+INDICE_SQL = "CREATE INDEX IF NOT EXISTS idx_receita_gastos_data ON receita_gastos (Data)"
+
+# INSERT: só aceita a data já canônica (a aplicação normaliza com normalizar_data),
+# sem AFTER INSERT reescrevendo a linha: um UPDATE ali contaria como reescrita.
+# UPDATE: recusa datas irreconhecíveis e o AFTER reescreve as variantes no formato
+# ISO (só toca a linha se ela não estiver canônica).
+DDL_SQLITE = [
+    INDICE_SQL,
+    # Versões anteriores normalizavam o INSERT com um UPDATE no AFTER
+    "DROP TRIGGER IF EXISTS trg_receita_gastos_data_insert",
+    "DROP TRIGGER IF EXISTS trg_receita_gastos_data_validar_insert",
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_receita_gastos_data_canonica_insert BEFORE INSERT ON receita_gastos
+    WHEN new.Data IS NOT {_canonica('new.Data')}
+    BEGIN
+        SELECT RAISE(ABORT, 'Data inválida: use o formato YYYY-MM-DD');
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_receita_gastos_data_validar_update BEFORE UPDATE OF Data ON receita_gastos
+    WHEN {_canonica('new.Data')} IS NULL
+    BEGIN
+        SELECT RAISE(ABORT, 'Data inválida: use o formato YYYY-MM-DD');
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_receita_gastos_data_update AFTER UPDATE OF Data ON receita_gastos
+    WHEN new.Data IS NOT {_canonica('new.Data')}
+    BEGIN
+        UPDATE receita_gastos SET Data = {_canonica('new.Data')} WHERE id = new.id;
+    END
+    """
+]
+
+# DATE nativo: o próprio tipo valida e normaliza na escrita
+DDL_POSTGRES = [INDICE_SQL]
+
+def instalar_datas(conn):
+    """Cria o índice de Data e (no SQLite) os triggers de normalização (idempotente)"""
+    for comando in (DDL_SQLITE if conn.dialect.name == 'sqlite' else DDL_POSTGRES):
+        conn.exec_driver_sql(comando)
+
+def migrar_datas(conn, lote=LOTE_MIGRACAO):
+    """
+    Reescreve no formato ISO as datas gravadas antes da normalização,
+    em lotes por faixa de id (uma transação por lote, sem travar o banco
+    inteiro). Datas irreconhecíveis ficam como estão e são registradas no log.
+    Retorna o número de linhas migradas.
+    """
+    if conn.dialect.name != 'sqlite':
+        return 0
+
+    menor, maior = conn.exec_driver_sql(
+        f"SELECT MIN(id), MAX(id) FROM receita_gastos WHERE NOT (Data GLOB {_ISO_GLOB})"
+    ).fetchone()
+    if menor is None:
+        return 0
+
+    migradas = 0
+    for inicio in range(menor - 1, maior, lote):
+        migradas += conn.exec_driver_sql(
+            f"""
+            UPDATE receita_gastos SET Data = {_canonica('Data')}
+            WHERE id > ? AND id <= ? AND NOT (Data GLOB {_ISO_GLOB}) AND {_canonica('Data')} IS NOT NULL
+            """,
+            (inicio, inicio + lote)
+        ).rowcount
+        conn.commit()
+
+    invalidas = conn.exec_driver_sql(
+        f"SELECT COUNT(*) FROM receita_gastos WHERE NOT (Data GLOB {_ISO_GLOB})"
+    ).scalar()
+    if invalidas:
+        logger.warning("%d transações com data irreconhecível mantidas como estão", invalidas)
+
+    return migradas
@@ -0,0 +1,135 @@
+import tempfile
+from importlib.util import find_spec
+import pandas as pd
+from sqlalchemy import bindparam, text
+
+from tracing import span
+
+# pyarrow é opcional: sem ele a exportação Parquet fica indisponível
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+# Linhas por bloco lido do cursor do servidor
+TAMANHO_BLOCO = 5000
+
+# Acima disso o arquivo temporário sai da memória para o disco
+MAX_MEMORIA_SPOOL = 8 * 1024 * 1024
+
+COLUNAS = ['id', 'Data', 'Descrição', 'Valor', 'Categorias', 'Tipo']
+
+# formato -> (rótulo, extensão, MIME)
+FORMATOS = {
+    'csv': ('CSV', 'csv', 'text/csv'),
+    'xlsx': ('Excel (XLSX)', 'xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    'parquet': ('Parquet', 'parquet', 'application/vnd.apache.parquet')
+}
+
+def formatos_disponiveis():
+    """Formatos que podem ser gerados neste ambiente"""
+    disponiveis = ['csv']
+    if find_spec('xlsxwriter') or find_spec('openpyxl'):
+        disponiveis.append('xlsx')
+    if pa is not None:
+        disponiveis.append('parquet')
+    return disponiveis
+
+def _consulta(dialeto, inicio, fim, categorias):
+    """SELECT filtrado (período pelo índice de Data), na ordem da PK"""
+    filtros = []
+    params = {}
+    if inicio is not None:
+        filtros.append("Data >= :inicio")
+        params['inicio'] = str(inicio)
+    if fim is not None:
+        filtros.append("Data <= :fim")
+        params['fim'] = str(fim)
+    if categorias:
+        filtros.append("Categorias IN :categorias")
+        params['categorias'] = list(categorias)
+
+    where = f"WHERE {' AND '.join(filtros)}" if filtros else ""
+    consulta = text(f"SELECT {', '.join(COLUNAS)} FROM receita_gastos_completa {where} ORDER BY id")
+    if categorias:
+        consulta = consulta.bindparams(bindparam('categorias', expanding=True))
+    return consulta, params
+
+def ler_em_blocos(engine, inicio=None, fim=None, categorias=None, tamanho=TAMANHO_BLOCO):
+    """Gera DataFrames de até `tamanho` linhas lidos por cursor do lado do servidor"""
+    consulta, params = _consulta(engine.dialect.name, inicio, fim, categorias)
+    with engine.connect() as conn:
+        resultado = conn.execution_options(stream_results=True, max_row_buffer=tamanho).execute(consulta, params)
+        for linhas in resultado.partitions(tamanho):
+            yield pd.DataFrame(linhas, columns=COLUNAS)
+
+def _escrever_csv(blocos, arquivo):
+    # BOM para o Excel reconhecer UTF-8 (acentos)
+    arquivo.write('\ufeff'.encode())
+    for i, bloco in enumerate(blocos):
+        arquivo.write(bloco.to_csv(index=False, header=(i == 0)).encode())
+    return arquivo
+
+def _escrever_xlsx(blocos, arquivo):
+    # Escritores em modo streaming: cada linha vai para o disco, a planilha não fica em memória
+    try:
+        import xlsxwriter
+    except ImportError:
+        xlsxwriter = None
+
+    if xlsxwriter is not None:
+        livro = xlsxwriter.Workbook(arquivo, {'constant_memory': True, 'in_memory': False})
+        planilha = livro.add_worksheet("Transações")
+        planilha.write_row(0, 0, COLUNAS)
+        linha_atual = 1
+        for bloco in blocos:
+            for linha in bloco.itertuples(index=False):
+                planilha.write_row(linha_atual, 0, linha)
+                linha_atual += 1
+        livro.close()
+        return arquivo
+
+    from openpyxl import Workbook
+    livro = Workbook(write_only=True)
+    planilha = livro.create_sheet("Transações")
+    planilha.append(COLUNAS)
+    for bloco in blocos:
+        for linha in bloco.itertuples(index=False):
+            planilha.append(list(linha))
+    livro.save(arquivo)
+    return arquivo
+
+def _escrever_parquet(blocos, arquivo):
+    # Cada bloco vira um row group; o esquema é fixo para todos
+    esquema = pa.schema([
+        ('id', pa.int64()),
+        ('Data', pa.string()),
+        ('Descrição', pa.string()),
+        ('Valor', pa.float64()),
+        ('Categorias', pa.string()),
+        ('Tipo', pa.string())
+    ])
+    with pq.ParquetWriter(arquivo, esquema, compression='zstd') as escritor:
+        for bloco in blocos:
+            bloco = bloco.astype({'id': 'int64', 'Data': 'str', 'Valor': 'float64'})
+            escritor.write_table(pa.Table.from_pandas(bloco, schema=esquema, preserve_index=False))
+    return arquivo
+
+ESCRITORES = {
+    'csv': _escrever_csv,
+    'xlsx': _escrever_xlsx,
+    'parquet': _escrever_parquet
+}
+
+def exportar(engine, formato, inicio=None, fim=None, categorias=None):
+    """
+    Exporta o livro-caixa (com filtros opcionais) lendo em blocos e gravando
+    num arquivo temporário que vai para o disco quando cresce: a memória
+    não depende do tamanho do histórico. Retorna o arquivo já no início.
+    """
+    arquivo = tempfile.SpooledTemporaryFile(max_size=MAX_MEMORIA_SPOOL)
+    with span(f"exportacao.{formato}"):
+        ESCRITORES[formato](ler_em_blocos(engine, inicio, fim, categorias), arquivo)
+    arquivo.seek(0)
+    return arquivo
@@ -0,0 +1,409 @@
+import json
+import re
+from dataclasses import dataclass
+from datetime import date
+from typing import List, Optional
+from agno.tools import Toolkit
+from agno.tools.sql import SQLTools
+from agno.utils.log import log_debug, logger
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+from analytics import get_motor_duckdb
+from busca import buscar_transacoes
+from config import get_app_config
+from database import (
+    get_summary_stats, get_category_summary, get_monthly_summary, get_recent_transactions,
+    insert_transactions, escrita_recente, marcar_escrita
+)
+from guarda_sql import ConsultaRejeitada, analisar, verificar_plano, limitar_tempo, foi_timeout, tem_subconsulta
+from resultados import compactar, continuar
+from singleflight import get_single_flight
+from tracing import get_coletor
+
+class AnaliseTools(Toolkit):
+    """Ferramenta de leitura analítica do agente, servida pelo DuckDB"""
+
+    def __init__(self, engine, **kwargs):
+        self.engine = engine
+        super().__init__(name="analise_tools", tools=[self.consulta_analitica], **kwargs)
+
+    def consulta_analitica(self, query: str) -> str:
+        """Use esta função para consultas de leitura (SELECT) e análises sobre receita_gastos
+        (ou receita_gastos_completa, que inclui os anos arquivados).
+        Roda num motor analítico colunar, ideal para agregações por categoria/mês em vários anos.
+        Não aceita INSERT, UPDATE ou DELETE: para escrever use run_sql_query.
+
+        Args:
+            query (str): Consulta SELECT em SQL (dialeto DuckDB).
+
+        Returns:
+            str: Resultado em JSON colunar (veja continuar_resultado para linhas omitidas).
+        """
+        config = get_app_config()
+        max_linhas = config['guarda_sql']['max_linhas']
+        try:
+            query, leitura = analisar(query, max_linhas)
+        except ConsultaRejeitada as e:
+            get_coletor().incrementar("sql.rejeitadas")
+            return f"Consulta rejeitada: {e}"
+        if not leitura:
+            return "Erro: consulta_analitica aceita apenas SELECT. Use run_sql_query para escritas."
+
+        try:
+            # Leituras idênticas simultâneas (várias sessões) compartilham uma execução
+            df = get_single_flight().executar(
+                f"consulta_analitica:{query.strip()}", get_motor_duckdb(self.engine).consultar, query
+            )
+            return compactar(df.to_dict('records'), config['resultados']['linhas'], max_linhas, "consulta_analitica")
+        except Exception as e:
+            return f"Erro na consulta analítica: {e}"
+
+def _mes(ano_mes):
+    """'YYYY-MM' -> (primeiro dia, primeiro dia do mês seguinte) em ISO"""
+    inicio = date.fromisoformat(f"{ano_mes.strip()}-01")
+    fim = date(inicio.year + inicio.month // 12, inicio.month % 12 + 1, 1)
+    return inicio.isoformat(), fim.isoformat()
+
+class FinancasTools(Toolkit):
+    """
+    Perguntas frequentes respondidas numa chamada, sem o agente gerar SQL:
+    agregações já cacheadas de database.py (invalidadas pelo change feed).
+    """
+
+    def __init__(self, engine, **kwargs):
+        self.engine = engine
+        super().__init__(
+            name="financas_tools",
+            tools=[self.resumo_financeiro, self.totais_mensais, self.top_categorias, self.ultimas_transacoes],
+            **kwargs
+        )
+
+    def resumo_financeiro(self) -> str:
+        """Use esta função para saldo geral, total de receitas e total de gastos de todo o histórico.
+
+        Returns:
+            str: JSON com receitas, gastos, saldo e número de transações.
+        """
+        try:
+            df = get_summary_stats(self.engine)
+        except Exception as e:
+            return f"Erro ao consultar o resumo: {e}"
+        if df.empty:
+            return json.dumps({'receitas': 0, 'gastos': 0, 'saldo': 0, 'transacoes': 0})
+        totais = df.set_index('Tipo')['valor_total']
+        receitas, gastos = float(totais.get('Ativo', 0)), float(totais.get('Passivo', 0))
+        return json.dumps({
+            'receitas': round(receitas, 2),
+            'gastos': round(gastos, 2),
+            'saldo': round(receitas - gastos, 2),
+            'transacoes': int(df['total_transacoes'].sum())
+        })
+
+    def totais_mensais(self, meses: int = 6) -> str:
+        """Use esta função para receitas, gastos e saldo mês a mês ("quanto gastei este mês?",
+        "como foram os últimos 3 meses?"). Traz um item por mês, meses sem lançamentos com zero;
+        o último mês da lista é o mês atual.
+
+        Args:
+            meses (int): Quantos meses até o atual, inclusive. Padrão 6.
+
+        Returns:
+            str: JSON colunar com MesAno (YYYY-MM), qtd, receitas, gastos e saldo.
+        """
+        hoje = date.today()
+        meses = max(1, min(int(meses), 120))
+        indice = hoje.year * 12 + hoje.month - meses
+        inicio = date(indice // 12, indice % 12 + 1, 1)
+        try:
+            df = get_monthly_summary(self.engine, inicio.isoformat())
+        except Exception as e:
+            return f"Erro ao consultar os totais mensais: {e}"
+
+        # Meses sem transações não aparecem no GROUP BY: completa com zero
+        todos = [f"{(indice + i) // 12}-{(indice + i) % 12 + 1:02d}" for i in range(meses)]
+        df = (
+            df.set_index('MesAno')
+            .reindex(todos, fill_value=0)
+            .rename_axis('MesAno')
+            .reset_index()[['MesAno', 'qtd', 'receitas', 'gastos', 'saldo']]
+        )
+        return compactar(df.to_dict('records'), get_app_config()['resultados']['linhas'], origem="totais_mensais")
+
+    def top_categorias(self, mes: Optional[str] = None, limite: int = 5) -> str:
+        """Use esta função para as categorias com mais gastos, no histórico todo ou num mês.
+
+        Args:
+            mes (str, optional): Mês no formato YYYY-MM (ex.: "2025-03"). Vazio = histórico todo.
+            limite (int): Quantas categorias retornar. Padrão 5.
+
+        Returns:
+            str: JSON colunar com Categorias, qtd, total e percentual dos gastos do período.
+        """
+        try:
+            inicio, fim = _mes(mes) if mes else (None, None)
+        except ValueError:
+            return "Erro: informe o mês no formato YYYY-MM."
+        try:
+            df = get_category_summary(self.engine, inicio, fim)
+        except Exception as e:
+            return f"Erro ao consultar as categorias: {e}"
+        if df.empty:
+            return json.dumps([])
+        gastos = df[df['Tipo'] == 'Passivo'].sort_values('total', ascending=False)
+        gastos = gastos.assign(percentual=(gastos['total'] / gastos['total'].sum() * 100).round(1))
+        linhas = gastos[['Categorias', 'qtd', 'total', 'percentual']].head(max(1, int(limite))).to_dict('records')
+        return compactar(linhas, get_app_config()['resultados']['linhas'], origem="top_categorias")
+
+    def ultimas_transacoes(self, n: int = 10) -> str:
+        """Use esta função para listar as transações mais recentes (ex.: "o que lancei por último?").
+
+        Args:
+            n (int): Quantas transações. Padrão 10.
+
+        Returns:
+            str: JSON colunar com id, Data, Descrição, Valor, Categorias e Tipo.
+        """
+        config = get_app_config()
+        try:
+            df = get_recent_transactions(self.engine, max(1, min(int(n), config['guarda_sql']['max_linhas'])))
+        except Exception as e:
+            return f"Erro ao consultar as últimas transações: {e}"
+        return compactar(df.to_dict('records'), config['resultados']['linhas'], origem="ultimas_transacoes")
+
+@dataclass
+class NovaTransacao:
+    """Um lançamento de registrar_transacoes (o agno gera o schema da ferramenta a partir dos campos)"""
+    descricao: str
+    valor: float
+    categoria: str
+    tipo: str
+    data: Optional[str] = None
+
+_DATA_ISO = re.compile(r'\d{4}-\d{2}-\d{2}')
+
+def _validar(transacao, categorias):
+    """Lista de problemas do lançamento (vazia se estiver ok)"""
+    problemas = []
+    if not transacao.descricao.strip():
+        problemas.append("descrição vazia")
+    if not transacao.valor > 0:
+        problemas.append("valor deve ser positivo")
+    if transacao.tipo not in ('Ativo', 'Passivo'):
+        problemas.append("tipo deve ser 'Ativo' ou 'Passivo'")
+    if transacao.categoria not in categorias:
+        problemas.append(f"categoria '{transacao.categoria}' inexistente")
+    if transacao.data:
+        # fromisoformat sozinho aceita 20260101 e datas de semana, que o banco recusa
+        try:
+            if not _DATA_ISO.fullmatch(transacao.data):
+                raise ValueError
+            date.fromisoformat(transacao.data)
+        except ValueError:
+            problemas.append("data deve estar no formato YYYY-MM-DD")
+    return problemas
+
+class EscritaTools(Toolkit):
+    """Inserção em lote: uma chamada e um commit para mensagens com vários lançamentos"""
+
+    def __init__(self, engine, **kwargs):
+        self.engine = engine
+        super().__init__(name="escrita_tools", tools=[self.registrar_transacoes], **kwargs)
+
+    def registrar_transacoes(self, transacoes: List[NovaTransacao]) -> str:
+        """Use esta função para registrar gastos/receitas, principalmente quando a mensagem traz
+        vários itens ("gastei 20 no mercado, 35 de uber e 120 na farmácia"): envie todos numa
+        única chamada. Grava tudo numa só transação; se algum item for inválido, nada é gravado.
+
+        Args:
+            transacoes (list): Lançamentos, cada um com descricao, valor (positivo), categoria
+                (Alimentação, Transporte, Saúde, Casa, Compras, Entretenimento, Educação ou Receita),
+                tipo ("Ativo" para receita, "Passivo" para gasto) e data (YYYY-MM-DD, padrão hoje).
+
+        Returns:
+            str: Quantos lançamentos foram gravados e o total por tipo, ou os itens a corrigir.
+        """
+        config = get_app_config()
+        if not transacoes:
+            return "Erro: nenhuma transação informada."
+        if len(transacoes) > config['guarda_sql']['max_lote']:
+            return f"Erro: no máximo {config['guarda_sql']['max_lote']} transações por chamada."
+
+        categorias = config['categorias']['gastos'] + config['categorias']['receitas']
+        erros = [
+            f"item {i}: {', '.join(problemas)}"
+            for i, transacao in enumerate(transacoes, 1)
+            if (problemas := _validar(transacao, categorias))
+        ]
+        if erros:
+            return "Nada foi gravado. Corrija e envie o lote de novo: " + "; ".join(erros)
+
+        hoje = date.today().isoformat()
+        lote = [
+            {
+                'data': t.data or hoje,
+                'descricao': t.descricao.strip(),
+                'valor': float(t.valor),
+                'categoria': t.categoria,
+                'tipo': t.tipo
+            }
+            for t in transacoes
+        ]
+        try:
+            insert_transactions(self.engine, lote)
+        except Exception as e:
+            # Só a mensagem do driver (sem o SQL e os parâmetros do lote)
+            erro = getattr(e, 'orig', None) or e
+            logger.error(f"Erro ao gravar lote: {erro}")
+            return f"Erro ao gravar as transações; nada foi gravado: {erro}"
+
+        get_coletor().incrementar("escrita.lotes")
+        get_coletor().incrementar("escrita.transacoes", len(lote))
+        totais = {}
+        for t in lote:
+            totais[t['tipo']] = round(totais.get(t['tipo'], 0) + t['valor'], 2)
+        return json.dumps({'gravadas': len(lote), 'totais': totais}, ensure_ascii=False)
+
+class BuscaTools(Toolkit):
+    """Busca de transações pelo índice de texto (sem acentos, sem LIKE '%...%')"""
+
+    def __init__(self, engine, **kwargs):
+        self.engine = engine
+        super().__init__(name="busca_tools", tools=[self.buscar_transacoes], **kwargs)
+
+    def buscar_transacoes(self, termo: str, limite: int = 20) -> str:
+        """Use esta função para encontrar transações pela descrição ou categoria
+        (ex.: "ração", "uber", "farmacia"). Ignora acentos e maiúsculas e aceita prefixos.
+        Busca também nos anos arquivados. Prefira esta função a LIKE '%...%' no SQL; use os ids
+        retornados para editar ou excluir, exceto os com arquivada=1 (anos fechados, somente leitura).
+
+        Args:
+            termo (str): Palavras a buscar (todas precisam aparecer).
+            limite (int): Máximo de transações retornadas. Padrão 20.
+
+        Returns:
+            str: Transações encontradas em JSON colunar (id, Data, Descrição, Valor, Categorias, Tipo, arquivada).
+        """
+        config = get_app_config()
+        try:
+            df = buscar_transacoes(self.engine, termo, min(limite, config['guarda_sql']['max_linhas']))
+            return compactar(df.to_dict('records'), config['resultados']['linhas'], origem="buscar_transacoes")
+        except Exception as e:
+            return f"Erro na busca: {e}"
+
+class ResultadoTools(Toolkit):
+    """Continuação dos resultados truncados pelas outras ferramentas"""
+
+    def __init__(self, **kwargs):
+        super().__init__(name="resultado_tools", tools=[self.continuar_resultado], **kwargs)
+
+    def continuar_resultado(self, handle: str) -> str:
+        """Use esta função para buscar as linhas omitidas de um resultado anterior,
+        quando ele trouxer "continuar". Só faça isso se o resumo_omitidas não bastar.
+
+        Args:
+            handle (str): Valor do campo "continuar" do resultado anterior.
+
+        Returns:
+            str: Próximas linhas no mesmo formato (com um novo "continuar" se ainda houver mais).
+        """
+        resultado = continuar(handle.strip(), get_app_config()['resultados']['linhas'])
+        if resultado is None:
+            return "Continuação expirada ou inexistente; refaça a consulta filtrando ou agregando."
+        return resultado
+
+def _timeout_ms():
+    """
+    Tempo máximo do SQL do agente: o menor entre a guarda e o statement_timeout
+    do papel 'agente' (escritas rodam no engine principal, que tem o do papel 'escrita')
+    """
+    config = get_app_config()
+    return min(config['guarda_sql']['timeout_ms'], config['pool']['statement_timeout']['agente'])
+
+class SQLToolsRoteado(SQLTools):
+    """
+    SQLTools do agno com guarda de custo e roteamento: todo SQL passa pela
+    guarda (rejeita/reescreve formas perigosas, limita linhas e tempo);
+    leituras vão para o engine de leitura (réplica) e escritas para o principal.
+    """
+
+    def __init__(self, db_engine, engine_leitura=None, **kwargs):
+        super().__init__(db_engine=db_engine, **kwargs)
+        self.SessionLeitura = sessionmaker(bind=engine_leitura or db_engine)
+
+    def run_sql_query(self, query: str, limit: Optional[int] = None) -> str:
+        """Use this function to run a SQL query and return the result.
+
+        Args:
+            query (str): The query to run (one statement; SELECT, INSERT, UPDATE or DELETE).
+            limit (int, optional): Rows returned in full. Defaults to the server budget; the remaining
+                rows come summarized (count/sum/min/max) with a "continuar" handle for continuar_resultado.
+        Returns:
+            str: Column-oriented JSON result, or the reason it was rejected so it can be fixed and retried.
+        """
+        coletor = get_coletor()
+        config = get_app_config()
+        orcamento = min(limit or config['resultados']['linhas'], config['resultados']['linhas'])
+        try:
+            linhas = self.run_sql(sql=query)
+            if isinstance(linhas, str):
+                return linhas
+            if not linhas:
+                return json.dumps(linhas)
+            return compactar(linhas, orcamento, config['guarda_sql']['max_linhas'], "run_sql_query")
+        except ConsultaRejeitada as e:
+            coletor.incrementar("sql.rejeitadas")
+            return f"Consulta rejeitada: {e}"
+        except Exception as e:
+            if foi_timeout(e):
+                coletor.incrementar("sql.canceladas")
+                return f"Consulta cancelada: passou de {_timeout_ms()} ms. Filtre por período/categoria ou agregue."
+            logger.error(f"Error running query: {e}")
+            return f"Error running query: {e}"
+
+    def run_sql(self, sql, limit=None):
+        config = get_app_config()['guarda_sql']
+        sql, leitura = analisar(sql, config['max_linhas'])
+        limit = min(limit or config['max_linhas'], config['max_linhas'])
+
+        log_debug(f"Running sql |\n{sql}")
+        # Logo após uma escrita, leituras também no principal (a réplica pode não tê-la)
+        if not leitura:
+            marcar_escrita()
+        fabrica = self.SessionLeitura if leitura and not escrita_recente() else self.Session
+        with fabrica() as sess, sess.begin():
+            conn = sess.connection()
+            # Escritas com SELECT (INSERT ... SELECT, subconsultas) também passam pelo EXPLAIN
+            if config['verificar_plano'] and (leitura or tem_subconsulta(sql)):
+                verificar_plano(conn, sql, config['custo_maximo'])
+            with limitar_tempo(conn, _timeout_ms()):
+                result = conn.execute(text(sql))
+                if not result.returns_rows:
+                    if not leitura and result.rowcount == 0:
+                        return _nada_alterado(conn, sql)
+                    return []
+                return [row._asdict() for row in result.fetchmany(limit)]
+
+def _nada_alterado(conn, sql):
+    """
+    Mensagem para UPDATE/DELETE que não afetou linhas: em vez de um "[]"
+    silencioso, diz se o filtro casa com transações arquivadas (somente leitura).
+    """
+    comando = sql.split(None, 1)[0].upper()
+    if comando not in ('UPDATE', 'DELETE'):
+        return []
+    nenhuma = f"{comando} não alterou nenhuma transação."
+    filtro = re.search(r'\bWHERE\b(.*)$', sql, re.IGNORECASE | re.DOTALL)
+    try:
+        with conn.begin_nested():
+            arquivadas = conn.execute(
+                text(f"SELECT COUNT(*) FROM receita_gastos_arquivo WHERE {filtro.group(1)}")
+            ).scalar()
+    except Exception:
+        arquivadas = 0
+    if arquivadas:
+        return (
+            f"{nenhuma} {arquivadas} transação(ões) com esse filtro estão em receita_gastos_arquivo "
+            "(anos fechados, somente leitura) e não podem ser editadas nem excluídas. Avise o usuário."
+        )
+    return f"{nenhuma} Nenhuma transação corresponde ao filtro; confira o id com buscar_transacoes."
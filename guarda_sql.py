@@ -0,0 +1,137 @@
+import json
+import re
+import time
+from contextlib import contextmanager
+from sqlalchemy import text
+
+class ConsultaRejeitada(Exception):
+    """SQL barrado pela guarda; a mensagem volta para o agente corrigir a consulta"""
+
+# Literais e comentários (removidos do "esqueleto" analisado)
+_LITERAL_OU_COMENTARIO = re.compile(r"('(?:[^']|'')*')|(--[^\n]*|/\*.*?\*/)", re.DOTALL)
+
+# Comandos que o agente nunca deve executar
+_PROIBIDOS = re.compile(
+    r'\b(DROP|ALTER|TRUNCATE|CREATE|ATTACH|DETACH|PRAGMA|VACUUM|GRANT|REVOKE|COPY|REINDEX)\b',
+    re.IGNORECASE
+)
+_LIMIT_FINAL = re.compile(r'\bLIMIT\s+(\d+)(\s+OFFSET\s+\d+)?\s*$', re.IGNORECASE)
+# Forma padrão SQL do limite (PostgreSQL/DuckDB); sem número vale 1 linha
+_FETCH_FINAL = re.compile(r'\bFETCH\s+(?:FIRST|NEXT)\s+(\d+)?\s*ROWS?\s+(ONLY|WITH\s+TIES)\s*$', re.IGNORECASE)
+_MODIFICA = re.compile(r'\b(INSERT|UPDATE|DELETE)\b', re.IGNORECASE)
+_JUNCAO_VIRGULA = re.compile(r'\bFROM\s+\w+(\s+(AS\s+)?\w+)?\s*,', re.IGNORECASE)
+
+def _limpar(sql):
+    """Retorna (sql sem comentários, esqueleto sem literais nem comentários)"""
+    sem_comentarios = _LITERAL_OU_COMENTARIO.sub(lambda m: m.group(1) or ' ', sql)
+    esqueleto = _LITERAL_OU_COMENTARIO.sub(lambda m: "''" if m.group(1) else ' ', sql)
+    return sem_comentarios.strip().rstrip(';').strip(), esqueleto.strip().rstrip(';').strip()
+
+def analisar(sql, max_linhas):
+    """
+    Valida o SQL gerado pelo agente e reescreve formas perigosas.
+    Retorna (sql final, somente_leitura) ou levanta ConsultaRejeitada.
+    """
+    sql, esqueleto = _limpar(sql)
+    if not esqueleto:
+        raise ConsultaRejeitada("consulta vazia.")
+    if ';' in esqueleto:
+        raise ConsultaRejeitada("envie um comando SQL por vez.")
+    if _PROIBIDOS.search(esqueleto):
+        raise ConsultaRejeitada("comandos de DDL/administração não são permitidos; use apenas SELECT, INSERT, UPDATE ou DELETE.")
+
+    comando = esqueleto.split(None, 1)[0].upper()
+
+    if comando in ('UPDATE', 'DELETE'):
+        if not re.search(r'\bWHERE\b', esqueleto, re.IGNORECASE):
+            raise ConsultaRejeitada(f"{comando} sem WHERE afetaria a tabela inteira; filtre pelo id da transação.")
+        _verificar_forma(esqueleto)
+        return sql, False
+
+    if comando == 'INSERT':
+        # INSERT ... SELECT passa pelas mesmas checagens de forma que um SELECT
+        _verificar_forma(esqueleto)
+        return sql, False
+
+    if comando not in ('SELECT', 'WITH'):
+        raise ConsultaRejeitada(f"comando {comando} não permitido.")
+    # WITH ... DELETE / WITH d AS (DELETE ... RETURNING) SELECT: escrita disfarçada de leitura
+    if _MODIFICA.search(esqueleto):
+        raise ConsultaRejeitada("CTEs que modificam dados não são permitidas; use INSERT, UPDATE ou DELETE diretamente.")
+
+    _verificar_forma(esqueleto)
+
+    # Teto de linhas: acrescenta LIMIT ou reduz o existente (LIMIT ou FETCH FIRST)
+    limite = _LIMIT_FINAL.search(esqueleto)
+    fetch = _FETCH_FINAL.search(esqueleto)
+    if fetch is not None:
+        if int(fetch.group(1) or 1) > max_linhas:
+            sql = _FETCH_FINAL.sub(lambda m: f"FETCH FIRST {max_linhas} ROWS {m.group(2)}", sql)
+    elif limite is None:
+        sql = f"{sql}\nLIMIT {max_linhas}"
+    elif int(limite.group(1)) > max_linhas:
+        sql = _LIMIT_FINAL.sub(lambda m: f"LIMIT {max_linhas}{m.group(2) or ''}", sql)
+
+    return sql, True
+
+def _verificar_forma(esqueleto):
+    """Barra formas de consulta caras (recursão, produto cartesiano, JOIN sem condição)"""
+    if re.search(r'\bWITH\s+RECURSIVE\b', esqueleto, re.IGNORECASE):
+        raise ConsultaRejeitada("CTEs recursivas não são permitidas.")
+    if re.search(r'\bCROSS\s+JOIN\b', esqueleto, re.IGNORECASE) or _JUNCAO_VIRGULA.search(esqueleto):
+        raise ConsultaRejeitada("produto cartesiano (CROSS JOIN ou FROM a, b); use JOIN ... ON com a condição de junção.")
+    juncoes = len(re.findall(r'\bJOIN\b', esqueleto, re.IGNORECASE))
+    condicoes = len(re.findall(r'\b(ON|USING)\b', esqueleto, re.IGNORECASE))
+    if juncoes > condicoes:
+        raise ConsultaRejeitada("JOIN sem ON/USING; informe a condição de junção.")
+
+def tem_subconsulta(sql):
+    """True se o comando lê tabelas (SELECT, INSERT ... SELECT, subconsultas): o plano deve ser verificado"""
+    return re.search(r'\bSELECT\b', _limpar(sql)[1], re.IGNORECASE) is not None
+
+def verificar_plano(conn, sql, custo_maximo):
+    """
+    Checa o plano antes de executar. PostgreSQL: custo total do EXPLAIN.
+    SQLite (não estima custo): barra varreduras completas aninhadas.
+    """
+    if conn.dialect.name == 'sqlite':
+        plano = conn.execute(text(f"EXPLAIN QUERY PLAN {sql}")).fetchall()
+        varreduras = {}
+        for _, pai, _, detalhe in plano:
+            if detalhe.startswith('SCAN') and 'USING' not in detalhe and 'CONSTANT ROW' not in detalhe:
+                varreduras[pai] = varreduras.get(pai, 0) + 1
+        if any(qtd > 1 for qtd in varreduras.values()):
+            raise ConsultaRejeitada("o plano varre tabelas inteiras de forma aninhada; filtre ou agregue antes de juntar.")
+        return
+
+    if conn.dialect.name == 'postgresql':
+        plano = conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+        if isinstance(plano, str):
+            plano = json.loads(plano)
+        custo = plano[0]['Plan']['Total Cost']
+        if custo > custo_maximo:
+            raise ConsultaRejeitada(
+                f"custo estimado {custo:,.0f} acima do limite {custo_maximo:,.0f}; filtre por período/categoria ou agregue."
+            )
+
+@contextmanager
+def limitar_tempo(conn, timeout_ms):
+    """Interrompe a execução após timeout_ms (progress handler no SQLite, statement_timeout no PostgreSQL)"""
+    if conn.dialect.name == 'sqlite':
+        dbapi = conn.connection.driver_connection
+        prazo = time.perf_counter() + timeout_ms / 1000
+        dbapi.set_progress_handler(lambda: 1 if time.perf_counter() > prazo else 0, 10000)
+        try:
+            yield
+        finally:
+            dbapi.set_progress_handler(None, 0)
+        return
+
+    if conn.dialect.name == 'postgresql':
+        conn.execute(text(f"SET LOCAL statement_timeout = {int(timeout_ms)}"))
+    yield
+
+def foi_timeout(erro):
+    """True se o erro é o cancelamento por tempo (SQLite 'interrupted' / PostgreSQL statement timeout)"""
+    mensagem = str(erro).lower()
+    return 'interrupted' in mensagem or 'statement timeout' in mensagem
@@ -1,27 +1,44 @@
-from groq import Groq
 import os
 import base64
 import json
 import streamlit as st
 import hashlib
 from config import get_api_keys
+from tracing import medir, span, get_coletor
+from audio import preparar_audio
+from imagem import preparar_imagem
+from singleflight import get_single_flight
 
-@st.cache_data(show_spinner="Analisando imagem...", ttl=3600)
-def vision(pic_byte):
+def vision(pic_byte, recibo=True):
     """
     Analisa imagem usando Groq Vision com cache.
-    Cache baseado no hash da imagem para evitar reprocessamento.
+    A imagem é normalizada antes; o hash da versão normalizada é a chave do cache,
+    então re-uploads quase idênticos (EXIF, rotação, recompressão) reaproveitam a resposta.
     """
-    # Criar hash único da imagem para cache
-    img_hash = hashlib.md5(pic_byte).hexdigest()
+    with span("imagem.preparo"):
+        dados, mime = preparar_imagem(pic_byte, recibo=recibo)
+    
+    coletor = get_coletor()
+    coletor.incrementar("imagem.bytes_originais", len(pic_byte))
+    coletor.incrementar("imagem.bytes_enviados", len(dados))
     
-    pic_base64 = base64.b64encode(pic_byte).decode('utf-8')
-    img_data_url = f"data:image/png;base64,{pic_base64}"
+    # Criar hash único da imagem normalizada para cache
+    img_hash = hashlib.md5(dados).hexdigest()
+    
+    # Uploads simultâneos da mesma imagem compartilham uma única chamada
+    return get_single_flight().executar(f"vision:{img_hash}", vision_cached, img_hash, dados, mime)
 
-    api_keys = get_api_keys()
-    groq_api = api_keys['GROQ_API_KEY']
+@st.cache_data(show_spinner="Analisando imagem...", ttl=3600)
+@medir("vision")
+def vision_cached(img_hash, _pic_byte, mime):
+    """
+    Chamada ao modelo de visão com cache.
+    O underscore em _pic_byte evita hashear os bytes: a chave é img_hash.
+    """
+    pic_base64 = base64.b64encode(_pic_byte).decode('utf-8')
+    img_data_url = f"data:{mime};base64,{pic_base64}"
 
-    client = Groq(api_key=groq_api)
+    client = get_groq_client()
     completion = client.chat.completions.create(
         model="llama-3.2-11b-vision-preview",
         messages=[
@@ -59,25 +76,22 @@ EXTRAIA e ORGANIZE essas informações de forma clara e estruturada. Se encontra
     return completion.choices[0].message.content
 
 @st.cache_data(show_spinner="Transcrevendo áudio...", ttl=3600)
+@medir("speech_to_text_cached")
 def speech_to_text_cached(audio_bytes, audio_name, audio_type):
     """
     Converte áudio em texto com cache.
-    Cache baseado no hash do áudio.
+    Cache baseado no hash do áudio (já pré-processado).
     """
-    # Criar hash único do áudio para cache
-    audio_hash = hashlib.md5(audio_bytes).hexdigest()
-    
-    api_keys = get_api_keys()
-    groq_api = api_keys['GROQ_API_KEY']
-    client = Groq(api_key=groq_api)
+    client = get_groq_client()
 
     file_tuple = (audio_name, audio_bytes, audio_type)
 
+    # "json" traz só o texto (verbose_json baixaria segmentos que não usamos)
     transcription = client.audio.transcriptions.create(
         file=file_tuple,
         model="whisper-large-v3-turbo",
         prompt="Transcreva o áudio em português brasileiro, focando em informações sobre gastos, receitas ou transações financeiras.",
-        response_format="verbose_json",
+        response_format="json",
         language="pt",
         temperature=0.0
     )
@@ -86,37 +100,44 @@ def speech_to_text_cached(audio_bytes, audio_name, audio_type):
 
 def speetch_to_text(audio):
     """
-    Wrapper para compatibilidade que usa a versão com cache.
-    audio é um UploadedFile do Streamlit.
+    Wrapper que pré-processa o áudio e usa a versão com cache.
+    audio é um UploadedFile do Streamlit. Retorna o texto transcrito.
     """
     # Extrair dados do UploadedFile
     audio_bytes = audio.getvalue()
-    audio_name = audio.name
-    audio_type = audio.type
     
-    # Chamar versão com cache
-    transcription = speech_to_text_cached(audio_bytes, audio_name, audio_type)
+    # Cortar silêncio, mono 16 kHz e recodificar antes do upload
+    with span("audio.preparo"):
+        dados, nome, mime = preparar_audio(audio_bytes, audio.name, audio.type)
+    
+    coletor = get_coletor()
+    coletor.incrementar("audio.bytes_originais", len(audio_bytes))
+    coletor.incrementar("audio.bytes_enviados", len(dados))
     
-    return json.dumps(transcription, indent=2, default=str)
+    # Chamar versão com cache (envios simultâneos do mesmo áudio viram uma chamada)
+    audio_hash = hashlib.md5(dados).hexdigest()
+    transcription = get_single_flight().executar(
+        f"stt:{audio_hash}", speech_to_text_cached, dados, nome, mime
+    )
+    
+    return extract_text_from_transcription(transcription)
 
 # Alias para compatibilidade
 speech_to_text = speetch_to_text
 
-@st.cache_data(ttl=300)
-def extract_text_from_transcription(transcription_json):
-    """Extrai texto limpo da transcrição com cache"""
+def extract_text_from_transcription(transcription):
+    """Extrai texto limpo da transcrição (objeto do Groq, dict ou JSON legado)"""
     try:
-        transcricao_dict = json.loads(transcription_json)
+        # Objeto Transcription do SDK
+        if hasattr(transcription, 'text'):
+            return transcription.text
         
-        # Tentar extrair diretamente
-        if isinstance(transcricao_dict, dict) and 'text' in transcricao_dict:
-            return transcricao_dict['text']
+        # Formato legado: JSON serializado
+        if isinstance(transcription, str):
+            transcription = json.loads(transcription)
         
-        # Tentar com regex
-        import re
-        match = re.search(r'text=[\'"]([^\'"]+)[\'"]', str(transcricao_dict))
-        if match:
-            return match.group(1)
+        if isinstance(transcription, dict) and 'text' in transcription:
+            return transcription['text']
         
         return "Não foi possível transcrever o áudio"
     except Exception as e:
@@ -125,5 +146,8 @@ def extract_text_from_transcription(transcription_json):
 @st.cache_resource
 def get_groq_client():
     """Retorna cliente Groq com cache de recurso"""
+    # SDK importado só no primeiro uso (a tela de login não precisa dele)
+    from groq import Groq
+    
     api_keys = get_api_keys()
     return Groq(api_key=api_keys['GROQ_API_KEY'])
\ No newline at end of file
@@ -0,0 +1,73 @@
+from sqlalchemy import text
+
+# Histórico do chat: append-only, por usuário e sessão
+CREATE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS chat_mensagens (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    usuario TEXT NOT NULL,
+    sessao_id TEXT NOT NULL,
+    role TEXT NOT NULL CHECK (role IN ('user', 'assistant')),
+    content TEXT NOT NULL,
+    input_type TEXT,
+    query TEXT,
+    criado_em TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+CREATE_INDEX_SQL = """
+CREATE INDEX IF NOT EXISTS idx_chat_mensagens_sessao
+ON chat_mensagens (usuario, sessao_id, id)
+"""
+
+def init_historico(conn):
+    """Cria a tabela do histórico (chamado por init_database)"""
+    if conn.dialect.name == 'sqlite':
+        conn.execute(text(CREATE_TABLE_SQL))
+    else:
+        conn.execute(text(CREATE_TABLE_SQL.replace("INTEGER PRIMARY KEY AUTOINCREMENT", "SERIAL PRIMARY KEY")))
+    conn.execute(text(CREATE_INDEX_SQL))
+
+def salvar_mensagem(engine, usuario, sessao_id, msg):
+    """Grava uma mensagem e retorna o id gerado"""
+    with engine.connect() as conn:
+        novo_id = conn.execute(text("""
+            INSERT INTO chat_mensagens (usuario, sessao_id, role, content, input_type, query)
+            VALUES (:usuario, :sessao_id, :role, :content, :input_type, :query)
+            RETURNING id
+        """), {
+            'usuario': usuario,
+            'sessao_id': sessao_id,
+            'role': msg['role'],
+            'content': msg['content'],
+            'input_type': msg.get('input_type'),
+            'query': msg.get('query')
+        }).scalar_one()
+        conn.commit()
+    return novo_id
+
+def carregar_mensagens(engine, usuario, sessao_id, limite, antes_de_id=None):
+    """
+    Retorna as `limite` mensagens mais recentes (anteriores a antes_de_id, se
+    informado) em ordem cronológica, e se ainda existem mensagens mais antigas.
+    """
+    filtro = "AND id < :antes_de_id" if antes_de_id is not None else ""
+    with engine.connect() as conn:
+        linhas = conn.execute(text(f"""
+            SELECT id, role, content, input_type, query
+            FROM chat_mensagens
+            WHERE usuario = :usuario AND sessao_id = :sessao_id {filtro}
+            ORDER BY id DESC
+            LIMIT :limite
+        """), {
+            'usuario': usuario,
+            'sessao_id': sessao_id,
+            'antes_de_id': antes_de_id,
+            'limite': limite + 1
+        }).mappings().all()
+
+    tem_anteriores = len(linhas) > limite
+    mensagens = [
+        {chave: valor for chave, valor in linha.items() if valor is not None}
+        for linha in reversed(linhas[:limite])
+    ]
+    return mensagens, tem_anteriores
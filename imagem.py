@@ -0,0 +1,83 @@
+import io
+
+# Pillow é opcional: sem ele a imagem segue original, só com o MIME correto
+try:
+    from PIL import Image, ImageChops, ImageOps
+except ImportError:
+    Image = None
+
+# Maior lado útil para o modelo de visão (acima disso ele reduz internamente)
+MAX_LADO = 1120
+QUALIDADE_JPEG = 85
+
+# Diferença mínima para o fundo na hora de recortar bordas
+LIMIAR_BORDA = 24
+
+# Assinaturas (magic bytes) -> MIME
+ASSINATURAS = [
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+    (b'BM', 'image/bmp')
+]
+
+def detectar_mime(dados):
+    """Detecta o formato real pelos primeiros bytes (não pela extensão)"""
+    for assinatura, mime in ASSINATURAS:
+        if dados.startswith(assinatura):
+            return mime
+    if dados[:4] == b'RIFF' and dados[8:12] == b'WEBP':
+        return 'image/webp'
+    if dados[4:12] in (b'ftypheic', b'ftypheix', b'ftypmif1'):
+        return 'image/heic'
+    return 'application/octet-stream'
+
+def recortar_bordas(img):
+    """Remove bordas uniformes (mesa, fundo) em volta do recibo"""
+    fundo = Image.new(img.mode, img.size, img.getpixel((0, 0)))
+    diferenca = ImageChops.difference(img, fundo).convert('L')
+    mascara = diferenca.point(lambda v: 255 if v > LIMIAR_BORDA else 0)
+    caixa = mascara.getbbox()
+
+    # Recorte só quando sobra uma área razoável (evita cortar a foto inteira)
+    if caixa and (caixa[2] - caixa[0]) * (caixa[3] - caixa[1]) > 0.2 * img.size[0] * img.size[1]:
+        return img.crop(caixa)
+    return img
+
+def preparar_imagem(dados, recibo=True):
+    """
+    Normaliza a imagem antes da chamada de visão: orienta pelo EXIF, recorta
+    bordas, reduz para MAX_LADO, opcionalmente tons de cinza + contraste
+    (bom para recibos) e recomprime (JPEG, ou PNG se ficar menor).
+    Retorna (bytes, mime).
+    """
+    mime = detectar_mime(dados)
+    if Image is None:
+        return dados, mime
+
+    try:
+        img = Image.open(io.BytesIO(dados))
+        img = ImageOps.exif_transpose(img)
+    except Exception:
+        return dados, mime
+
+    img = img.convert('RGB')
+    img = recortar_bordas(img)
+    img.thumbnail((MAX_LADO, MAX_LADO), Image.LANCZOS)
+
+    if recibo:
+        img = ImageOps.autocontrast(ImageOps.grayscale(img), cutoff=1)
+
+    # Sem EXIF/metadados: mesma imagem -> mesmos bytes -> mesmo hash de cache
+    jpeg = io.BytesIO()
+    img.save(jpeg, format='JPEG', quality=QUALIDADE_JPEG, optimize=True)
+
+    # Recibos em tons de cinza costumam ficar menores em PNG (texto em fundo liso)
+    if recibo:
+        png = io.BytesIO()
+        img.save(png, format='PNG', optimize=True)
+        if png.tell() < jpeg.tell():
+            return png.getvalue(), 'image/png'
+
+    return jpeg.getvalue(), 'image/jpeg'
@@ -0,0 +1,95 @@
+import streamlit as st
+
+# Importar módulos customizados
+from auth import require_auth, is_admin
+from tracing import get_coletor
+
+@require_auth
+def main():
+    """Painel de métricas de desempenho (apenas administrador)"""
+    if not is_admin():
+        st.error("🔒 Acesso restrito ao administrador.")
+        st.stop()
+    
+    st.title("⏱️ Métricas de Desempenho")
+    st.markdown("**Tempo gasto em cada trecho quente do app (desde o início do processo)**")
+    
+    coletor = get_coletor()
+    resumo = coletor.resumo()
+    
+    # Spans
+    st.subheader("📊 Spans")
+    if resumo.empty:
+        st.info("Nenhum span registrado ainda. Use o chat ou o dashboard primeiro.")
+    else:
+        st.dataframe(
+            resumo,
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "span": st.column_config.TextColumn("🔖 Span"),
+                "chamadas": st.column_config.NumberColumn("🔢 Chamadas"),
+                "p50_ms": st.column_config.NumberColumn("p50 (ms)", format="%.1f"),
+                "p95_ms": st.column_config.NumberColumn("p95 (ms)", format="%.1f"),
+                "max_ms": st.column_config.NumberColumn("Máx (ms)", format="%.1f"),
+                "total_s": st.column_config.NumberColumn("Total (s)", format="%.2f"),
+            }
+        )
+    
+    # Contadores do LLM
+    st.subheader("🤖 LLM")
+    contadores = dict(coletor.contadores)
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Runs", f"{contadores.get('llm.runs', 0):,.0f}")
+    with col2:
+        st.metric("Chamadas ao modelo", f"{contadores.get('llm.chamadas_modelo', 0):,.0f}")
+    with col3:
+        st.metric("Tokens", f"{contadores.get('llm.total_tokens', 0):,.0f}")
+    with col4:
+        st.metric("Retries", f"{contadores.get('llm.retries', 0):,.0f}")
+    
+    # Resultados das ferramentas (tokens que entram no contexto do modelo)
+    resultados = contadores.get('ferramentas.resultados', 0)
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Resultados de ferramentas", f"{resultados:,.0f}")
+    with col2:
+        st.metric("Tokens por resultado (média)", f"{contadores.get('ferramentas.resultado_tokens', 0) / max(resultados, 1):,.0f}")
+    with col3:
+        st.metric("Resultados truncados", f"{contadores.get('ferramentas.resultados_truncados', 0):,.0f}")
+    
+    # Coalescência (single-flight)
+    coalescidas = sum(v for k, v in contadores.items() if k.startswith('singleflight.') and k.endswith('.coalescidas'))
+    chamadas = sum(v for k, v in contadores.items() if k.startswith('singleflight.') and k.endswith('.chamadas'))
+    st.metric("🔗 Chamadas coalescidas", f"{coalescidas:,.0f}", delta=f"de {chamadas:,.0f} chamadas", delta_color="off")
+    
+    with st.expander("Todos os contadores"):
+        st.json(contadores)
+    
+    # Exportação
+    st.markdown("---")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.download_button(
+            "⬇️ Spans (JSONL)",
+            data=coletor.para_jsonl(),
+            file_name="spans.jsonl",
+            mime="application/jsonl",
+            use_container_width=True
+        )
+    with col2:
+        st.download_button(
+            "⬇️ Prometheus",
+            data=coletor.para_prometheus(),
+            file_name="metricas.prom",
+            mime="text/plain",
+            use_container_width=True
+        )
+    with col3:
+        if st.button("🗑️ Zerar métricas", key="reset_metricas", use_container_width=True):
+            coletor.limpar()
+            st.rerun()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import time
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import QueuePool
+
+from config import get_app_config
+from tracing import get_coletor
+
+class PoolMedido(QueuePool):
+    """QueuePool que mede quanto cada checkout esperou por uma conexão livre"""
+
+    papel = 'escrita'
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            get_coletor().registrar(f"pool.{self.papel}.espera", (time.perf_counter() - inicio) * 1000)
+
+def _classe_pool(papel):
+    # Subclasse por papel: o pool é recriado pelo SQLAlchemy (dispose) a partir da classe
+    return type(f"PoolMedido_{papel}", (PoolMedido,), {'papel': papel})
+
+def criar_engine_postgres(url, papel):
+    """
+    Engine PostgreSQL com pool configurável, statement_timeout do papel
+    ('escrita', 'leitura' ou 'agente') e contadores de conexões/checkouts.
+    """
+    config = get_app_config()['pool']
+    timeout_ms = config['statement_timeout'][papel]
+
+    engine = create_engine(
+        url,
+        poolclass=_classe_pool(papel),
+        pool_size=config['pool_size'],
+        max_overflow=config['max_overflow'],
+        pool_recycle=config['pool_recycle'],
+        pool_timeout=config['pool_timeout'],
+        pool_pre_ping=True,
+        connect_args={'options': f"-c statement_timeout={timeout_ms}"}
+    )
+
+    coletor = get_coletor()
+
+    @event.listens_for(engine, "connect")
+    def _ao_conectar(dbapi_conn, registro):
+        coletor.incrementar(f"pool.{papel}.conexoes")
+
+    @event.listens_for(engine, "checkout")
+    def _ao_retirar(dbapi_conn, registro, proxy):
+        coletor.incrementar(f"pool.{papel}.checkouts")
+
+    return engine
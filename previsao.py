@@ -0,0 +1,144 @@
+from datetime import date
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from database import get_versao_dados
+from timeseries import converter_datas
+
+# Meses recentes que definem o nível atual de cada categoria
+JANELA_PADRAO = 3
+HORIZONTE_PADRAO = 6
+
+# Sazonalidade só entra com pelo menos este número de ocorrências do mês do ano
+MIN_ANOS_SAZONAL = 2
+
+def _mes_inteiro(ano, mes):
+    """Mês como inteiro contínuo (ano * 12 + mês - 1)"""
+    return ano * 12 + mes - 1
+
+def _periodos(inicio, n):
+    """Inteiros de mês -> PeriodIndex mensal"""
+    meses = inicio + np.arange(n)
+    return pd.PeriodIndex.from_fields(year=meses // 12, month=meses % 12 + 1, freq='M')
+
+def rollup_mensal(df, mes_corrente):
+    """
+    Totais mensais por (Tipo, Categorias) numa matriz séries x meses,
+    com meses vazios zerados. O mês corrente (incompleto) fica de fora,
+    a menos que seja o único com dados. Sem meses até o corrente (datas
+    inválidas ou todas no futuro), a matriz tem zero colunas.
+    Retorna (matriz, MultiIndex das séries, mês inicial).
+    """
+    datas = converter_datas(df['Data'])
+    validos = datas.notna().to_numpy()
+    meses = _mes_inteiro(datas.dt.year.to_numpy(), datas.dt.month.to_numpy())[validos].astype(np.int64)
+    valores = df['Valor'].to_numpy(dtype=float)[validos]
+    # Código da série = (código do tipo, código da categoria)
+    cod_tipo, tipos = pd.factorize(df['Tipo'].to_numpy()[validos])
+    cod_categoria, categorias = pd.factorize(df['Categorias'].to_numpy()[validos])
+    codigos, combinados = pd.factorize(cod_tipo * len(categorias) + cod_categoria)
+    series = pd.MultiIndex.from_arrays(
+        [tipos[combinados // len(categorias)], categorias[combinados % len(categorias)]],
+        names=['Tipo', 'Categorias']
+    )
+
+    inicio = int(meses.min()) if len(meses) else mes_corrente
+    fim = mes_corrente if (meses < mes_corrente).any() else mes_corrente + 1
+    dentro = meses < fim
+    n_meses = max(fim - inicio, 0) if len(meses) else 0
+
+    # Soma por (série, mês) com um único bincount sobre o índice achatado
+    posicao = codigos[dentro] * n_meses + (meses[dentro] - inicio)
+    matriz = np.bincount(posicao, weights=valores[dentro], minlength=len(series) * n_meses)
+    matriz = matriz.reshape(len(series), n_meses)
+    return matriz, series, inicio
+
+def projetar(matriz, inicio, horizonte, janela):
+    """
+    Projeção por série: nível = média móvel dessazonalizada dos últimos
+    `janela` meses; previsão = nível x índice sazonal do mês do ano.
+    Retorna (nível por série, previsão séries x horizonte).
+    """
+    n_series, n_meses = matriz.shape
+    janela = min(janela, n_meses)
+    mes_do_ano = (inicio + np.arange(n_meses)) % 12
+
+    # Índice sazonal: média do mês do ano / média geral da série
+    soma = np.zeros((n_series, 12))
+    np.add.at(soma, (slice(None), mes_do_ano), matriz)
+    contagem = np.bincount(mes_do_ano, minlength=12)
+    media_mes = soma / np.maximum(contagem, 1)
+    media_geral = matriz.mean(axis=1, keepdims=True)
+    indice = np.divide(media_mes, media_geral, out=np.ones_like(media_mes), where=media_geral > 0)
+    indice = np.where(contagem >= MIN_ANOS_SAZONAL, indice, 1.0)
+
+    # Nível atual sem o efeito sazonal dos meses da janela
+    recentes = matriz[:, -janela:]
+    indice_recentes = indice[:, mes_do_ano[-janela:]]
+    nivel = np.divide(recentes, indice_recentes, out=recentes.copy(), where=indice_recentes > 0).mean(axis=1)
+
+    futuros = (inicio + n_meses + np.arange(horizonte)) % 12
+    return nivel, nivel[:, None] * indice[:, futuros]
+
+@st.cache_data(max_entries=16)  # Chaveada pela versão dos dados: não envelhece, o atualizador reaquece
+def calcular_previsao(_df, chave, mes_corrente, horizonte=HORIZONTE_PADRAO, janela=JANELA_PADRAO):
+    """
+    Previsão de fluxo de caixa, em cache por versão do livro-caixa (`chave`).
+    O underscore em _df evita hashear o DataFrame inteiro a cada rerun.
+    """
+    if _df.empty:
+        return None
+
+    matriz, series, inicio = rollup_mensal(_df, mes_corrente)
+    if matriz.shape[1] == 0:
+        return None
+    nivel, previsao = projetar(matriz, inicio, horizonte, janela)
+
+    ativo = (series.get_level_values('Tipo') == 'Ativo')
+    receitas_mes = matriz[ativo].sum(axis=0)
+    gastos_mes = matriz[~ativo].sum(axis=0)
+    receitas_prev = previsao[ativo].sum(axis=0)
+    gastos_prev = previsao[~ativo].sum(axis=0)
+
+    valores = _df['Valor'].to_numpy(dtype=float)
+    saldo_atual = float(np.where(_df['Tipo'].to_numpy() == 'Ativo', valores, -valores).sum())
+    media_gastos_prevista = float(gastos_prev.mean()) if horizonte else 0.0
+
+    historico = pd.DataFrame({
+        'Periodo': _periodos(inicio, matriz.shape[1]),
+        'Receitas': receitas_mes,
+        'Gastos': gastos_mes,
+        'Saldo': np.cumsum(receitas_mes - gastos_mes)
+    })
+    projecao = pd.DataFrame({
+        'Periodo': _periodos(inicio + matriz.shape[1], horizonte),
+        'Receitas': receitas_prev,
+        'Gastos': gastos_prev,
+        'Saldo': saldo_atual + np.cumsum(receitas_prev - gastos_prev)
+    })
+    por_categoria = pd.DataFrame({
+        'Tipo': series.get_level_values('Tipo'),
+        'Categorias': series.get_level_values('Categorias'),
+        'media_movel': nivel,
+        'proximo_mes': previsao[:, 0] if horizonte else nivel,
+        'total_horizonte': previsao.sum(axis=1)
+    }).sort_values('total_horizonte', ascending=False, ignore_index=True)
+
+    return {
+        'historico': historico,
+        'projecao': projecao,
+        'por_categoria': por_categoria,
+        'saldo_atual': saldo_atual,
+        'media_gastos_prevista': media_gastos_prevista,
+        'meses_cobertura': saldo_atual / media_gastos_prevista if media_gastos_prevista > 0 else float('inf')
+    }
+
+def obter_previsao(df, engine, horizonte=HORIZONTE_PADRAO, janela=JANELA_PADRAO):
+    """Previsão do DataFrame atual, chaveada pela versão do banco + tamanho/último id do df"""
+    if df.empty:
+        return None
+    versao, _ = get_versao_dados(engine)
+    chave = (versao, len(df), int(df['id'].max()))
+    hoje = date.today()
+    return calcular_previsao(df, chave, _mes_inteiro(hoje.year, hoje.month), horizonte, janela)
@@ -0,0 +1,55 @@
+import importlib
+import logging
+import threading
+import time
+import streamlit as st
+
+logger = logging.getLogger(__name__)
+
+# Módulos pesados que o login não usa, mas o chat e o dashboard sim
+MODULOS_PESADOS = [
+    'pandas',
+    'sqlalchemy',
+    'groq',
+    'agno.agent',
+    'agno.models.google',
+    'agno.tools.sql',
+    'plotly.express',
+    'plotly.graph_objects',
+    'plotly.subplots'
+]
+
+def _aquecer():
+    """Importa módulos pesados e popula os caches de recurso/dados"""
+    inicio = time.perf_counter()
+    
+    for modulo in MODULOS_PESADOS:
+        try:
+            importlib.import_module(modulo)
+        except ImportError as e:
+            logger.warning(f"Prewarm: não foi possível importar {modulo}: {e}")
+    
+    try:
+        from config import get_system_instructions
+        from database import get_database_engine, carregar_dados
+        from agente import get_ai_agent
+        import agregados  # Registra o aquecimento dos agregados do dashboard
+        
+        engine = get_database_engine()
+        carregar_dados(engine)  # Cria/lê o snapshot colunar; o atualizador aquece o dashboard
+        get_system_instructions()
+        get_ai_agent()
+    except Exception as e:
+        logger.warning(f"Prewarm incompleto: {e}")
+    
+    logger.info(f"Prewarm concluído em {time.perf_counter() - inicio:.2f}s")
+
+@st.cache_resource
+def iniciar_prewarm():
+    """
+    Dispara o pré-aquecimento em background uma única vez por processo.
+    A primeira execução (tela de login) não espera por ele.
+    """
+    thread = threading.Thread(target=_aquecer, name="prewarm", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,150 @@
+import json
+import logging
+import math
+import re
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+from decimal import Decimal
+
+import streamlit as st
+
+from config import get_app_config
+from tracing import get_coletor
+
+logger = logging.getLogger(__name__)
+
+# Estimativa de tokens sem tokenizer: ~4 caracteres por token
+CARACTERES_POR_TOKEN = 4
+
+_DATA_ISO = re.compile(r'^\d{4}-\d{2}-\d{2}')
+
+# Algarismos significativos dos floats: tira o ruído binário (35.199999999999996)
+# sem zerar razões e percentuais pequenos como faria arredondar para centavos
+ALGARISMOS = 10
+
+class Continuacoes:
+    """
+    Linhas que ficaram de fora de um resultado, guardadas até o agente pedir
+    a continuação. LRU com validade; compartilhado entre sessões, thread-safe.
+    """
+
+    def __init__(self, max_handles=256, validade=600):
+        self.lock = threading.Lock()
+        self.max_handles = max_handles
+        self.validade = validade
+        self.pendentes = OrderedDict()
+
+    def guardar(self, linhas):
+        """Guarda as linhas restantes e retorna o handle da continuação"""
+        handle = secrets.token_urlsafe(8)
+        with self.lock:
+            self.pendentes[handle] = (time.monotonic() + self.validade, linhas)
+            while len(self.pendentes) > self.max_handles:
+                self.pendentes.popitem(last=False)
+        return handle
+
+    def retirar(self, handle):
+        """Linhas da continuação (uma única vez), ou None se expirou/não existe"""
+        with self.lock:
+            item = self.pendentes.pop(handle, None)
+        if item is None or item[0] < time.monotonic():
+            return None
+        return item[1]
+
+@st.cache_resource
+def get_continuacoes():
+    """Retorna o depósito de continuações do processo com cache de recurso"""
+    config = get_app_config()['resultados']
+    return Continuacoes(config['max_continuacoes'], config['validade_continuacao'])
+
+def estimar_tokens(texto):
+    """Tokens aproximados que o texto ocupa no contexto do modelo"""
+    return math.ceil(len(texto) / CARACTERES_POR_TOKEN)
+
+def _numero(v):
+    """Float com ALGARISMOS algarismos significativos"""
+    return float(f"{v:.{ALGARISMOS}g}")
+
+def _valor(v):
+    """Valor JSON compacto: datas em ISO, floats sem ruído de representação, NaN como null"""
+    if v is None or isinstance(v, (bool, int, str)):
+        return v
+    if isinstance(v, float):
+        return None if math.isnan(v) or math.isinf(v) else _numero(v)
+    if isinstance(v, Decimal):
+        return _numero(float(v))
+    if isinstance(v, datetime):
+        return v.date().isoformat() if v == datetime.combine(v.date(), datetime.min.time()) else v.isoformat()
+    if isinstance(v, date):
+        return v.isoformat()
+    if hasattr(v, 'item'):  # escalares numpy
+        return _valor(v.item())
+    return str(v)
+
+def _resumo(colunas, linhas):
+    """
+    Estatísticas das linhas omitidas por coluna: soma/mín/máx das numéricas,
+    mín/máx das datas e número de valores distintos das demais.
+    """
+    resumo = {}
+    for coluna in colunas:
+        valores = [v for v in (_valor(linha[coluna]) for linha in linhas) if v is not None]
+        if not valores:
+            continue
+        if all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in valores):
+            resumo[coluna] = {'soma': _valor(float(sum(valores))), 'min': min(valores), 'max': max(valores)}
+        elif all(isinstance(v, str) and _DATA_ISO.match(v) for v in valores):
+            resumo[coluna] = {'min': min(valores), 'max': max(valores)}
+        else:
+            resumo[coluna] = {'distintos': len(set(map(str, valores)))}
+    return resumo
+
+def compactar(linhas, orcamento, teto=None, origem="sql"):
+    """
+    Serializa linhas (lista de dicts) para o contexto do modelo em formato
+    colunar: {"linhas": total, "colunas": {nome: [valores]}, ...}.
+    Colunas com o mesmo valor em todas as linhas vão em "constantes".
+    Acima do orçamento, as linhas restantes viram "omitidas" + "resumo_omitidas"
+    (contagem/soma/mín/máx) e um handle em "continuar" para buscá-las.
+    teto: limite de linhas da consulta; se atingido, avisa que pode haver mais.
+    """
+    colunas = list(linhas[0]) if linhas else []
+    visiveis, resto = linhas[:orcamento], linhas[orcamento:]
+
+    resultado = {'linhas': len(linhas)}
+    dados = {coluna: [_valor(linha[coluna]) for linha in visiveis] for coluna in colunas}
+    if len(visiveis) > 1:
+        constantes = {coluna: valores[0] for coluna, valores in dados.items() if valores.count(valores[0]) == len(valores)}
+        if constantes:
+            resultado['constantes'] = constantes
+            dados = {coluna: valores for coluna, valores in dados.items() if coluna not in constantes}
+    if dados:
+        resultado['colunas'] = dados
+
+    if resto:
+        resultado['omitidas'] = len(resto)
+        resultado['resumo_omitidas'] = _resumo(colunas, resto)
+        resultado['continuar'] = get_continuacoes().guardar(resto)
+    if teto is not None and len(linhas) >= teto:
+        resultado['aviso'] = f"teto de {teto} linhas atingido; pode haver mais. Filtre ou agregue."
+
+    texto = json.dumps(resultado, ensure_ascii=False, separators=(',', ':'))
+
+    tokens = estimar_tokens(texto)
+    coletor = get_coletor()
+    coletor.incrementar("ferramentas.resultados")
+    coletor.incrementar("ferramentas.resultado_tokens", tokens)
+    if resto:
+        coletor.incrementar("ferramentas.resultados_truncados")
+    logger.info("Resultado %s: %d linhas (%d omitidas), ~%d tokens", origem, len(linhas), len(resto), tokens)
+    return texto
+
+def continuar(handle, orcamento):
+    """Próxima página de um resultado truncado, no mesmo formato (None se o handle expirou)"""
+    linhas = get_continuacoes().retirar(handle)
+    if linhas is None:
+        return None
+    return compactar(linhas, orcamento, origem="continuacao")
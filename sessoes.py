@@ -0,0 +1,31 @@
+from sqlalchemy import text
+
+# Geração das sessões por usuário: o token carrega a geração em que foi emitido
+# e o logout a incrementa, revogando em todas as réplicas os tokens anteriores
+CREATE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS sessoes_usuario (
+    usuario TEXT PRIMARY KEY,
+    geracao INTEGER NOT NULL DEFAULT 0
+)
+"""
+
+def instalar_sessoes(conn):
+    """Cria a tabela de gerações de sessão (chamado por init_database)"""
+    conn.execute(text(CREATE_TABLE_SQL))
+
+def ler_geracao(engine, usuario):
+    """Geração atual das sessões do usuário (0 se nunca houve logout)"""
+    with engine.connect() as conn:
+        geracao = conn.execute(
+            text("SELECT geracao FROM sessoes_usuario WHERE usuario = :usuario"), {'usuario': usuario}
+        ).scalar()
+    return geracao or 0
+
+def revogar_sessoes(engine, usuario):
+    """Invalida todos os tokens já emitidos para o usuário"""
+    with engine.connect() as conn:
+        conn.execute(text("""
+            INSERT INTO sessoes_usuario (usuario, geracao) VALUES (:usuario, 1)
+            ON CONFLICT (usuario) DO UPDATE SET geracao = sessoes_usuario.geracao + 1
+        """), {'usuario': usuario})
+        conn.commit()
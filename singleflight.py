@@ -0,0 +1,71 @@
+import threading
+import streamlit as st
+
+from tracing import get_coletor
+
+class _Chamada:
+    """Uma chamada em andamento: os seguidores esperam o evento e leem o resultado"""
+
+    def __init__(self):
+        self.evento = threading.Event()
+        self.resultado = None
+        self.erro = None
+        self.interrompida = False  # Líder parado sem resultado (rerun, KeyboardInterrupt...)
+
+class SingleFlight:
+    """
+    Coalescência de chamadas concorrentes idênticas.
+    Quem chega primeiro com uma chave executa; quem chega enquanto ela está
+    em voo espera e recebe o mesmo resultado (ou a mesma exceção). Se o líder
+    for interrompido (BaseException, ex.: rerun do Streamlit), os seguidores
+    tentam de novo em vez de receber None.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.em_voo = {}
+
+    def executar(self, chave, funcao, *args, **kwargs):
+        """Executa funcao(*args, **kwargs) uma única vez por chave em voo"""
+        namespace = chave.split(':', 1)[0]
+        coletor = get_coletor()
+        coletor.incrementar(f"singleflight.{namespace}.chamadas")
+
+        while True:
+            with self.lock:
+                chamada = self.em_voo.get(chave)
+                lider = chamada is None
+                if lider:
+                    chamada = _Chamada()
+                    self.em_voo[chave] = chamada
+
+            if lider:
+                break
+
+            coletor.incrementar(f"singleflight.{namespace}.coalescidas")
+            chamada.evento.wait()
+            if chamada.interrompida:
+                continue
+            if chamada.erro is not None:
+                raise chamada.erro
+            return chamada.resultado
+
+        try:
+            chamada.resultado = funcao(*args, **kwargs)
+            return chamada.resultado
+        except Exception as e:
+            chamada.erro = e
+            raise
+        except BaseException:
+            # Interrupção do líder não é erro da chamada: os seguidores refazem
+            chamada.interrompida = True
+            raise
+        finally:
+            with self.lock:
+                del self.em_voo[chave]
+            chamada.evento.set()
+
+@st.cache_resource
+def get_single_flight():
+    """Retorna o coalescedor compartilhado entre sessões (um por processo)"""
+    return SingleFlight()
@@ -0,0 +1,95 @@
+import os
+import time
+import streamlit as st
+
+# pyarrow é opcional: sem ele o app lê sempre direto do banco
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+except ImportError:
+    pa = None
+
+def snapshot_disponivel():
+    """Indica se o snapshot colunar pode ser usado neste ambiente"""
+    return pa is not None
+
+def get_snapshot_path():
+    """Retorna o caminho do snapshot colunar do livro-caixa"""
+    return st.secrets.get("database", {}).get("SNAPSHOT_PATH", "./data/receita_gastos.arrow")
+
+def salvar_snapshot(df, caminho=None, versao_reescrita=None):
+    """
+    Grava o DataFrame como arquivo Arrow IPC sem compressão (mapeável em memória).
+    A escrita é atômica: grava num arquivo temporário e renomeia.
+    versao_reescrita: contador de UPDATE/DELETE do change feed lido antes da
+    leitura dos dados; o snapshot só vale enquanto ele não mudar.
+    """
+    if pa is None or df.empty or 'id' not in df.columns:
+        return False
+
+    caminho = caminho or get_snapshot_path()
+    os.makedirs(os.path.dirname(caminho) or '.', exist_ok=True)
+
+    tabela = pa.Table.from_pandas(df, preserve_index=False)
+    metadata = {
+        **(tabela.schema.metadata or {}),
+        b'max_id': str(int(df['id'].max())).encode(),
+        b'criado_em': str(time.time()).encode()
+    }
+    if versao_reescrita is not None:
+        metadata[b'versao_reescrita'] = str(versao_reescrita).encode()
+    tabela = tabela.replace_schema_metadata(metadata)
+
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    try:
+        with pa.OSFile(temporario, 'wb') as arquivo:
+            with ipc.new_file(arquivo, tabela.schema) as writer:
+                writer.write_table(tabela)
+        os.replace(temporario, caminho)
+        return True
+    except OSError:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        return False
+
+def ler_snapshot(caminho=None, max_idade=None, versao_reescrita=None):
+    """
+    Lê o snapshot via memory map.
+    Retorna (df, max_id) ou None se não existir, estiver vencido, ilegível ou,
+    quando versao_reescrita é informada, se houve UPDATE/DELETE desde que foi gravado
+    (inclusive por outro processo ou pelo SQL do agente).
+    """
+    if pa is None:
+        return None
+
+    caminho = caminho or get_snapshot_path()
+    if not os.path.exists(caminho):
+        return None
+
+    try:
+        with pa.memory_map(caminho, 'r') as fonte:
+            tabela = ipc.open_file(fonte).read_all()
+    except (OSError, pa.ArrowInvalid):
+        return None
+
+    metadata = tabela.schema.metadata or {}
+    if b'max_id' not in metadata:
+        return None
+
+    criado_em = float(metadata.get(b'criado_em', b'0'))
+    if max_idade is not None and time.time() - criado_em > max_idade:
+        return None
+    if versao_reescrita is not None and metadata.get(b'versao_reescrita') != str(versao_reescrita).encode():
+        return None
+
+    # split_blocks evita consolidar colunas numéricas (menos cópias)
+    df = tabela.to_pandas(split_blocks=True)
+    return df, int(metadata[b'max_id'])
+
+def remover_snapshot(caminho=None):
+    """Descarta o snapshot (ex.: após UPDATE/DELETE que o delta não cobre)"""
+    caminho = caminho or get_snapshot_path()
+    try:
+        os.remove(caminho)
+    except FileNotFoundError:
+        pass
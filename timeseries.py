@@ -0,0 +1,120 @@
+import numpy as np
+import pandas as pd
+
+# Resoluções suportadas, da mais fina para a mais grossa
+# código do Period do pandas -> rótulo exibido na interface
+RESOLUCOES = {
+    'D': 'Diária',
+    'W': 'Semanal',
+    'M': 'Mensal',
+    'Q': 'Trimestral'
+}
+
+def converter_datas(serie):
+    """Converte a coluna Data (ISO, normalizada na escrita) para datetime"""
+    return pd.to_datetime(serie, format='ISO8601', errors='coerce')
+
+def escolher_resolucao(inicio, fim, max_pontos):
+    """
+    Escolhe a resolução mais fina cujo número de buckets cabe no orçamento.
+    Se nenhuma couber, retorna a mais grossa (o LTTB reduz o restante).
+    """
+    inicio = pd.Timestamp(inicio)
+    fim = pd.Timestamp(fim)
+
+    for resolucao in RESOLUCOES:
+        buckets = len(pd.period_range(inicio, fim, freq=resolucao))
+        if buckets <= max_pontos:
+            return resolucao
+
+    return list(RESOLUCOES)[-1]
+
+def agregar_serie(df, resolucao, inicio=None, fim=None):
+    """
+    Agrega receitas, gastos e saldo por bucket da resolução escolhida.
+    Buckets sem transações entram com zero para a série ficar contínua.
+    """
+    datas = converter_datas(df['Data'])
+    dados = df.assign(Data=datas).dropna(subset=['Data'])
+
+    if inicio is not None:
+        dados = dados[dados['Data'] >= pd.Timestamp(inicio)]
+    if fim is not None:
+        # Fim inclusivo: considera o dia inteiro
+        dados = dados[dados['Data'] < pd.Timestamp(fim) + pd.Timedelta(days=1)]
+
+    if dados.empty:
+        return pd.DataFrame(columns=['Periodo', 'Ativo', 'Passivo', 'Saldo'])
+
+    periodos = dados['Data'].dt.to_period(resolucao)
+    df_agg = (
+        dados.assign(Periodo=periodos)
+        .pivot_table(index='Periodo', columns='Tipo', values='Valor', aggfunc='sum', fill_value=0)
+    )
+
+    # Preencher buckets vazios do intervalo
+    todos = pd.period_range(
+        pd.Timestamp(inicio) if inicio is not None else periodos.min().start_time,
+        pd.Timestamp(fim) if fim is not None else periodos.max().start_time,
+        freq=resolucao
+    )
+    df_agg = df_agg.reindex(todos, fill_value=0)
+
+    for tipo in ('Ativo', 'Passivo'):
+        if tipo not in df_agg.columns:
+            df_agg[tipo] = 0.0
+
+    df_agg['Saldo'] = df_agg['Ativo'] - df_agg['Passivo']
+    df_agg.index = df_agg.index.start_time
+    df_agg.index.name = 'Periodo'
+    df_agg.columns.name = None
+
+    return df_agg[['Ativo', 'Passivo', 'Saldo']].reset_index()
+
+def lttb(x, y, n_pontos):
+    """
+    Largest-Triangle-Three-Buckets: escolhe n_pontos índices que preservam
+    a forma visual da série. Retorna os índices selecionados em ordem.
+    """
+    x = np.asarray(x, dtype='float64')
+    y = np.asarray(y, dtype='float64')
+    total = len(x)
+
+    if n_pontos >= total or n_pontos < 3:
+        return np.arange(total)
+
+    indices = np.empty(n_pontos, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = total - 1
+
+    # Limites dos buckets intermediários (primeiro e último ponto ficam fixos)
+    limites = np.linspace(1, total - 1, n_pontos - 1).astype(np.int64)
+    anterior = 0
+
+    for i in range(n_pontos - 2):
+        ini, fim = limites[i], limites[i + 1]
+
+        # Média do próximo bucket (ou o último ponto, no bucket final)
+        prox_ini = limites[i + 1]
+        prox_fim = limites[i + 2] if i + 2 < len(limites) else total
+        media_x = x[prox_ini:prox_fim].mean()
+        media_y = y[prox_ini:prox_fim].mean()
+
+        # Área do triângulo (anterior, candidato, média do próximo)
+        areas = np.abs(
+            (x[anterior] - media_x) * (y[ini:fim] - y[anterior])
+            - (x[anterior] - x[ini:fim]) * (media_y - y[anterior])
+        )
+        anterior = ini + int(areas.argmax())
+        indices[i + 1] = anterior
+
+    return indices
+
+def reduzir_serie(df_serie, coluna, max_pontos):
+    """Aplica LTTB a uma coluna da série agregada, mantendo o eixo Periodo"""
+    if len(df_serie) <= max_pontos:
+        return df_serie[['Periodo', coluna]]
+
+    x = df_serie['Periodo'].astype('int64').to_numpy()
+    indices = lttb(x, df_serie[coluna].to_numpy(), max_pontos)
+    return df_serie.iloc[indices][['Periodo', coluna]]
@@ -0,0 +1,178 @@
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from functools import wraps
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# Quantos spans manter em memória por processo
+MAX_SPANS = 20000
+
+class ColetorMetricas:
+    """
+    Coletor em memória de spans (duração por trecho de código) e contadores.
+    Compartilhado entre sessões do mesmo processo; thread-safe.
+    """
+
+    def __init__(self, max_spans=MAX_SPANS):
+        self.lock = threading.Lock()
+        self.spans = deque(maxlen=max_spans)
+        self.contadores = defaultdict(float)
+
+    def registrar(self, nome, duracao_ms, **atributos):
+        """Registra a duração de um span"""
+        with self.lock:
+            self.spans.append({
+                'nome': nome,
+                'duracao_ms': duracao_ms,
+                'timestamp': time.time(),
+                **atributos
+            })
+
+    def incrementar(self, nome, valor=1):
+        """Incrementa um contador (tokens, retries, chamadas...)"""
+        with self.lock:
+            self.contadores[nome] += valor
+
+    def resumo(self):
+        """Tabela com contagem, p50, p95 e máximo por span"""
+        with self.lock:
+            spans = list(self.spans)
+
+        if not spans:
+            return pd.DataFrame(columns=['span', 'chamadas', 'p50_ms', 'p95_ms', 'max_ms', 'total_s'])
+
+        df = pd.DataFrame(spans)
+        linhas = []
+        for nome, grupo in df.groupby('nome'):
+            duracoes = grupo['duracao_ms'].to_numpy()
+            linhas.append({
+                'span': nome,
+                'chamadas': len(duracoes),
+                'p50_ms': float(np.percentile(duracoes, 50)),
+                'p95_ms': float(np.percentile(duracoes, 95)),
+                'max_ms': float(duracoes.max()),
+                'total_s': float(duracoes.sum() / 1000)
+            })
+
+        return pd.DataFrame(linhas).sort_values('total_s', ascending=False, ignore_index=True)
+
+    def para_jsonl(self):
+        """Exporta os spans brutos em JSON Lines"""
+        with self.lock:
+            spans = list(self.spans)
+        return ''.join(json.dumps(span, ensure_ascii=False, default=str) + '\n' for span in spans)
+
+    def para_prometheus(self):
+        """Exporta resumo e contadores no formato texto do Prometheus"""
+        resumo = self.resumo()
+        linhas = [
+            '# HELP economiza_span_duracao_ms Duração dos spans em milissegundos',
+            '# TYPE economiza_span_duracao_ms summary'
+        ]
+        for _, linha in resumo.iterrows():
+            rotulo = f'span="{linha["span"]}"'
+            linhas.append(f'economiza_span_duracao_ms{{{rotulo},quantile="0.5"}} {linha["p50_ms"]:.3f}')
+            linhas.append(f'economiza_span_duracao_ms{{{rotulo},quantile="0.95"}} {linha["p95_ms"]:.3f}')
+            linhas.append(f'economiza_span_duracao_ms_sum{{{rotulo}}} {linha["total_s"] * 1000:.3f}')
+            linhas.append(f'economiza_span_duracao_ms_count{{{rotulo}}} {linha["chamadas"]}')
+
+        with self.lock:
+            contadores = dict(self.contadores)
+
+        for nome, valor in sorted(contadores.items()):
+            metrica = 'economiza_' + nome.replace('.', '_')
+            linhas.append(f'# TYPE {metrica} counter')
+            linhas.append(f'{metrica} {valor:g}')
+
+        return '\n'.join(linhas) + '\n'
+
+    def exportar(self, pasta):
+        """Grava spans.jsonl e metricas.prom (textfile collector do node_exporter)"""
+        os.makedirs(pasta, exist_ok=True)
+        for nome, conteudo in (('spans.jsonl', self.para_jsonl()), ('metricas.prom', self.para_prometheus())):
+            temporario = os.path.join(pasta, f".{nome}.tmp")
+            with open(temporario, 'w', encoding='utf-8') as f:
+                f.write(conteudo)
+            os.replace(temporario, os.path.join(pasta, nome))
+
+    def limpar(self):
+        """Descarta spans e contadores"""
+        with self.lock:
+            self.spans.clear()
+            self.contadores.clear()
+
+@st.cache_resource
+def get_coletor():
+    """Retorna o coletor de métricas do processo com cache de recurso"""
+    return ColetorMetricas()
+
+@st.cache_resource
+def iniciar_exportador(pasta, intervalo=60):
+    """Thread que exporta as métricas para a pasta a cada intervalo (uma por processo)"""
+    def loop():
+        while True:
+            time.sleep(intervalo)
+            try:
+                get_coletor().exportar(pasta)
+            except OSError:
+                pass
+
+    thread = threading.Thread(target=loop, name="exportador-metricas", daemon=True)
+    thread.start()
+    return thread
+
+@contextmanager
+def span(nome, **atributos):
+    """Mede o tempo de um bloco: with span('agente.run'): ..."""
+    inicio = time.perf_counter()
+    erro = None
+    try:
+        yield
+    except Exception as e:
+        erro = type(e).__name__
+        raise
+    finally:
+        duracao_ms = (time.perf_counter() - inicio) * 1000
+        if erro:
+            atributos['erro'] = erro
+        get_coletor().registrar(nome, duracao_ms, **atributos)
+
+def medir(nome=None):
+    """Decorator que envolve a função num span (nome padrão: módulo.função)"""
+    def decorator(func):
+        nome_span = nome or f"{func.__module__}.{func.__name__}"
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(nome_span):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def hook_ferramentas(function_name, function_call, arguments):
+    """Tool hook do agno: mede cada execução de ferramenta do agente (SQL incluso)"""
+    with span(f"tool.{function_name}"):
+        return function_call(**arguments)
+
+def registrar_metricas_llm(response):
+    """Extrai tokens, chamadas ao modelo e retries da resposta do agente"""
+    coletor = get_coletor()
+    metricas = getattr(response, 'metrics', None) or {}
+
+    for chave in ('input_tokens', 'output_tokens', 'total_tokens'):
+        valores = metricas.get(chave) or []
+        coletor.incrementar(f"llm.{chave}", sum(valores))
+
+    coletor.incrementar("llm.chamadas_modelo", len(metricas.get('input_tokens') or []))
+
+    # Cada tentativa do Agent emite um RunStarted; as extras são retries
+    eventos = getattr(response, 'events', None) or []
+    iniciados = sum(1 for evento in eventos if getattr(evento, 'event', None) == 'RunStarted')
+    coletor.incrementar("llm.retries", max(iniciados - 1, 0))
+    coletor.incrementar("llm.runs")